@@ -22,11 +22,86 @@ Authors:
     - Lesly C Guerrero Velez 
     - Manuel J Romero Olvera
 """
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
 import tkinter as tk
 
-from images_app import run_app
-from videos_app import VideoProcessingApp
-from websites_app import run_web_app
+# The experiment modules bring in cv2, skimage, plotly, matplotlib, scipy
+# and pandas, they are imported when their button is clicked so the
+# launcher shows straight away
+EXPERIMENT_MODULES = ["websites_app", "videos_app", "images_app"]
+
+# Modules that must not be loaded by importing this one
+HEAVY_MODULES = [
+    "cv2",
+    "skimage",
+    "plotly",
+    "matplotlib",
+    "scipy",
+    "IPython",
+    "pandas",
+    "numpy",
+] + EXPERIMENT_MODULES
+
+# Seconds allowed to import this module, checked with --check-imports
+IMPORT_BUDGET = 0.5
+
+# Milliseconds after the window is shown before pre-warming the imports
+PREWARM_DELAY_MS = 500
+
+
+def prewarm(modules=EXPERIMENT_MODULES):
+    """
+    Imports the experiment modules in a background thread, so the first
+    click doesn't wait for them. A module that fails here is imported
+    again, and its error shown, when its button is clicked.
+    """
+
+    def run():
+        for module in modules:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                print(f"Could not pre-load {module}: {e}")
+
+    thread = threading.Thread(target=run, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def check_import_budget(budget=IMPORT_BUDGET):
+    """
+    Imports this module in a fresh interpreter and checks that it takes
+    less than the budget and doesn't load any of the HEAVY_MODULES
+    ---
+    Args
+    ---
+        budget(float) seconds allowed for the import
+    ---
+    Returns
+    ---
+        ok(bool) whether the import is within the budget
+    """
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout.split("\n")
+    elapsed, loaded = float(output[0]), [module for module in output[1].split(",") if module]
+    print(f"import app: {elapsed:.3f} s (budget {budget} s)")
+    if loaded:
+        print(f"Heavy modules loaded at startup: {', '.join(loaded)}")
+    return elapsed <= budget and not loaded
 
 
 class ExperimentManagementGUI:
@@ -73,6 +148,8 @@ class ExperimentManagementGUI:
     def website_experiment(self):
         """Call the website experiment from Mohammad's code"""
         print("Website experiment selected")
+        from websites_app import run_web_app
+
         self.master.state("zoomed")
         self.master.withdraw()
         root = tk.Toplevel()
@@ -90,6 +167,8 @@ class ExperimentManagementGUI:
         """Call the video experiment from Sajeda's code"""
         # Create the main window
         print("Video experiment selected")
+        from videos_app import VideoProcessingApp
+
         self.master.state("zoomed")
         self.master.withdraw()
         root = tk.Toplevel()
@@ -106,6 +185,8 @@ class ExperimentManagementGUI:
     def image_experiment(self):
         """Call the image experiment from Priyank's code"""
         print("Image experiment selected")
+        from images_app import run_app
+
         self.master.state("zoomed")
         self.master.withdraw()
         root = tk.Toplevel()
@@ -122,8 +203,24 @@ class ExperimentManagementGUI:
 
 def main():
     """Main function to run the application"""
+    parser = argparse.ArgumentParser(description="Experiment Management")
+    parser.add_argument(
+        "--no-prewarm", action="store_true", help="only import an experiment when it's opened"
+    )
+    parser.add_argument(
+        "--check-imports",
+        action="store_true",
+        help=f"check that importing the launcher takes under {IMPORT_BUDGET} s and exit",
+    )
+    args = parser.parse_args()
+    if args.check_imports:
+        sys.exit(0 if check_import_budget() else 1)
+
     root = tk.Tk()
     app = ExperimentManagementGUI(root)
+    if not args.no_prewarm:
+        # once the window is on screen
+        root.after(PREWARM_DELAY_MS, prewarm)
     root.mainloop()
 
 
@@ -0,0 +1,12 @@
+"""
+benchmarks
+
+Reproducible performance measurements of the experiment pipelines.
+Participant recordings can't be shared, so every benchmark runs on
+synthetic data written by ``benchmarks.synthetic``.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
@@ -0,0 +1,101 @@
+"""
+bench_emotiongsr.py
+
+Benchmarks of ``emotiongsr.DataProcessor`` on a synthetic image study,
+from cleaning the exports to building the heatmaps.
+
+    python -m benchmarks.bench_emotiongsr --participants 4 --duration 30
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import datetime
+
+from benchmarks.harness import measure, save_results
+from benchmarks.synthetic import generate_study
+from emotiongsr import DataProcessor
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def run(folder, participants=2, stimuli=4, sampling_rate=128, duration=10.0,
+        emotion="Joy", signal="Phasic Signal", repeat=3) -> tuple:
+    """
+    Writes a synthetic study in ``folder`` and measures every stage of
+    the image experiment on it
+    ---
+    Returns
+    ---
+        (parameters, results) to pass to ``save_results``
+    """
+    study = generate_study(
+        folder,
+        participants=participants,
+        stimuli=stimuli,
+        sampling_rate=sampling_rate,
+        duration=duration,
+    )
+    parameters = {
+        "participants": participants,
+        "stimuli": stimuli,
+        "sampling_rate": sampling_rate,
+        "duration": duration,
+        "rows": study["rows"],
+        "emotion": emotion,
+        "signal": signal,
+    }
+    image_path = study["images"][0]
+    processor = DataProcessor(study["data"], study["clean"])
+
+    results = [measure("clean_files", processor.clean_files, repeat=repeat)]
+    results.append(measure("get_clean_data", processor.get_clean_data, repeat=repeat))
+    data = results[-1]["value"]
+    results.append(
+        measure("generate_heatmap", processor.generate_heatmap, data, emotion, image_path,
+                repeat=repeat)
+    )
+    results.append(
+        measure("generate_emotion_heatmap", processor.generate_emotion_heatmap, data, emotion,
+                signal, image_path, repeat=repeat)
+    )
+    results.append(
+        measure("get_all_emotion_heatmaps", processor.get_all_emotion_heatmaps, data, signal,
+                image_path, repeat=repeat)
+    )
+    return parameters, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--participants", type=int, default=2)
+    parser.add_argument("--stimuli", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=128, help="samples per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per stimulus")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data", help="keep the synthetic study in this folder")
+    parser.add_argument("--output", help="JSON file for the results")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"emotiongsr-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    with tempfile.TemporaryDirectory() as temporary:
+        parameters, results = run(
+            args.data or temporary,
+            participants=args.participants,
+            stimuli=args.stimuli,
+            sampling_rate=args.rate,
+            duration=args.duration,
+            repeat=args.repeat,
+        )
+    return save_results("emotiongsr", parameters, results, output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+bench_video.py
+
+Benchmarks of the ``videos_app.main_code`` workflow on synthetic scrolling
+videos, every stage is timed on its own for each video length so a
+regression can be traced to the stage and its scaling.
+
+    python -m benchmarks.bench_video --lengths 10 30 60 --size 1280 720
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import argparse
+import contextlib
+import itertools
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import cv2
+
+import videos_app
+from benchmarks.harness import measure, save_results
+from benchmarks.synthetic import write_scrolling_video, write_video_export
+from emotiongsr import alignment
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _analyse(video_path, width=videos_app.DETECTION_WIDTH):
+    # the stages of analyse_video, without the cache
+    video = cv2.VideoCapture(video_path)
+    try:
+        info = videos_app.probe_video(video)
+        change_frames, _, frame_times = videos_app.detect_scene_changes(video, width=width)
+    finally:
+        video.release()
+    return videos_app.update_timestamps(info, frame_times), change_frames
+
+
+def _extract(video_path, frame_names, folder, runs):
+    # a new folder every run, so the frames are written every time
+    output_dir = os.path.join(folder, f"run_{next(runs)}")
+    os.makedirs(output_dir)
+    video = cv2.VideoCapture(video_path)
+    try:
+        return videos_app.extract_frames(
+            video, frame_names, output_dir, store_dir=os.path.join(output_dir, ".frames")
+        )
+    finally:
+        video.release()
+
+
+def _main_code(video_path, csv_path, folder):
+    # main_code works in experiments/ under the current folder, the
+    # analysis cache is removed so the video is decoded every run
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        shutil.rmtree(videos_app.VIDEO_CACHE_DIR, ignore_errors=True)
+        with contextlib.redirect_stdout(None):
+            return videos_app.main_code(video_path, csv_path, "benchmark", "P1", "Joy")
+    finally:
+        os.chdir(cwd)
+
+
+def run(folder, seconds=30.0, size=(1280, 720), fps=30, scroll_speed=600, pause=2.0,
+        sampling_rate=128, repeat=3) -> list:
+    """
+    Writes a synthetic video and export of ``seconds`` in ``folder`` and
+    measures every stage of main_code on them
+    ---
+    Returns
+    ---
+        results(list) outputs of ``measure``, with the video length
+    """
+    os.makedirs(folder, exist_ok=True)
+    video_path = os.path.abspath(os.path.join(folder, f"video_{seconds:g}s.mp4"))
+    csv_path = os.path.abspath(os.path.join(folder, f"export_{seconds:g}s.csv"))
+    write_scrolling_video(video_path, size=size, seconds=seconds, fps=fps,
+                          scroll_speed=scroll_speed, pause=pause)
+    write_video_export(csv_path, seconds, sampling_rate=sampling_rate)
+    channels = videos_app.VIDEO_CHANNELS
+
+    results = [measure("csv_parse", videos_app.read_sensor_csv, csv_path, repeat=repeat)]
+    data = results[-1]["value"]
+    results.append(measure("decode_ssim", _analyse, video_path, repeat=repeat))
+    info, change_frames = results[-1]["value"]
+    results.append(
+        measure("sync", videos_app.sync_channels, data, channels, info["timestamps"],
+                info["duration"], repeat=repeat)
+    )
+    per_frame, channels = results[-1]["value"]
+    results.append(measure("top_k", videos_app.top_frames, per_frame, channels, repeat=repeat))
+    top = results[-1]["value"]
+
+    # the frames main_code saves: the change point closest to every peak
+    closest = alignment.asof_indices(top["Frames"].to_numpy(), change_frames, direction="nearest")
+    frame_names = alignment.take(change_frames, closest, fill_value=0).astype("int64")
+    results.append(
+        measure("frame_writes", _extract, video_path, frame_names, os.path.join(folder, "frames"),
+                itertools.count(), repeat=repeat)
+    )
+    results.append(measure("main_code", _main_code, video_path, csv_path, folder, repeat=repeat))
+
+    for result in results:
+        result["video_seconds"] = seconds
+        result["frames"] = info["frame_count"]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--lengths", type=float, nargs="+", default=[10, 30],
+                        help="video lengths in seconds")
+    parser.add_argument("--size", type=int, nargs=2, default=[1280, 720],
+                        metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--scroll-speed", type=float, default=600, help="pixels per second")
+    parser.add_argument("--pause", type=float, default=2.0, help="seconds between scrolls")
+    parser.add_argument("--rate", type=float, default=128, help="samples per second")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data", help="keep the synthetic videos in this folder")
+    parser.add_argument("--output", help="JSON file for the results")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"video-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    parameters = {
+        "lengths": args.lengths,
+        "size": args.size,
+        "fps": args.fps,
+        "scroll_speed": args.scroll_speed,
+        "pause": args.pause,
+        "sampling_rate": args.rate,
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as temporary:
+        for seconds in args.lengths:
+            print(f"Video of {seconds:g} s")
+            results += run(
+                os.path.join(args.data or temporary, f"{seconds:g}s"),
+                seconds=seconds,
+                size=tuple(args.size),
+                fps=args.fps,
+                scroll_speed=args.scroll_speed,
+                pause=args.pause,
+                sampling_rate=args.rate,
+                repeat=args.repeat,
+            )
+    return save_results("video", parameters, results, output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+bench_web.py
+
+Benchmarks of ``multimotions.DataProcessor`` over a grid of session
+lengths and screenshot heights, reporting the throughput of every method
+in events per second and the peak RSS of the process. Every point of the
+grid runs in its own process so the peaks don't carry over.
+
+    python -m benchmarks.bench_web --minutes 5 30 60 --heights 5000 20000
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from benchmarks.harness import measure, save_results
+from benchmarks.synthetic import generate_web_session
+from multimotions.dataprocessor import DataProcessor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes, None where unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run(folder, minutes=5.0, screenshot_height=6000, pages=3, event_rate=60, gaze_rate=60,
+        repeat=3) -> list:
+    """
+    Writes a synthetic session in ``folder`` and measures every step of
+    the website experiment on it, in the order websites_app runs them
+    ---
+    Returns
+    ---
+        results(list) outputs of ``measure`` with the throughput and the
+        peak RSS of the process after each step
+    """
+    session = generate_web_session(
+        folder,
+        pages=pages,
+        seconds=minutes * 60,
+        screenshot_height=screenshot_height,
+        event_rate=event_rate,
+        gaze_rate=gaze_rate,
+    )
+    processor = DataProcessor(
+        session["web_data"], session["imotions_data"], os.path.join(folder, "output")
+    )
+    screenshot = session["screenshots"][0]
+    steps = [
+        ("process_imotion_data", processor.process_imotion_data, ()),
+        ("process_web_data", processor.process_web_data, ()),
+        ("merge_web_and_imotion_data", processor.merge_web_and_imotion_data, ()),
+        ("process_merged_data", processor.process_merged_data, ()),
+        ("plot_heatmap", processor.plot_heatmap, (screenshot,)),
+        ("render_heatmap", processor.render_heatmap,
+         (screenshot, os.path.join(folder, "heatmap.png"))),
+    ]
+
+    results = []
+    for name, method, args in steps:
+        result = measure(name, method, *args, repeat=repeat)
+        result["events_per_second"] = session["events"] / result["wall_time"]
+        result["peak_rss"] = peak_rss()
+        result["minutes"] = minutes
+        result["screenshot_height"] = screenshot_height
+        result["events"] = session["events"]
+        result["samples"] = session["samples"]
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[5, 30],
+                        help="session lengths in minutes")
+    parser.add_argument("--heights", type=int, nargs="+", default=[6000, 20000],
+                        help="screenshot heights in pixels")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--event-rate", type=float, default=60, help="web events per second")
+    parser.add_argument("--gaze-rate", type=float, default=60, help="gaze samples per second")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data", help="keep the synthetic sessions in this folder")
+    parser.add_argument("--output", help="JSON file for the results")
+    # a single point of the grid, used for the child processes
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        results = run(args.data, minutes=args.minutes[0], screenshot_height=args.heights[0],
+                      pages=args.pages, event_rate=args.event_rate, gaze_rate=args.gaze_rate,
+                      repeat=args.repeat)
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump([{key: value for key, value in result.items() if key != "value"}
+                       for result in results], file)
+        return results
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"web-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    parameters = {
+        "minutes": args.minutes,
+        "heights": args.heights,
+        "pages": args.pages,
+        "event_rate": args.event_rate,
+        "gaze_rate": args.gaze_rate,
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as temporary:
+        for minutes in args.minutes:
+            for height in args.heights:
+                print(f"Session of {minutes:g} min, screenshots of {height} px")
+                folder = os.path.join(args.data or temporary, f"{minutes:g}min_{height}px")
+                point_output = os.path.join(temporary, f"{minutes:g}min_{height}px.json")
+                subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_web", "--worker",
+                     "--minutes", str(minutes), "--heights", str(height),
+                     "--pages", str(args.pages), "--event-rate", str(args.event_rate),
+                     "--gaze-rate", str(args.gaze_rate), "--repeat", str(args.repeat),
+                     "--data", folder, "--output", point_output],
+                    check=True,
+                    cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                )
+                with open(point_output, encoding="utf-8") as file:
+                    results += json.load(file)
+    return save_results("web", parameters, results, output)
+
+
+if __name__ == "__main__":
+    main()
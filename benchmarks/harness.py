@@ -0,0 +1,126 @@
+"""
+harness.py
+
+This module contains the helpers used by every benchmark to time a
+call, measure its peak memory and store the results as JSON, so two
+runs (e.g. before and after a change) can be compared.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+
+def measure(name, func, *args, repeat=3, **kwargs) -> dict:
+    """
+    Times ``func(*args, **kwargs)`` and measures its peak memory. The
+    wall time is the best of ``repeat`` calls, the peak memory comes
+    from one extra call under tracemalloc so tracing doesn't inflate
+    the timings.
+    ---
+    Args
+    ---
+        name(str) name of the benchmark
+        func(callable) the code to measure
+        repeat(int) number of timed calls
+    ---
+    Returns
+    ---
+        result(dict) name, wall time in seconds (best and all calls),
+        peak traced memory in bytes and the value returned by func
+    """
+    wall_times = []
+    cpu_times = []
+    for _ in range(repeat):
+        gc.collect()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        value = func(*args, **kwargs)
+        wall_times.append(time.perf_counter() - wall_start)
+        cpu_times.append(time.process_time() - cpu_start)
+
+    gc.collect()
+    # already tracing when the spans record memory (EMOTIONGSR_TRACE)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        start_memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    else:
+        start_memory = 0
+        tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        peak_memory -= start_memory
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    result = {
+        "name": name,
+        "wall_time": min(wall_times),
+        "wall_times": wall_times,
+        "cpu_time": min(cpu_times),
+        "peak_memory": peak_memory,
+    }
+    print(f"{name}: {result['wall_time']:.3f} s, {peak_memory / 2**20:.1f} MiB peak")
+    result["value"] = value
+    return result
+
+
+def environment() -> dict:
+    """Versions of the interpreter and main libraries, stored with every run"""
+    versions = {}
+    for module in ("numpy", "pandas", "cv2", "plotly", "skimage", "matplotlib"):
+        if module in sys.modules:
+            versions[module] = getattr(sys.modules[module], "__version__", None)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def save_results(suite, parameters, results, output_path) -> dict:
+    """
+    Writes the results of a benchmark suite to a JSON file
+    ---
+    Args
+    ---
+        suite(str) name of the suite
+        parameters(dict) the size of the synthetic data
+        results(list) outputs of ``measure``
+        output_path(str) JSON file to write, folders are created
+    ---
+    Returns
+    ---
+        report(dict) the data written to the file
+    """
+    report = {
+        "suite": suite,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "parameters": parameters,
+        "environment": environment(),
+        "results": [
+            {key: value for key, value in result.items() if key != "value"}
+            for result in results
+        ],
+    }
+    folder = os.path.dirname(output_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved in {output_path}")
+    return report
@@ -0,0 +1,647 @@
+"""
+synthetic.py
+
+This module writes synthetic iMotions 10 exports with the same layout
+as the real ones: a metadata preamble with the recording time at
+``RECORDING_TIME_ROW``, the ``Row`` header, ``SlideEvent`` markers around
+every stimulus and the ``BASE_COLUMNS`` sampled at their own rates
+(GSR every sample, gaze and facial expressions slower, NaN in between).
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import csv
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from emotiongsr.dataprocessor import BASE_COLUMNS, EMOTIONS
+
+SCREEN_SIZE = (1920, 1080)
+
+IMAGE_SIZE = (1024, 768)
+
+# Columns of the export, the participant comes from the file name
+EXPORT_COLUMNS = (
+    ["Row"]
+    + [column for column in BASE_COLUMNS if column != "Participant"]
+    + ["SlideEvent", "EventSource"]
+)
+
+# Preamble rows, the first one is read as the header so the recording
+# time is on line RECORDING_TIME_ROW + 1
+METADATA = [
+    ("#METADATA", ""),
+    ("#Study name", "Synthetic study"),
+    ("#Respondent Name", "{participant}"),
+    ("#Respondent Gender", "NA"),
+    ("#Respondent Age", "NA"),
+    ("#Respondent Group", "Default"),
+    ("#Export date", "{recording_time}"),
+    ("#iMotions version", "10.0"),
+    ("#Study type", "Images"),
+    ("#Recording time", "{recording_time}"),
+    ("#Sensors", "Shimmer GSR, Eye tracker, Affectiva AFFDEX"),
+    ("#Note", "Generated by benchmarks.synthetic"),
+]
+
+
+def _random_walk(rng, n, scale, low, high) -> np.ndarray:
+    """A smooth random signal clipped to [low, high]"""
+    walk = np.cumsum(rng.normal(0, scale, n)) + rng.uniform(low, high)
+    return np.clip(walk, low, high)
+
+
+def _on_ticks(times, rate) -> np.ndarray:
+    """True on the first sample of every 1/rate second tick"""
+    ticks = np.floor(times * rate / 1000).astype("int64")
+    return np.r_[True, np.diff(ticks) != 0]
+
+
+def _gsr(rng, times, sampling_rate):
+    """Conductance in microsiemens as a slow tonic level plus skin conductance responses"""
+    n = times.size
+    tonic = _random_walk(rng, n, 0.01 / np.sqrt(sampling_rate), 2.0, 20.0)
+    onsets = np.zeros(n)
+    # about one response every 10 seconds
+    onsets[rng.random(n) < 0.1 / sampling_rate] = rng.uniform(0.1, 1.0)
+    response_times = np.arange(int(10 * sampling_rate)) / sampling_rate
+    response = np.exp(-response_times / 4.0) - np.exp(-response_times / 0.75)
+    phasic = np.convolve(onsets, response / response.max())[:n]
+    noise = rng.normal(0, 0.005, n)
+    return tonic, phasic, tonic + phasic + noise
+
+
+def _gaze(rng, times, sampling_rate):
+    """Gaze in screen pixels, fixations of about 300 ms with jitter and blinks"""
+    n = times.size
+    fixation = np.cumsum(rng.random(n) < 1 / (0.3 * sampling_rate))
+    n_fixations = fixation[-1] + 1
+    centres_x = rng.uniform(0, SCREEN_SIZE[0], n_fixations)
+    centres_y = rng.uniform(0, SCREEN_SIZE[1], n_fixations)
+    x = centres_x[fixation] + rng.normal(0, 10, n)
+    y = centres_y[fixation] + rng.normal(0, 10, n)
+    blinks = rng.random(n) < 0.02
+    x[blinks] = np.nan
+    y[blinks] = np.nan
+    return x, y
+
+
+def imotions_export(
+    participant,
+    stimuli,
+    sampling_rate=128,
+    duration=10.0,
+    gap=1.0,
+    gaze_rate=60,
+    face_rate=30,
+    seed=0,
+) -> pd.DataFrame:
+    """
+    Generates the data rows of one participant's export, the stimuli are
+    shown in a random order for ``duration`` seconds each with ``gap``
+    seconds of blank screen before every one of them
+    ---
+    Args
+    ---
+        participant(str) name of the participant
+        stimuli(list) names of the stimuli, the image names without .jpg
+        sampling_rate(float) rows per second, the GSR rate
+        duration(float) seconds every stimulus is on screen
+        gap(float) seconds between stimuli
+        gaze_rate(float) eye tracker samples per second
+        face_rate(float) facial expression samples per second
+        seed(int) seed of the random generator
+    ---
+    Returns
+    ---
+        data(pd.DataFrame) the rows, with the EXPORT_COLUMNS
+    """
+    rng = np.random.default_rng(seed)
+    gap_rows = int(round(gap * sampling_rate))
+    stimulus_rows = max(int(round(duration * sampling_rate)), 2)
+    order = rng.permutation(len(stimuli))
+    n = len(stimuli) * (gap_rows + stimulus_rows) + gap_rows
+    times = np.arange(n) * 1000 / sampling_rate
+
+    names = np.full(n, "", dtype=object)
+    events = np.full(n, "", dtype=object)
+    for position, stimulus in enumerate(order):
+        start = gap_rows + position * (gap_rows + stimulus_rows)
+        names[start : start + stimulus_rows] = stimuli[stimulus]
+        events[start] = "StartMedia"
+        events[start + stimulus_rows - 1] = "EndMedia"
+
+    data = {"Row": np.arange(1, n + 1), "Timestamp": np.round(times, 3)}
+    data["SourceStimuliName"] = names
+
+    face = _on_ticks(times, face_rate)
+    for emotion in EMOTIONS:
+        values = _random_walk(rng, n, 0.02, 0.0, 1.0)
+        values[~face] = np.nan
+        data[emotion] = values
+
+    gaze = _on_ticks(times, gaze_rate)
+    for eye in ("Left", "Right"):
+        # both eyes look at the same point
+        x, y = _gaze(np.random.default_rng(seed + 1), times, sampling_rate)
+        x[~gaze] = np.nan
+        y[~gaze] = np.nan
+        data[f"ET_Gaze{eye}x"] = x + rng.normal(0, 2, n)
+        data[f"ET_Gaze{eye}y"] = y + rng.normal(0, 2, n)
+
+    tonic, phasic, conductance = _gsr(rng, times, sampling_rate)
+    data["GSR RAW"] = np.round(4096 - conductance * 100).astype("int64")
+    data["GSR Resistance CAL"] = 1000 / conductance
+    data["GSR Conductance CAL"] = conductance
+    data["Heart Rate PPG ALG"] = np.round(_random_walk(rng, n, 0.05, 55, 110))
+    data["GSR Raw"] = conductance
+    data["GSR Interpolated"] = conductance
+    data["Tonic Signal"] = tonic
+    data["Phasic Signal"] = phasic
+    data["SlideEvent"] = events
+    data["EventSource"] = np.where(events != "", "Stimulus", "")
+    return pd.DataFrame(data)[EXPORT_COLUMNS]
+
+
+def write_imotions_export(path, participant, stimuli, recording_time, **kwargs) -> int:
+    """
+    Writes one participant's export with the metadata preamble, rows
+    are padded to the width of the data so pandas can read the file
+    without a header
+    ---
+    Args
+    ---
+        path(str) CSV file to write
+        participant(str) name of the participant
+        stimuli(list) names of the stimuli
+        recording_time(pd.Timestamp) start of the recording
+        **kwargs: passed to ``imotions_export``
+    ---
+    Returns
+    ---
+        rows(int) number of data rows written
+    """
+    data = imotions_export(participant, stimuli, **kwargs)
+    width = len(EXPORT_COLUMNS)
+    recording_time = pd.Timestamp(recording_time).isoformat(sep=" ", timespec="milliseconds")
+    preamble = [
+        [key, "", value.format(participant=participant, recording_time=recording_time)]
+        for key, value in METADATA
+    ]
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        for row in preamble:
+            writer.writerow(row + [""] * (width - len(row)))
+        writer.writerow(EXPORT_COLUMNS)
+        data.to_csv(file, index=False, header=False, lineterminator="\n")
+    return len(data)
+
+
+def write_stimulus_images(folder, stimuli, size=IMAGE_SIZE, seed=0) -> list:
+    """
+    Writes a JPEG for every stimulus, named like the sample_data images
+    ---
+    Returns
+    ---
+        paths(list) one image path per stimulus
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(folder, exist_ok=True)
+    width, height = size
+    gradient = np.linspace(0, 255, width, dtype="float32")[None, :, None]
+    paths = []
+    for stimulus in stimuli:
+        colour = rng.uniform(0.2, 1.0, 3).astype("float32")
+        image = np.broadcast_to(gradient * colour, (height, width, 3)).astype("uint8")
+        path = os.path.join(folder, f"{stimulus}.jpg")
+        cv2.imwrite(path, image)
+        paths.append(path)
+    return paths
+
+
+def generate_study(
+    folder,
+    participants=2,
+    stimuli=4,
+    sampling_rate=128,
+    duration=10.0,
+    seed=0,
+    **kwargs,
+) -> dict:
+    """
+    Writes a complete image study: one export per participant in
+    ``folder/Data`` and the stimuli in ``folder/Images``, recordings
+    start one hour apart
+    ---
+    Args
+    ---
+        folder(str) root folder of the study
+        participants(int) number of exports
+        stimuli(int) number of images
+        sampling_rate(float) rows per second
+        duration(float) seconds every stimulus is on screen
+        seed(int) seed of the random generators
+        **kwargs: passed to ``imotions_export``
+    ---
+    Returns
+    ---
+        study(dict) the data, cleaned data and images folders, the image
+        paths and the number of rows written
+    """
+    data_dir = os.path.join(folder, "Data")
+    os.makedirs(data_dir, exist_ok=True)
+    names = [f"{1000 + index}_{3 + index % 10 / 10:.2f}" for index in range(stimuli)]
+    images = write_stimulus_images(os.path.join(folder, "Images"), names, seed=seed)
+
+    start = pd.Timestamp("2024-03-07 09:00:00", tz="UTC")
+    rows = 0
+    for index in range(participants):
+        participant = f"P{index + 1}"
+        path = os.path.join(data_dir, f"{index + 1:03d}_{participant}.csv")
+        rows += write_imotions_export(
+            path,
+            participant,
+            names,
+            start + pd.Timedelta(hours=index),
+            sampling_rate=sampling_rate,
+            duration=duration,
+            seed=seed + index,
+            **kwargs,
+        )
+    return {
+        "data": data_dir,
+        "clean": os.path.join(folder, "CleanedData"),
+        "images": images,
+        "stimuli": names,
+        "rows": rows,
+    }
+
+
+def _page(width, height, seed=0) -> np.ndarray:
+    """A web page like image: blocks of text lines and pictures"""
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), 245, dtype="uint8")
+    y = 40
+    while y < height - 40:
+        if rng.random() < 0.3:
+            # a picture
+            block = int(rng.integers(120, 300))
+            colour = rng.integers(0, 255, 3, dtype="uint8")
+            page[y : y + block, 40 : width - 40] = colour
+            cv2.circle(page, (width // 2, y + block // 2), block // 3,
+                       tuple(int(c) for c in 255 - colour), -1)
+            y += block + 30
+        else:
+            for _ in range(int(rng.integers(3, 8))):
+                text = "".join(rng.choice(list("abcdefghijklmnopqrstuvwxyz   "), 60))
+                cv2.putText(page, text, (40, y), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (30, 30, 30), 2)
+                y += 36
+            y += 24
+    return page
+
+
+def write_scrolling_video(path, size=(1280, 720), seconds=30.0, fps=30, scroll_speed=600,
+                          pause=2.0, seed=0) -> dict:
+    """
+    Writes a screen recording of a page being read: the page stays still
+    for ``pause`` seconds, then scrolls for one second, and so on
+    ---
+    Args
+    ---
+        path(str) the MP4 file to write
+        size(tuple) width and height of the video
+        seconds(float) length of the video
+        fps(float) frames per second
+        scroll_speed(float) pixels scrolled per second while scrolling
+        pause(float) seconds between scrolls
+        seed(int) seed of the page content
+    ---
+    Returns
+    ---
+        video(dict) path, frame count, fps and the number of frames that
+        scroll
+    """
+    width, height = size
+    page = _page(width, 6 * height, seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    frame_count = int(round(seconds * fps))
+    # scroll for one second after every pause
+    times = np.arange(frame_count) / fps
+    scrolling = (times % (pause + 1.0)) >= pause
+    offsets = np.cumsum(scrolling * scroll_speed / fps).astype("int64")
+    rows = np.arange(height)
+    try:
+        for offset in offsets:
+            # the page repeats once the end is reached
+            writer.write(page.take(rows + offset, axis=0, mode="wrap"))
+    finally:
+        writer.release()
+    return {"path": path, "frame_count": frame_count, "fps": fps,
+            "scrolling_frames": int(scrolling.sum())}
+
+
+def video_export(seconds, sampling_rate=128, lead_in=1.0, face_rate=30, start=5000.0, seed=0,
+                 channels=None) -> pd.DataFrame:
+    """
+    Generates the rows of the iMotions export recorded with a video, the
+    stimulus is 0 during the lead-in and 1 while the video plays
+    ---
+    Args
+    ---
+        seconds(float) length of the video
+        sampling_rate(float) rows per second
+        lead_in(float) seconds recorded before the video starts
+        face_rate(float) facial expression samples per second
+        start(float) Timestamp of the first row in ms
+        seed(int) seed of the random generator
+        channels(list) the channels to write, videos_app.VIDEO_CHANNELS
+        by default
+    ---
+    Returns
+    ---
+        data(pd.DataFrame) the rows, starting with Row, Timestamp and
+        SourceStimuliName
+    """
+    if channels is None:
+        # videos_app brings in tkinter, only needed for the video data
+        from videos_app import VIDEO_CHANNELS
+
+        channels = VIDEO_CHANNELS
+    rng = np.random.default_rng(seed)
+    n = int(round((lead_in + seconds) * sampling_rate))
+    times = np.arange(n) * 1000 / sampling_rate
+    data = {
+        "Row": np.arange(1, n + 1),
+        "Timestamp": np.round(start + times, 3),
+        "SourceStimuliName": (times >= lead_in * 1000).astype("int64"),
+    }
+    face = _on_ticks(times, face_rate)
+    _, phasic, _ = _gsr(rng, times, sampling_rate)
+    for channel in channels:
+        if channel == "Phasic Signal":
+            values = phasic
+        elif channel == "Heart Rate PPG ALG":
+            values = np.round(_random_walk(rng, n, 0.05, 55, 110))
+        else:
+            # facial expressions are scored from 0 to 100
+            values = _random_walk(rng, n, 2.0, 0.0, 100.0)
+            values[~face] = np.nan
+        data[channel] = values
+    return pd.DataFrame(data)
+
+
+def write_video_export(path, seconds, header_row=None, **kwargs) -> int:
+    """
+    Writes the export read by ``videos_app.read_sensor_csv``, the column
+    names come after a metadata preamble, on row ``header_row`` of the
+    data read with the first line as header
+    ---
+    Args
+    ---
+        path(str) CSV file to write
+        seconds(float) length of the video
+        header_row(int) videos_app.HEADER_ROW by default
+        **kwargs: passed to ``video_export``
+    ---
+    Returns
+    ---
+        rows(int) number of data rows written
+    """
+    if header_row is None:
+        from videos_app import HEADER_ROW
+
+        header_row = HEADER_ROW
+    data = video_export(seconds, **kwargs)
+    width = len(data.columns)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        for line in range(header_row + 1):
+            key, value = METADATA[line] if line < len(METADATA) else (f"#Field {line}", "")
+            writer.writerow([key, "", value.format(participant="P1", recording_time="")]
+                            + [""] * (width - 3))
+        writer.writerow(data.columns)
+        data.to_csv(file, index=False, header=False, lineterminator="\n")
+    return len(data)
+
+
+# Header of the browser extension log, with its column names as written
+WEB_LOG_HEADER = (
+    "data:text/csv;charset=utf-8,"
+    "Time (UTC),Event,Scroll Position,Scroll Percentage,Mouse X,Mouse,URL Y"
+)
+
+WEB_EXPORT_COLUMNS = [
+    "Timestamp",
+    "Anger",
+    "Fear",
+    "Joy",
+    "Sadness",
+    "Surprise",
+    "Engagement",
+    "Confusion",
+    "Neutral",
+    "ET_GazeRightx",
+    "ET_GazeLeftx",
+    "ET_GazeLefty",
+    "ET_GazeRighty",
+]
+
+# Lines before the header of the eye tracking export
+WEB_EXPORT_PREAMBLE = 28
+
+
+def page_folder(url) -> str:
+    """Folder name of a page's screenshot, like the sample_data web_pages"""
+    return url.split("://", 1)[-1].replace("/", "_")
+
+
+def web_log(urls, seconds=300.0, event_rate=60, page_heights=None, viewport=1080,
+            start="2023-08-09T12:00:00Z", seed=0) -> pd.DataFrame:
+    """
+    Generates the events of a browsing session: every page is visited in
+    turn for the same time, the mouse moves most of the time and the page
+    is scrolled down in short bursts
+    ---
+    Args
+    ---
+        urls(list) the pages visited
+        seconds(float) length of the session
+        event_rate(float) events per second
+        page_heights(list) height of every page in pixels, 6000 by default
+        viewport(int) height of the browser window
+        start(str) time of the first event
+        seed(int) seed of the random generator
+    ---
+    Returns
+    ---
+        log(pd.DataFrame) the events, with the columns of the log file
+    """
+    rng = np.random.default_rng(seed)
+    if page_heights is None:
+        page_heights = [6000] * len(urls)
+    n = max(int(seconds * event_rate), len(urls))
+    times = np.sort(rng.uniform(0, seconds, n))
+    page = np.minimum((times / seconds * len(urls)).astype("int64"), len(urls) - 1)
+
+    # bursts of scrolling, about a fifth of the events
+    bursts = np.cumsum(rng.random(n) < 1 / event_rate)
+    scrolling = rng.random(bursts[-1] + 1)[bursts] < 0.2
+    first_events = np.r_[True, page[1:] != page[:-1]]
+    scrolling[first_events] = False
+
+    # the position only goes down while a page is open
+    steps = np.where(scrolling, rng.uniform(1, 15, n), 0.0)
+    position = np.cumsum(steps)
+    position -= np.maximum.accumulate(np.where(first_events, position, 0))
+    scrollable = np.maximum(np.asarray(page_heights, dtype="float64")[page] - viewport, 1)
+    position = np.minimum(position, scrollable)
+    percentage = position / scrollable * 100
+
+    mouse_x = _random_walk(rng, n, 15, 0, 1919).round()
+    mouse_y = _random_walk(rng, n, 10, 0, viewport - 1).round()
+    # the extension sometimes misses a coordinate
+    mouse_y[rng.random(n) < 0.05] = np.nan
+
+    timestamps = pd.Timestamp(start) + pd.to_timedelta(times, unit="s")
+    return pd.DataFrame(
+        {
+            "Time (UTC)": timestamps.strftime("%Y-%m-%dT%H:%M:%S.%f").str[:-3] + "Z",
+            "Event": np.where(scrolling, "scroll", "mousemove"),
+            "Scroll Position": np.where(scrolling, position, np.nan),
+            "Scroll Percentage": np.where(scrolling, percentage, np.nan),
+            "Mouse X": np.where(scrolling, np.nan, mouse_x),
+            "Mouse Y": np.where(scrolling, np.nan, mouse_y),
+            "URL": np.asarray(urls, dtype=object)[page],
+        }
+    )
+
+
+def write_web_log(path, urls, **kwargs) -> int:
+    """
+    Writes a browsing session in the format of the browser extension, a
+    ``data:text/csv`` header line and no newline after the last event
+    ---
+    Args
+    ---
+        path(str) CSV file to write
+        urls(list) the pages visited
+        **kwargs: passed to ``web_log``
+    ---
+    Returns
+    ---
+        events(int) number of events written
+    """
+    log = web_log(urls, **kwargs)
+    body = log.to_csv(index=False, header=False, lineterminator="\n", float_format="%.15g")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(WEB_LOG_HEADER + "\n")
+        file.write(body.rstrip("\n"))
+    return len(log)
+
+
+def write_eye_tracking_export(path, seconds=300.0, gaze_rate=60, face_rate=30,
+                              tracking_loss=0.05, seed=0) -> int:
+    """
+    Writes the iMotions export of a website session read by
+    ``multimotions.DataProcessor.process_imotion_data``: WEB_EXPORT_PREAMBLE
+    metadata lines, the header and samples with a Timestamp in ms. Lost
+    gaze samples are written as -1, like the eye tracker does.
+    ---
+    Args
+    ---
+        path(str) CSV file to write
+        seconds(float) length of the session
+        gaze_rate(float) samples per second
+        face_rate(float) facial expression samples per second
+        tracking_loss(float) fraction of samples without gaze
+        seed(int) seed of the random generator
+    ---
+    Returns
+    ---
+        rows(int) number of samples written
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * gaze_rate)
+    times = np.arange(n) * 1000 / gaze_rate
+    data = {"Timestamp": np.round(times, 3)}
+    face = _on_ticks(times, face_rate)
+    for emotion in WEB_EXPORT_COLUMNS[1:9]:
+        values = _random_walk(rng, n, 2.0, 0.0, 100.0)
+        values[~face] = np.nan
+        data[emotion] = values
+    x, y = _gaze(rng, times, gaze_rate)
+    lost = np.isnan(x) | (rng.random(n) < tracking_loss)
+    for eye in ("Right", "Left"):
+        data[f"ET_Gaze{eye}x"] = np.where(lost, -1, x + rng.normal(0, 2, n))
+    for eye in ("Left", "Right"):
+        data[f"ET_Gaze{eye}y"] = np.where(lost, -1, y + rng.normal(0, 2, n))
+
+    width = len(WEB_EXPORT_COLUMNS)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        for line in range(WEB_EXPORT_PREAMBLE):
+            key, value = METADATA[line] if line < len(METADATA) else (f"#Field {line}", "")
+            writer.writerow([key, "", value.format(participant="P1", recording_time="")]
+                            + [""] * (width - 3))
+        pd.DataFrame(data)[WEB_EXPORT_COLUMNS].to_csv(file, index=False, lineterminator="\n")
+    return n
+
+
+def write_screenshots(folder, urls, heights, width=1920, seed=0) -> list:
+    """
+    Writes a tall page screenshot for every URL in
+    ``folder/<page folder>/webpage_screenshot.png`` and the
+    screenshot_data.csv that lists them
+    ---
+    Returns
+    ---
+        paths(list) one screenshot path per URL
+    """
+    paths = []
+    for index, (url, height) in enumerate(zip(urls, heights)):
+        page_dir = os.path.join(folder, page_folder(url))
+        os.makedirs(page_dir, exist_ok=True)
+        path = os.path.join(page_dir, "webpage_screenshot.png")
+        cv2.imwrite(path, _page(width, height, seed + index))
+        paths.append(path)
+    pd.DataFrame(
+        {"URL": urls, "Image_Path": [os.path.relpath(path, os.path.dirname(folder)) for path in paths]}
+    ).to_csv(os.path.join(folder, "screenshot_data.csv"), index=False)
+    return paths
+
+
+def generate_web_session(folder, pages=3, seconds=300.0, screenshot_height=6000,
+                         event_rate=60, gaze_rate=60, seed=0) -> dict:
+    """
+    Writes a complete website session in ``folder``: the scroll log, the
+    eye tracking export and a screenshot of every page
+    ---
+    Returns
+    ---
+        session(dict) the paths of the files and the number of events
+        and samples written
+    """
+    os.makedirs(folder, exist_ok=True)
+    urls = [f"https://www.example.ac.uk/page-{index}" for index in range(pages)]
+    heights = [screenshot_height] * pages
+    web_path = os.path.join(folder, "scroll_data.csv")
+    imotions_path = os.path.join(folder, "imotions.csv")
+    events = write_web_log(web_path, urls, seconds=seconds, event_rate=event_rate,
+                           page_heights=heights, seed=seed)
+    samples = write_eye_tracking_export(imotions_path, seconds=seconds, gaze_rate=gaze_rate,
+                                        seed=seed)
+    screenshots = write_screenshots(os.path.join(folder, "web_pages"), urls, heights, seed=seed)
+    return {
+        "web_data": web_path,
+        "imotions_data": imotions_path,
+        "urls": urls,
+        "screenshots": screenshots,
+        "events": events,
+        "samples": samples,
+    }
@@ -0,0 +1,277 @@
+"""
+alignment.py
+
+This module contains the time alignment helpers shared by the website,
+image and video experiments. Every function works on sorted int64
+nanosecond arrays and returns index arrays, so callers can gather the
+columns they need with ``take`` instead of merging whole dataframes.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+NO_MATCH = -1
+
+DIRECTIONS = ("backward", "forward", "nearest")
+
+
+def to_ns(values) -> np.ndarray:
+    """
+    Converts datetime-like values into int64 nanoseconds since the epoch,
+    timezone-aware values are converted to UTC first
+    ---
+    Args
+    ---
+        values(array-like) datetimes, strings or a datetime Series
+    ---
+    Returns
+    ---
+        times(np.ndarray) int64 nanoseconds, NaT becomes the int64 minimum
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(values))
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return index.as_unit("ns").asi8
+
+
+def ms_to_ns(values) -> np.ndarray:
+    """
+    Converts millisecond offsets (the iMotions ``Timestamp`` column)
+    into int64 nanoseconds
+    """
+    return np.round(np.asarray(values, dtype="float64") * 1e6).astype("int64")
+
+
+def offset_times(times, offset) -> np.ndarray:
+    """
+    Shifts a time array by a constant clock offset
+    ---
+    Args
+    ---
+        times(np.ndarray) int64 nanoseconds
+        offset(int) nanoseconds to add to every value
+    ---
+    Returns
+    ---
+        times(np.ndarray) the shifted int64 array
+    """
+    return np.asarray(times, dtype="int64") + np.int64(offset)
+
+
+def correct_drift(times, source_anchor, target_anchor, rate=1.0) -> np.ndarray:
+    """
+    Maps times from one clock to another using a linear drift model,
+    ``target_anchor + (times - source_anchor) * rate``. With ``rate=1``
+    this is a constant clock offset.
+
+    The subtraction is done in int64 before scaling so epoch
+    nanoseconds don't lose precision in float64.
+    ---
+    Args
+    ---
+        times(np.ndarray) int64 nanoseconds on the source clock
+        source_anchor(int) a reference instant on the source clock
+        target_anchor(int) the same instant on the target clock
+        rate(float) target clock ticks per source clock tick
+    ---
+    Returns
+    ---
+        times(np.ndarray) int64 nanoseconds on the target clock
+    """
+    elapsed = np.asarray(times, dtype="int64") - np.int64(source_anchor)
+    if rate != 1.0:
+        elapsed = np.round(elapsed * rate).astype("int64")
+    return elapsed + np.int64(target_anchor)
+
+
+def estimate_drift(source_points, target_points):
+    """
+    Estimates the linear drift between two clocks from pairs of
+    matching events (e.g. sync pulses seen by both devices)
+    ---
+    Args
+    ---
+        source_points(array-like) int64 nanoseconds on the source clock
+        target_points(array-like) the same events on the target clock
+    ---
+    Returns
+    ---
+        (source_anchor, target_anchor, rate) to pass to ``correct_drift``
+    ---
+    Raises
+    ---
+        ValueError: if no points or unequal lengths are given
+    """
+    source = np.asarray(source_points, dtype="int64")
+    target = np.asarray(target_points, dtype="int64")
+    if source.size == 0 or source.size != target.size:
+        raise ValueError("Need the same, non zero, number of points on both clocks")
+    if source.size == 1:
+        return int(source[0]), int(target[0]), 1.0
+    # fit on offsets from the first pair to keep the numbers small
+    rate, intercept = np.polyfit(
+        (source - source[0]).astype("float64"), (target - target[0]).astype("float64"), 1
+    )
+    return int(source[0]), int(target[0] + np.round(intercept)), float(rate)
+
+
+def asof_indices(left, right, direction="backward", tolerance=None) -> np.ndarray:
+    """
+    Finds, for every time in ``left``, the matching row of ``right``.
+    This is the index array equivalent of ``pd.merge_asof``, ``left``
+    does not need to be sorted but ``right`` does.
+    ---
+    Args
+    ---
+        left(np.ndarray) int64 times to look up
+        right(np.ndarray) sorted int64 times to match against
+        direction(str) "backward", "forward" or "nearest"
+        tolerance(int) maximum distance in nanoseconds, None for no limit
+    ---
+    Returns
+    ---
+        indices(np.ndarray) positions into ``right``, NO_MATCH where
+        nothing was found within the tolerance
+    ---
+    Raises
+    ---
+        ValueError: if the direction is unknown
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {DIRECTIONS}")
+    left = np.asarray(left, dtype="int64")
+    right = np.asarray(right, dtype="int64")
+    if right.size == 0:
+        return np.full(left.shape, NO_MATCH, dtype="int64")
+
+    # last right <= left
+    backward = np.searchsorted(right, left, side="right") - 1
+    # first right >= left
+    forward = np.searchsorted(right, left, side="left")
+    forward[forward == right.size] = NO_MATCH
+
+    if direction == "backward":
+        indices = backward
+    elif direction == "forward":
+        indices = forward
+    else:
+        back_distance = np.where(
+            backward >= 0, left - right[np.maximum(backward, 0)], np.iinfo("int64").max
+        )
+        forward_distance = np.where(
+            forward >= 0, right[np.maximum(forward, 0)] - left, np.iinfo("int64").max
+        )
+        # ties go backward, like merge_asof
+        indices = np.where(back_distance <= forward_distance, backward, forward)
+
+    if tolerance is not None:
+        valid = indices >= 0
+        distance = np.abs(left - right[np.maximum(indices, 0)])
+        indices = np.where(valid & (distance <= tolerance), indices, NO_MATCH)
+    return indices.astype("int64")
+
+
+def take(values, indices, fill_value=np.nan) -> np.ndarray:
+    """
+    Gathers ``values`` at ``indices`` and fills NO_MATCH positions
+    ---
+    Args
+    ---
+        values(array-like) the column to gather from
+        indices(np.ndarray) output of ``asof_indices``
+        fill_value(object) value used where there was no match
+    ---
+    Returns
+    ---
+        gathered(np.ndarray) one value per index
+    """
+    values = np.asarray(values)
+    missing = indices < 0
+    if not missing.any():
+        return values[indices]
+    if values.dtype.kind in "iub":
+        values = values.astype("float64")
+    gathered = values[np.maximum(indices, 0)]
+    gathered[missing] = fill_value
+    return gathered
+
+
+def bin_indices(times, edges) -> np.ndarray:
+    """
+    Finds the bin ``[edges[i], edges[i + 1])`` that contains every time,
+    e.g. the video frame on screen when a sample was recorded
+    ---
+    Args
+    ---
+        times(np.ndarray) int64 times to assign
+        edges(np.ndarray) sorted int64 bin edges, one more than the bins
+    ---
+    Returns
+    ---
+        bins(np.ndarray) bin positions, NO_MATCH outside of the edges
+    """
+    times = np.asarray(times, dtype="int64")
+    edges = np.asarray(edges, dtype="int64")
+    bins = np.searchsorted(edges, times, side="right") - 1
+    bins[(bins < 0) | (bins >= edges.size - 1)] = NO_MATCH
+    return bins
+
+
+def bin_reduce(bins, values, n_bins, how="mean") -> np.ndarray:
+    """
+    Reduces the values that fall in each bin with a single grouped pass,
+    missing values are ignored and empty bins are NaN
+    ---
+    Args
+    ---
+        bins(np.ndarray) output of ``bin_indices``
+        values(np.ndarray) samples, one row per bin index and one column
+        per channel (1-D arrays are treated as one channel)
+        n_bins(int) number of bins
+        how(str) "mean", "sum", "max" or "count"
+    ---
+    Returns
+    ---
+        reduced(np.ndarray) float64 array of shape (n_bins, n_channels)
+    ---
+    Raises
+    ---
+        ValueError: if the reduction is unknown
+    """
+    if how not in ("mean", "sum", "max", "count"):
+        raise ValueError(f"Unknown reduction {how}")
+    values = np.asarray(values, dtype="float64")
+    if values.ndim == 1:
+        values = values[:, None]
+    matched = bins >= 0
+    bins, values = bins[matched], values[matched]
+
+    reduced = np.full((n_bins, values.shape[1]), np.nan)
+    for column in range(values.shape[1]):
+        present = ~np.isnan(values[:, column])
+        column_bins = bins[present]
+        column_values = values[present, column]
+        counts = np.bincount(column_bins, minlength=n_bins)
+        filled = counts > 0
+        if how == "count":
+            reduced[:, column] = counts
+        elif how == "max":
+            # sort by bin, then reduce each contiguous run
+            order = np.argsort(column_bins, kind="stable")
+            starts = np.flatnonzero(np.r_[True, np.diff(column_bins[order]) != 0])
+            if column_values.size:
+                reduced[column_bins[order][starts], column] = np.maximum.reduceat(
+                    column_values[order], starts
+                )
+        else:
+            sums = np.bincount(column_bins, weights=column_values, minlength=n_bins)
+            if how == "sum":
+                reduced[filled, column] = sums[filled]
+            else:
+                reduced[filled, column] = sums[filled] / counts[filled]
+    return reduced
@@ -0,0 +1,300 @@
+"""
+aoi.py
+
+This module contains the areas of interest (AOI) scoring: regions of a
+stimulus such as the logo, the headline or the call to action, defined
+as rectangles or polygons per image or URL. The regions are rasterized
+once into integer label masks, then every gaze sample of the study is
+assigned to its region with a single lookup and the metrics of every
+region come from grouped reductions, so the cost doesn't grow with the
+number of regions.
+
+The definitions are stored as JSON, coordinates are in pixels of the
+stimulus and a region listed later is on top of the earlier ones:
+
+    {
+        "1019_3.95": {
+            "size": [1024, 768],
+            "aois": [
+                {"name": "logo", "rect": [0, 0, 200, 100]},
+                {"name": "cta", "polygon": [[600, 500], [900, 500], [750, 700]]}
+            ]
+        }
+    }
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import json
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from emotiongsr import alignment
+from emotiongsr.fixations import detect_fixations
+
+NO_AOI = -1
+
+# Seconds per row of the get_clean_data frame
+SAMPLE_DURATION = 0.01
+
+
+def rasterize(aois, size) -> np.ndarray:
+    """
+    Draws the regions of one stimulus into a label mask
+    ---
+    Args
+    ---
+        aois(list) dicts with a name and either "rect" [x0, y0, x1, y1]
+        or "polygon" [[x, y], ...], in pixels
+        size(tuple) width and height of the stimulus
+    ---
+    Returns
+    ---
+        labels(np.ndarray) int32 array of shape (height, width), the
+        position of the region in ``aois`` for every pixel, NO_AOI outside
+    ---
+    Raises
+    ---
+        ValueError: if a region has neither a rect nor a polygon
+    """
+    width, height = size
+    labels = np.full((height, width), NO_AOI, dtype="int32")
+    for label, aoi in enumerate(aois):
+        if "rect" in aoi:
+            x0, y0, x1, y1 = np.round(aoi["rect"]).astype("int64")
+            labels[max(y0, 0) : max(y1, 0), max(x0, 0) : max(x1, 0)] = label
+        elif "polygon" in aoi:
+            points = np.round(np.asarray(aoi["polygon"], dtype="float64")).astype("int32")
+            cv2.fillPoly(labels, [points.reshape(-1, 1, 2)], label)
+        else:
+            raise ValueError(f"AOI {aoi.get('name')} needs a rect or a polygon")
+    return labels
+
+
+class AOIMap:
+    """
+    The label masks of every stimulus of a study, stored one after the
+    other in a single flat array so samples of all the stimuli are
+    looked up at once.
+    """
+
+    def __init__(self, definitions):
+        """
+        ---
+        Args
+        ---
+            definitions(dict) stimulus name (or URL) to a dict with the
+            "size" of the stimulus and its "aois", see the module docstring
+        """
+        self.stimuli = list(definitions)
+        self.sizes = np.array(
+            [definitions[stimulus]["size"] for stimulus in self.stimuli], dtype="int64"
+        ).reshape(-1, 2)
+        masks, rows, first_id = [], [], 0
+        for stimulus in self.stimuli:
+            aois = definitions[stimulus]["aois"]
+            mask = rasterize(aois, definitions[stimulus]["size"])
+            areas = np.bincount(mask[mask >= 0].ravel(), minlength=len(aois))
+            # ids unique across the study
+            masks.append(np.where(mask >= 0, mask + first_id, NO_AOI).ravel())
+            for label, aoi in enumerate(aois):
+                rows.append((first_id + label, stimulus, aoi["name"], int(areas[label])))
+            first_id += len(aois)
+        self.labels = np.concatenate(masks) if masks else np.empty(0, dtype="int32")
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes.prod(axis=1))])[:-1]
+        self.aois = pd.DataFrame(rows, columns=["AOI_ID", "SourceStimuliName", "AOI", "Area"])
+
+    @classmethod
+    def from_json(cls, path):
+        """Loads the definitions from a JSON file"""
+        with open(path, encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def __len__(self):
+        return len(self.aois)
+
+    def _codes(self, stimuli):
+        return pd.Categorical(np.asarray(stimuli), categories=self.stimuli).codes.astype("int64")
+
+    def size_of(self, stimuli) -> tuple:
+        """Width and height of the stimulus of every sample, 0 for unknown stimuli"""
+        return self._sizes(self._codes(stimuli))
+
+    def _sizes(self, codes):
+        known = codes >= 0
+        sizes = self.sizes[np.maximum(codes, 0)]
+        return np.where(known, sizes[:, 0], 0), np.where(known, sizes[:, 1], 0)
+
+    def lookup(self, stimuli, x, y, normalized=True) -> np.ndarray:
+        """
+        Finds the region of every sample
+        ---
+        Args
+        ---
+            stimuli(array-like) the stimulus of every sample
+            x(array-like) horizontal gaze positions
+            y(array-like) vertical gaze positions
+            normalized(bool) whether the positions are normalised to
+            [0, 1] (get_clean_data's norm_x/norm_y) or in pixels
+        ---
+        Returns
+        ---
+            aoi_ids(np.ndarray) the AOI_ID of every sample, NO_AOI for
+            samples outside of every region, of other stimuli or without gaze
+        """
+        codes = self._codes(stimuli)
+        if self.labels.size == 0:
+            return np.full(codes.shape, NO_AOI, dtype="int64")
+        x = np.asarray(x, dtype="float64")
+        y = np.asarray(y, dtype="float64")
+        known = codes >= 0
+        widths, heights = self._sizes(codes)
+        if normalized:
+            x, y = x * widths, y * heights
+        inside = known & (x >= 0) & (x < widths) & (y >= 0) & (y < heights)
+        # NaN gaze fails the comparisons above
+        column = np.where(inside, x, 0).astype("int64")
+        row = np.where(inside, y, 0).astype("int64")
+        positions = np.where(inside, self.offsets[np.maximum(codes, 0)] + row * widths + column, 0)
+        return np.where(inside, self.labels[positions], NO_AOI).astype("int64")
+
+
+def aoi_metrics(aoi_map, stimuli, participants, x, y, values=None, normalized=True,
+                sample_duration=SAMPLE_DURATION, fixations=None) -> pd.DataFrame:
+    """
+    Scores every region for every participant: dwell time, samples,
+    entries (visits), fixations and the mean of every channel while
+    looking at it.
+    The samples must be in time order within each participant and stimulus.
+    ---
+    Args
+    ---
+        aoi_map(AOIMap) the regions
+        stimuli(array-like) the stimulus (or URL) of every sample
+        participants(array-like) the participant of every sample
+        x, y(array-like) gaze positions, see ``AOIMap.lookup``
+        values(pd.DataFrame) channels to average, one row per sample
+        normalized(bool) see ``AOIMap.lookup``
+        sample_duration(float or array-like) seconds per sample, or the
+        duration of every sample for irregular data such as web events
+        fixations(pd.DataFrame) one row per fixation with the
+        SourceStimuliName, Participant, X and Y of its centroid, in the
+        units of x and y, None to leave the Fixations column out
+    ---
+    Returns
+    ---
+        metrics(pd.DataFrame) one row per region and participant with
+        SourceStimuliName, AOI, Participant, Dwell_Time, Samples, Entries,
+        Fixations and Mean_<channel> columns
+    """
+    aoi_ids = aoi_map.lookup(stimuli, x, y, normalized=normalized)
+    participant_codes, participant_names = pd.factorize(np.asarray(participants))
+    stimulus_codes, _ = pd.factorize(np.asarray(stimuli))
+    n_participants, n_aois = len(participant_names), len(aoi_map)
+
+    # an entry is the first sample of a run in the same region, samples
+    # without gaze don't break the run
+    tracked = np.flatnonzero(np.isfinite(np.asarray(x, dtype="float64"))
+                             & np.isfinite(np.asarray(y, dtype="float64")))
+    ids, people, shown = aoi_ids[tracked], participant_codes[tracked], stimulus_codes[tracked]
+    new_run = np.zeros(aoi_ids.shape, dtype=bool)
+    new_run[tracked] = np.r_[True, (ids[1:] != ids[:-1]) | (people[1:] != people[:-1])
+                             | (shown[1:] != shown[:-1])][: tracked.size]
+    groups = np.where(aoi_ids >= 0, aoi_ids * n_participants + participant_codes, alignment.NO_MATCH)
+    found = groups >= 0
+    n_groups = n_aois * n_participants
+    samples = np.bincount(groups[found], minlength=n_groups)
+    if np.ndim(sample_duration):
+        durations = np.asarray(sample_duration, dtype="float64")[found]
+        dwell_time = np.bincount(groups[found], weights=durations, minlength=n_groups)
+    else:
+        dwell_time = samples * sample_duration
+    entries = np.bincount(groups[found & new_run], minlength=n_groups)
+
+    metrics = {
+        "AOI_ID": np.repeat(np.arange(n_aois), n_participants),
+        "Participant": np.tile(np.asarray(participant_names, dtype=object), n_aois),
+        "Dwell_Time": dwell_time,
+        "Samples": samples,
+        "Entries": entries,
+    }
+    if fixations is not None:
+        # a fixation counts for the region its centroid is in
+        fixation_ids = aoi_map.lookup(
+            fixations["SourceStimuliName"].to_numpy(),
+            fixations["X"].to_numpy(),
+            fixations["Y"].to_numpy(),
+            normalized=normalized,
+        )
+        fixation_people = pd.Index(participant_names).get_indexer(
+            fixations["Participant"].to_numpy()
+        )
+        fixation_groups = fixation_ids * n_participants + fixation_people
+        counted = (fixation_ids >= 0) & (fixation_people >= 0)
+        metrics["Fixations"] = np.bincount(fixation_groups[counted], minlength=n_groups)
+    if values is not None and len(values.columns):
+        means = alignment.bin_reduce(
+            groups, values.to_numpy(dtype="float64"), n_groups, how="mean"
+        )
+        for position, channel in enumerate(values.columns):
+            metrics[f"Mean_{channel}"] = means[:, position]
+    metrics = pd.DataFrame(metrics)
+    return aoi_map.aois.merge(metrics, on="AOI_ID")
+
+
+def study_aoi_metrics(data, aoi_map, channels=None, sample_duration=SAMPLE_DURATION,
+                      fixations="ivt") -> pd.DataFrame:
+    """
+    Scores the regions on the frame returned by ``get_clean_data``, rows
+    without gaze are left out
+    ---
+    Args
+    ---
+        data(pd.DataFrame) the clean data, with norm_x and norm_y
+        aoi_map(AOIMap) the regions, keyed by stimulus name
+        channels(list) the columns to average, the numeric columns by default
+        sample_duration(float) seconds per row
+        fixations(str) "ivt" or "idt" to count the fixations of every
+        region, see ``fixations.detect_fixations``, None to skip them
+    ---
+    Returns
+    ---
+        metrics(pd.DataFrame) see ``aoi_metrics``
+    """
+    if channels is None:
+        excluded = {"norm_x", "norm_y", "ET_GazeLeftx", "ET_GazeLefty", "ET_GazeRightx",
+                    "ET_GazeRighty"}
+        channels = [
+            column for column in data.select_dtypes("number").columns if column not in excluded
+        ]
+    x, y = data["norm_x"].to_numpy(), data["norm_y"].to_numpy()
+    found = None
+    if "ET_GazeLeftx" in data.columns:
+        # get_clean_data turns missing gaze into 0
+        missing = data[["ET_GazeLeftx", "ET_GazeRightx"]].isna().any(axis=1).to_numpy()
+        x = np.where(missing, np.nan, x)
+        if fixations is not None:
+            # detected in screen pixels, the mean of norm_x and norm_y over
+            # the fixation is its centroid in the units of x and y
+            found = detect_fixations(
+                data, fixations, channels=["norm_x", "norm_y"],
+                by=["SourceStimuliName", "Participant"],
+            )
+            found = found[["SourceStimuliName", "Participant"]].assign(
+                X=found["norm_x"], Y=found["norm_y"]
+            )
+    return aoi_metrics(
+        aoi_map,
+        data["SourceStimuliName"].to_numpy(),
+        data["Participant"].to_numpy(),
+        x,
+        y,
+        values=data[channels],
+        sample_duration=sample_duration,
+        fixations=found,
+    )
@@ -0,0 +1,167 @@
+"""
+cache.py
+
+This module contains the on-disk cache of the density grids behind the
+heatmaps (the blurred gaze mask of ``generate_heatmap``, the weighted
+points of ``generate_emotion_heatmap``). A grid is stored as a
+compressed .npz, float32 by default, named after a hash of everything
+it depends on: the fingerprint of the rows and columns it was computed
+from, the stimulus, emotion, signal and kernel parameters. Asking again for the
+same heatmap, or restyling it (colour map, opacity), loads the grid
+instead of splatting and blurring every point again. When the folder
+grows over its size budget the least recently used grids are removed.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Folder of the cache, inside the output folder of the clean data
+CACHE_DIR = ".heatmaps"
+
+# Bytes on disk before the least recently used grids are removed
+CACHE_BUDGET = 256 * 2**20
+
+
+def fingerprint(data) -> str:
+    """
+    Hash of the values and column names of a dataframe, it changes when
+    any of the rows used for a grid change
+    ---
+    Args
+    ---
+        data(pd.DataFrame) the rows and columns a grid is computed from
+    ---
+    Returns
+    ---
+        fingerprint(str) hex digest
+    """
+    digest = hashlib.sha256(json.dumps([str(column) for column in data.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class DensityCache:
+    """
+    A folder of float32 density grids with a size budget, a grid is used
+    again only when every part of its key is the same.
+    """
+
+    def __init__(self, folder=CACHE_DIR, budget=CACHE_BUDGET):
+        """
+        ---
+        Args
+        ---
+            folder(str) where the grids are stored, created when needed
+            budget(int) bytes kept on disk
+        """
+        self.folder = folder
+        self.budget = budget
+
+    @staticmethod
+    def key(**parts) -> str:
+        """Hash of the parts of a key, e.g. the fingerprint, stimulus and kernel size"""
+        encoded = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def __path(self, key):
+        return os.path.join(self.folder, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Loads a grid
+        ---
+        Args
+        ---
+            key(str) output of ``key``
+        ---
+        Returns
+        ---
+            grid(np.ndarray) the grid, None when it isn't cached
+        """
+        path = self.__path(key)
+        try:
+            with np.load(path) as stored:
+                grid = stored["grid"]
+            # the modification time orders the grids for eviction
+            os.utime(path)
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+        return grid
+
+    def put(self, key, grid, dtype="float32") -> None:
+        """Stores a grid, float32 by default, then evicts grids over the budget"""
+        os.makedirs(self.folder, exist_ok=True)
+        # written aside and renamed, so a reader never sees half a file
+        handle, temporary = tempfile.mkstemp(suffix=".tmp", dir=self.folder)
+        with os.fdopen(handle, "wb") as file:
+            np.savez_compressed(file, grid=np.asarray(grid, dtype=dtype))
+        os.replace(temporary, self.__path(key))
+        self.evict()
+
+    def get_or_compute(self, key, compute, dtype="float32") -> np.ndarray:
+        """
+        Loads a grid, or computes and stores it when it isn't cached
+        ---
+        Args
+        ---
+            key(str) output of ``key``
+            compute(callable) returns the grid
+            dtype(str) dtype the grid is stored as
+        ---
+        Returns
+        ---
+            grid(np.ndarray) the grid
+        """
+        grid = self.get(key)
+        if grid is None:
+            grid = np.asarray(compute(), dtype=dtype)
+            self.put(key, grid, dtype=dtype)
+        return grid
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used grids until the folder is within
+        the budget
+        ---
+        Returns
+        ---
+            removed(int) number of grids removed
+        """
+        entries = []
+        with os.scandir(self.folder) as scan:
+            for entry in scan:
+                if entry.name.endswith(".npz"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.budget:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Removes every grid"""
+        budget, self.budget = self.budget, -1
+        if os.path.isdir(self.folder):
+            self.evict()
+        self.budget = budget
@@ -0,0 +1,233 @@
+"""
+channelstore.py
+
+This module contains the channel store: the frame returned by
+``get_clean_data`` laid out on disk as one contiguous .npy file per
+channel (timestamps, gaze, every emotion and GSR signal) and an
+``index.json`` with the rows of every stimulus and participant. Worker
+processes open the files with ``np.load(mmap_mode="r")``, so they share
+a single copy of the study through the page cache instead of each one
+unpickling its own copy of the frame. A ``ChannelStore`` pickles as its
+folder, sending it to a worker is instant.
+
+    store = write_store(processor.get_clean_data(), "output/.channels")
+    data = store.frame("1019_3.95")  # the rows of one stimulus
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Folder of the store, inside the output folder of the clean data
+STORE_DIR = ".channels"
+
+INDEX_FILE = "index.json"
+
+TIME_FILE = "Timestamp.npy"
+
+KEY_COLUMNS = ["SourceStimuliName", "Participant"]
+
+
+def _file_name(position, channel):
+    # channel names have spaces and symbols, keep them readable but safe
+    return f"{position:03d}_{re.sub(r'[^0-9A-Za-z]+', '_', channel).strip('_')}.npy"
+
+
+def write_store(data, folder, channels=None, dtype="float64"):
+    """
+    Writes the clean data as a channel store, the rows are grouped by
+    stimulus and participant so each one is a contiguous slice
+    ---
+    Args
+    ---
+        data(pd.DataFrame) the output of get_clean_data
+        folder(str) where the files are written, created when needed
+        channels(list) the columns stored, the numeric ones by default
+        dtype(str) dtype of the channel files
+    ---
+    Returns
+    ---
+        store(ChannelStore) the store, opened read-only
+    """
+    if channels is None:
+        channels = list(data.select_dtypes("number").columns)
+    os.makedirs(folder, exist_ok=True)
+
+    # stable, so the samples stay in time order within each recording
+    keys = data[KEY_COLUMNS].astype(str)
+    order = np.lexsort((keys["Participant"].to_numpy(), keys["SourceStimuliName"].to_numpy()))
+    stimuli = keys["SourceStimuliName"].to_numpy()[order]
+    participants = keys["Participant"].to_numpy()[order]
+    boundaries = np.flatnonzero(
+        np.r_[True, (stimuli[1:] != stimuli[:-1]) | (participants[1:] != participants[:-1])]
+    )
+    stops = np.r_[boundaries[1:], len(order)]
+
+    times = pd.DatetimeIndex(data.index).as_unit("ns").asi8[order]
+    np.save(os.path.join(folder, TIME_FILE), times)
+    files = {}
+    for position, channel in enumerate(channels):
+        files[channel] = _file_name(position, channel)
+        np.save(
+            os.path.join(folder, files[channel]),
+            data[channel].to_numpy(dtype=dtype)[order],
+        )
+
+    index = {
+        "rows": int(len(order)),
+        "time": TIME_FILE,
+        "channels": files,
+        "segments": [
+            {
+                "SourceStimuliName": stimuli[start],
+                "Participant": participants[start],
+                "start": int(start),
+                "stop": int(stop),
+            }
+            for start, stop in zip(boundaries.tolist(), stops.tolist())
+        ],
+    }
+    # the index is written last, a store without it is incomplete
+    with open(os.path.join(folder, INDEX_FILE), "w", encoding="utf-8") as file:
+        json.dump(index, file, indent=2)
+    return ChannelStore(folder)
+
+
+class ChannelStore:
+    """
+    Read-only access to a channel store, every channel is memory mapped
+    the first time it is used.
+    """
+
+    def __init__(self, folder):
+        """
+        ---
+        Args
+        ---
+            folder(str) the folder written by ``write_store``
+        """
+        self.folder = folder
+        with open(os.path.join(folder, INDEX_FILE), encoding="utf-8") as file:
+            self.index = json.load(file)
+        self.segments = pd.DataFrame(
+            self.index["segments"], columns=KEY_COLUMNS + ["start", "stop"]
+        )
+        self._arrays = {}
+
+    def __getstate__(self):
+        # workers map the files again instead of receiving the data
+        return {"folder": self.folder}
+
+    def __setstate__(self, state):
+        self.__init__(state["folder"])
+
+    def __len__(self):
+        return self.index["rows"]
+
+    @property
+    def channels(self) -> list:
+        """Names of the stored channels"""
+        return list(self.index["channels"])
+
+    @property
+    def stimuli(self) -> list:
+        """Names of the stimuli, in store order"""
+        return list(dict.fromkeys(self.segments["SourceStimuliName"]))
+
+    def __map(self, file):
+        if file not in self._arrays:
+            self._arrays[file] = np.load(os.path.join(self.folder, file), mmap_mode="r")
+        return self._arrays[file]
+
+    def times(self) -> np.ndarray:
+        """int64 nanoseconds of every row, memory mapped"""
+        return self.__map(self.index["time"])
+
+    def channel(self, name) -> np.ndarray:
+        """
+        The values of a channel for every row
+        ---
+        Args
+        ---
+            name(str) the column name, e.g. "Joy"
+        ---
+        Returns
+        ---
+            values(np.memmap) read-only array, nothing is read until used
+        ---
+        Raises
+        ---
+            KeyError: if the channel isn't stored
+        """
+        return self.__map(self.index["channels"][name])
+
+    def __select(self, stimulus, participant):
+        segments = self.segments
+        if stimulus is not None:
+            segments = segments[segments["SourceStimuliName"] == str(stimulus)]
+        if participant is not None:
+            segments = segments[segments["Participant"] == str(participant)]
+        return segments
+
+    def rows(self, stimulus=None, participant=None) -> slice:
+        """
+        The rows of a stimulus and/or participant, a stimulus is always a
+        single slice, a participant across stimuli only when there's one
+        ---
+        Returns
+        ---
+            rows(slice) positions in every channel, empty when not found
+        ---
+        Raises
+        ---
+            ValueError: if the rows aren't contiguous
+        """
+        segments = self.__select(stimulus, participant)
+        if segments.empty:
+            return slice(0, 0)
+        starts, stops = segments["start"].to_numpy(), segments["stop"].to_numpy()
+        if (starts[1:] != stops[:-1]).any():
+            raise ValueError("The rows asked for aren't contiguous, select a stimulus")
+        return slice(int(starts[0]), int(stops[-1]))
+
+    def frame(self, stimulus=None, participant=None, channels=None) -> pd.DataFrame:
+        """
+        Copies some rows into a frame like the one of get_clean_data,
+        e.g. one stimulus for ``generate_heatmap``
+        ---
+        Args
+        ---
+            stimulus(str) the stimulus, every one by default
+            participant(str) the participant, every one by default
+            channels(list) the channels, every one by default
+        ---
+        Returns
+        ---
+            data(pd.DataFrame) the rows indexed by Timestamp with the
+            SourceStimuliName, Participant and channel columns
+        """
+        segments = self.__select(stimulus, participant)
+        starts, stops = segments["start"].to_numpy(), segments["stop"].to_numpy()
+        lengths = stops - starts
+        if (starts[1:] == stops[:-1]).all():
+            # a single slice of every file, only those pages are read
+            rows = slice(int(starts[0]), int(stops[-1])) if len(starts) else slice(0, 0)
+        else:
+            rows = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)])
+        data = {
+            column: np.repeat(segments[column].to_numpy(dtype=object), lengths)
+            for column in KEY_COLUMNS
+        }
+        for channel in channels or self.channels:
+            data[channel] = np.array(self.channel(channel)[rows])
+        return pd.DataFrame(
+            data, index=pd.DatetimeIndex(np.array(self.times()[rows]), name="Timestamp")
+        )
@@ -14,6 +14,8 @@ Colchester, Essex.
 
 import os
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 import cv2
 import numpy as np
@@ -23,6 +25,12 @@ import plotly.graph_objects as go
 from PIL import Image
 from plotly.subplots import make_subplots
 
+from emotiongsr import alignment, gsr, instrumentation
+from emotiongsr.cache import DensityCache, fingerprint
+from emotiongsr.channelstore import STORE_DIR, ChannelStore, write_store
+from emotiongsr.fixations import MIN_DURATION as FIXATION_MIN_DURATION
+from emotiongsr.fixations import detect_fixations
+
 warnings.filterwarnings("ignore")
 
 BASE_COLUMNS = [
@@ -72,6 +80,92 @@ EMOTIONS = [
 
 RECORDING_TIME_ROW = 8
 
+# Screen the gaze is recorded on, to normalise the gaze coordinates
+SCREEN_SIZE = (1920, 1080)
+
+# Radius of the circle drawn for every sample of a heatmap
+HEATMAP_RADIUS = 10
+
+# Kernel size and standard deviation of the heatmap blur
+HEATMAP_BLUR = ((13, 13), 11)
+
+
+def draw_heatmap_points(mask, norm_x, norm_y, intensity, radius=HEATMAP_RADIUS) -> np.ndarray:
+    """
+    Draws the samples of a heatmap on its mask, a filled circle per sample
+    with the intensity as the grey level. Later samples are drawn over
+    earlier ones, so drawing a recording in chunks as it arrives gives the
+    same mask as drawing it at once.
+    ---
+    Args
+    ---
+        mask(np.ndarray) uint8 image of the stimulus size, changed in place
+        norm_x(array-like) gaze x coordinates normalised to [0, 1]
+        norm_y(array-like) gaze y coordinates normalised to [0, 1]
+        intensity(array-like) values between 0 and 1, NaN counts as 0
+        radius(int or array-like) radius of the circles in pixels, or
+        one radius per sample
+    ---
+    Returns
+    ---
+        mask(np.ndarray) the same mask
+    """
+    height, width = mask.shape[:2]
+    # Normalize coordinates to match the image dimensions
+    x = (np.asarray(norm_x, dtype="float64") * width).astype("int64")
+    y = (np.asarray(norm_y, dtype="float64") * height).astype("int64")
+    # Use the intensity to set the color, assuming it's normalized between 0 and 1
+    levels = np.trunc(np.nan_to_num(np.asarray(intensity, dtype="float64")) * 255)
+    levels = np.clip(levels, 0, 255).astype("int64")
+    radii = np.broadcast_to(np.asarray(radius, dtype="int64"), x.shape)
+    for point_x, point_y, level, point_radius in zip(
+        x.tolist(), y.tolist(), levels.tolist(), radii.tolist()
+    ):
+        cv2.circle(mask, (point_x, point_y), point_radius, level, -1)
+    return mask
+
+
+def blur_heatmap(mask) -> np.ndarray:
+    """Smooths a heatmap mask drawn with ``draw_heatmap_points``"""
+    return cv2.GaussianBlur(mask, *HEATMAP_BLUR)
+
+
+def colour_heatmap(blurred, img, colormap=cv2.COLORMAP_JET, opacity=0.5) -> np.ndarray:
+    """
+    Colours a blurred heatmap mask and blends it with the stimulus image
+    ---
+    Args
+    ---
+        blurred(np.ndarray) the uint8 output of ``blur_heatmap``
+        img(np.ndarray) the BGR stimulus image
+        colormap(int) an OpenCV colour map
+        opacity(float) weight of the heatmap over the image
+    ---
+    Returns
+    ---
+        result_img(np.ndarray) the BGR heatmap over the image
+    """
+    heatmap_img = cv2.applyColorMap(blurred, colormap)
+    # Combine the original image with the blurred emotion mask
+    return cv2.addWeighted(heatmap_img, opacity, img, 1 - opacity, 0)
+
+
+def blend_heatmap(mask, img) -> np.ndarray:
+    """
+    Blurs a heatmap mask, colours it with the jet colormap and blends it
+    with the stimulus image
+    ---
+    Args
+    ---
+        mask(np.ndarray) the uint8 mask drawn with ``draw_heatmap_points``
+        img(np.ndarray) the BGR stimulus image
+    ---
+    Returns
+    ---
+        result_img(np.ndarray) the BGR heatmap over the image
+    """
+    return colour_heatmap(blur_heatmap(mask), img)
+
 
 class DataProcessor:
     """
@@ -83,10 +177,27 @@ class DataProcessor:
     further analysis can be made in pure Python.
     """
 
-    def __init__(self, imotions_path, output_path=None) -> None:
+    def __init__(self, imotions_path, output_path=None, cache_dir=None) -> None:
+        """
+        ---
+        Args
+        ---
+            imotions_path(str) folder of the iMotions exports
+            output_path(str) folder of the clean data
+            cache_dir(str) folder where the heatmap density grids are
+            cached, see ``emotiongsr.cache``, None to always compute them
+        """
         self.imotions_path = imotions_path
         self.output_path = output_path
         self.data_is_clean = False
+        self.cache = DensityCache(cache_dir) if cache_dir else None
+
+    def __density(self, compute, data, dtype="float32", **parts):
+        # the grid, from the cache when the rows and parameters are the same
+        if self.cache is None:
+            return compute()
+        key = self.cache.key(data=fingerprint(data), **parts)
+        return self.cache.get_or_compute(key, compute, dtype=dtype)
 
     def __load_raw_data(self):
         all_files = os.listdir(self.imotions_path)
@@ -118,6 +229,7 @@ class DataProcessor:
             dataframes[csv_file] = pd.read_csv(file_path)
         return dataframes
 
+    @instrumentation.traced("get_clean_data")
     def get_clean_data(self) -> pd.DataFrame:
         """
         This method loads the cleaned data from the folder, then
@@ -138,7 +250,9 @@ class DataProcessor:
             ValueError: if you havent called the method clean_files first
         """
 
-        raw_dataframes = self.__load_raw_data()
+        with instrumentation.span("read") as stage:
+            raw_dataframes = self.__load_raw_data()
+            stage.set(rows_out=sum(len(df) for df in raw_dataframes.values()))
         # get the first df
         start_times = []
         for _, df in raw_dataframes.items():
@@ -149,43 +263,54 @@ class DataProcessor:
         start_times.sort()
         if not self.data_is_clean:
             raise ValueError("Clean the data first")
-        dataframes = self.__load_clean_data()
-        i = 0
-        for _, df in dataframes.items():
-            # use the first start time in the first iteration
-            start_time = start_times[i]
-            df["Timestamp"] = start_time + (df["Timestamp"] * pd.to_timedelta(1, unit="ms"))
-            df.set_index("Timestamp", inplace=True)
-            i += 1
-        data = pd.DataFrame()
-        for _, df in dataframes.items():
-            data = pd.concat([data, df], axis=0)
-        # resample data for 0.5 second intervals, use the mean for numerical columns, and the first for categorical
-        # backwards fill the categorical columns
-        data["SourceStimuliName"] = data["SourceStimuliName"].ffill()
-        data = data.groupby(["SourceStimuliName", "Participant"]).resample("0.01s").mean()
-        # the inverse of groupby, reset_index
-        data = data.reset_index()
-        data = data.set_index("Timestamp")
+        with instrumentation.span("read") as stage:
+            dataframes = self.__load_clean_data()
+            n_rows = sum(len(df) for df in dataframes.values())
+            stage.set(rows_out=n_rows)
+        with instrumentation.span("align", rows_in=n_rows) as stage:
+            aligned = []
+            for df, start_time in zip(dataframes.values(), start_times):
+                # offsets in ms from the recording start time
+                times = alignment.correct_drift(
+                    alignment.ms_to_ns(df["Timestamp"]), 0, alignment.to_ns([start_time])[0]
+                )
+                df = df.drop(columns="Timestamp")
+                df.index = pd.DatetimeIndex(times, name="Timestamp")
+                aligned.append(df)
+            data = pd.concat(aligned, axis=0)
+            stage.set(rows_out=len(data))
+        with instrumentation.span("resample", rows_in=len(data)) as stage:
+            # resample data for 0.5 second intervals, use the mean for numerical columns, and the first for categorical
+            # backwards fill the categorical columns
+            data["SourceStimuliName"] = data["SourceStimuliName"].ffill()
+            data = data.groupby(["SourceStimuliName", "Participant"]).resample("0.01s").mean()
+            # the inverse of groupby, reset_index
+            data = data.reset_index()
+            data = data.set_index("Timestamp")
+            stage.set(rows_out=len(data))
 
         if "ET_GazeLeftx" in data.columns:
             # Calculate the normalized x and y coordinates
             data["norm_x"] = (
-                np.nan_to_num(((data["ET_GazeLeftx"] + data["ET_GazeRightx"]) / 2)) / 1920
+                np.nan_to_num(((data["ET_GazeLeftx"] + data["ET_GazeRightx"]) / 2)) / SCREEN_SIZE[0]
             )
             data["norm_y"] = (
-                np.nan_to_num(((data["ET_GazeLefty"] + data["ET_GazeRighty"]) / 2)) / 1080
+                np.nan_to_num(((data["ET_GazeLefty"] + data["ET_GazeRighty"]) / 2)) / SCREEN_SIZE[1]
             )
         else:
             data["norm_x"] = np.random.rand(len(data))
             data["norm_y"] = np.random.rand(len(data))
         return data
 
-    def __clean_single_file(self, df, filename):
+    def __clean_single_file(self, df, filename, gsr_method=None):
         df = df[df[df[0] == "Row"].index[0] :]
         df = df.reset_index(drop=True)
         df.columns = df.iloc[0].tolist()
         df = df[1:]
+        if gsr_method is not None:
+            # on the whole recording, before it's cut to the stimuli
+            with instrumentation.span("decompose", rows_in=len(df)):
+                df = gsr.add_components(df, method=gsr_method)
         df["SlideEvent"] = df["SlideEvent"].ffill()
         df = df.loc[df.SlideEvent == "StartMedia"]
         # Drop columns if they exist in the DataFrame
@@ -195,16 +320,54 @@ class DataProcessor:
         df["Participant"] = filename
         return df
 
-    def clean_files(self, columns_to_keep: list = None) -> None:
+    def _clean_file(self, file, columns_to_keep, gsr_method):
+        # Cleans one export, run in a worker process when n_jobs > 1
+        file_path = os.path.join(self.imotions_path, file)
+        try:
+            with instrumentation.span("read", file=file) as stage:
+                df = pd.read_csv(file_path, header=None, low_memory=False)
+                stage.set(rows_out=len(df))
+        except pd.errors.ParserError as e:
+            print("Error", f"Error reading CSV file: {file_path}\n{e}")
+            return
+
+        filename = file.split(".")[0].split("_")[1]
+        with instrumentation.span("clean", file=file, rows_in=len(df)) as stage:
+            cleaned_df = self.__clean_single_file(df, filename, gsr_method)
+            stage.set(rows_out=len(cleaned_df))
+
+        if cleaned_df is not None:
+            # Keep only the columns that exist in the DataFrame
+            existing_columns = [col for col in columns_to_keep if col in cleaned_df.columns]
+
+            # If any columns are missing, print a message or log it
+            missing_columns = [col for col in columns_to_keep if col not in cleaned_df.columns]
+            if missing_columns:
+                print(f"Warning: Missing columns {missing_columns} in file {file}")
+
+            cleaned_df = cleaned_df[existing_columns]
+            cleaned_csv_filename = f"{filename}_cleaned.csv"
+            cleaned_csv_path = os.path.join(self.output_path, cleaned_csv_filename)
+            with instrumentation.span("write", file=file, rows_in=len(cleaned_df)):
+                cleaned_df.to_csv(cleaned_csv_path, index=False)
+
+    @instrumentation.traced("clean_files")
+    def clean_files(self, columns_to_keep: list = None, gsr_method="median", n_jobs=1) -> None:
         """
         This method will read all the csvs from iMotions and
         concatenate them, since there are many columns you can
-        choose which columns to include.
+        choose which columns to include. Exports with the skin
+        conductance but without the Tonic and Phasic signals get
+        them computed.
         ---
         Args
         ---
         columns_to_keep(list) A list containing the values you want
         to use for analysis
+        gsr_method(str) decomposition used for the missing Tonic and
+        Phasic signals, see ``gsr.decompose``, None to skip it
+        n_jobs(int) number of exports cleaned in parallel, None for
+        one per CPU
 
         ---
         Returns
@@ -215,73 +378,143 @@ class DataProcessor:
             columns_to_keep = BASE_COLUMNS
 
         os.makedirs(self.output_path, exist_ok=True)
-        for file in os.listdir(self.imotions_path):
-            file_path = os.path.join(self.imotions_path, file)
-            if not file_path.endswith(".csv"):
-                continue
-            try:
-                df = pd.read_csv(file_path, header=None, low_memory=False)
-            except pd.errors.ParserError as e:
-                print("Error", f"Error reading CSV file: {file_path}\n{e}")
-                continue
-
-            filename = file.split(".")[0].split("_")[1]
-            cleaned_df = self.__clean_single_file(df, filename)
-
-            if cleaned_df is not None:
-                # Keep only the columns that exist in the DataFrame
-                existing_columns = [col for col in columns_to_keep if col in cleaned_df.columns]
-
-                # If any columns are missing, print a message or log it
-                missing_columns = [col for col in columns_to_keep if col not in cleaned_df.columns]
-                if missing_columns:
-                    print(f"Warning: Missing columns {missing_columns} in file {file}")
-
-                cleaned_df = cleaned_df[existing_columns]
-                cleaned_csv_filename = f"{filename}_cleaned.csv"
-                cleaned_csv_path = os.path.join(self.output_path, cleaned_csv_filename)
-                cleaned_df.to_csv(cleaned_csv_path, index=False)
+        files = [file for file in os.listdir(self.imotions_path) if file.endswith(".csv")]
+        if n_jobs is None:
+            n_jobs = os.cpu_count() or 1
+        if n_jobs == 1 or len(files) < 2:
+            for file in files:
+                self._clean_file(file, columns_to_keep, gsr_method)
+        else:
+            # one participant per process
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(files))) as executor:
+                instrumentation.pool_map(
+                    executor, self._clean_file, files, repeat(columns_to_keep), repeat(gsr_method)
+                )
         self.data_is_clean = True
 
-    def generate_heatmap(self, data, value, image_subpath):
-        # Work on a copy of the dataframe
-        df = data.copy()
+    @instrumentation.traced("generate_heatmap")
+    def generate_heatmap(self, data, value, image_subpath, fixations=None,
+                         colormap=cv2.COLORMAP_JET, opacity=0.5):
+        """
+        Draws the value over the stimulus, a circle per gaze sample or,
+        with ``fixations``, a circle per fixation whose area grows with
+        its duration, longer fixations on top. With a cache the blurred
+        mask is reused, so restyling skips the drawing.
+        ---
+        Args
+        ---
+            data(pd.DataFrame) the output of get_clean_data
+            value(str) the column drawn, e.g. an emotion
+            image_subpath(str) path of the stimulus image
+            fixations(str) None for the raw samples, "ivt" or "idt" for
+            the fixations found by ``fixations.detect_fixations``
+            colormap(int) an OpenCV colour map
+            opacity(float) weight of the heatmap over the image
+        ---
+        Returns
+        ---
+            result_img(np.ndarray) the BGR heatmap over the image
+        """
         # use the image path to get the stimuli name
         image_name = image_subpath.split("/")[-1].replace(".jpg", "")
-        df = df[df["SourceStimuliName"] == image_name]
+        df = data[data["SourceStimuliName"] == image_name]
         # Load the image
         image_path = image_subpath
         img = cv2.imread(image_path)
-        # Create a mask image to draw the emotions on
-        emotion_mask = np.zeros_like(img)
-
-        for _, row in df.iterrows():
-            # Normalize coordinates to match the image dimensions
-            x = int(row["norm_x"] * img.shape[1])
-            y = int(row["norm_y"] * img.shape[0])
 
-            # Plot each emotion on the mask image
-            emotion_intensity = row[value]
-            if emotion_intensity is not None:
-                emotion_intensity = np.nan_to_num(emotion_intensity)
-                # Use the intensity to set the color (or you can use it to set the size of the circle)
-                intensity = int(
-                    emotion_intensity * 255
-                )  # Assuming the intensity is normalized between 0 and 1
-                color = (intensity, intensity, intensity)  # Grayscale intensity
-
-                # Draw a circle on the mask image
-                cv2.circle(emotion_mask, (x, y), 10, color, -1)
-
-        # Apply Gaussian blur to the emotion mask
-        blurred_emotion_mask = cv2.GaussianBlur(emotion_mask, (13, 13), 11)
+        def blurred_mask():
+            # Create a mask image to draw the emotions on
+            emotion_mask = np.zeros(img.shape[:2], dtype="uint8")
+            if fixations is None:
+                draw_heatmap_points(emotion_mask, df["norm_x"], df["norm_y"], df[value])
+            else:
+                with instrumentation.span("fixations", rows_in=len(df)) as stage:
+                    points = detect_fixations(df, fixations, channels=[value])
+                    points = points.sort_values("Duration", kind="stable")
+                    stage.set(rows_out=len(points))
+                radius = HEATMAP_RADIUS * np.sqrt(points["Duration"] / FIXATION_MIN_DURATION)
+                draw_heatmap_points(
+                    emotion_mask,
+                    points["X"] / SCREEN_SIZE[0],
+                    points["Y"] / SCREEN_SIZE[1],
+                    points[value],
+                    radius=np.rint(radius),
+                )
+            return blur_heatmap(emotion_mask)
+
+        columns = ["norm_x", "norm_y", value]
+        if fixations is not None:
+            columns += ["ET_GazeLeftx", "ET_GazeLefty", "ET_GazeRightx", "ET_GazeRighty"]
+        mask = self.__density(
+            blurred_mask,
+            df[columns].reset_index(),
+            kind="heatmap",
+            stimulus=image_name,
+            signal=value,
+            fixations=fixations,
+            shape=img.shape[:2],
+            radius=HEATMAP_RADIUS,
+            blur=HEATMAP_BLUR,
+        )
+        return colour_heatmap(np.asarray(mask, dtype="uint8"), img, colormap, opacity)
 
-        heatmap_img = cv2.applyColorMap(blurred_emotion_mask, cv2.COLORMAP_JET)
+    @instrumentation.traced("write_channel_store")
+    def write_channel_store(self, data, folder=None) -> ChannelStore:
+        """
+        Writes the clean data as memory mapped channels, see
+        ``emotiongsr.channelstore``, so render workers share one copy
+        ---
+        Args
+        ---
+            data(pd.DataFrame) the output of get_clean_data
+            folder(str) where the store is written, STORE_DIR in the
+            output path by default
+        ---
+        Returns
+        ---
+            store(ChannelStore) the store, opened read-only
+        """
+        return write_store(data, folder or os.path.join(self.output_path, STORE_DIR))
 
-        # Combine the original image with the blurred emotion mask
-        result_img = cv2.addWeighted(heatmap_img, 0.5, img, 0.5, 0)
+    def _render_heatmap(self, store, value, image_subpath, kwargs):
+        # Renders one stimulus in a worker, only its rows are read from the store
+        image_name = image_subpath.split("/")[-1].replace(".jpg", "")
+        return self.generate_heatmap(store.frame(image_name), value, image_subpath, **kwargs)
 
-        return result_img
+    @instrumentation.traced("generate_heatmaps")
+    def generate_heatmaps(self, store, value, image_subpaths, n_jobs=1, **kwargs) -> list:
+        """
+        Generates the heatmap of several stimuli, in parallel the workers
+        map the channel store instead of receiving a copy of the data
+        ---
+        Args
+        ---
+            store(ChannelStore) the output of write_channel_store
+            value(str) the column drawn, e.g. an emotion
+            image_subpaths(list) paths of the stimulus images
+            n_jobs(int) number of processes, None for one per CPU
+            **kwargs: passed to ``generate_heatmap``
+        ---
+        Returns
+        ---
+            images(list) the BGR heatmap of every image, in order
+        """
+        if n_jobs is None:
+            n_jobs = os.cpu_count() or 1
+        if n_jobs == 1 or len(image_subpaths) < 2:
+            return [
+                self._render_heatmap(store, value, image_subpath, kwargs)
+                for image_subpath in image_subpaths
+            ]
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(image_subpaths))) as executor:
+            return instrumentation.pool_map(
+                executor,
+                self._render_heatmap,
+                repeat(store),
+                repeat(value),
+                image_subpaths,
+                repeat(kwargs),
+            )
 
     def __melt_emotions(self, data, value):
         df = data.copy()
@@ -308,29 +541,62 @@ class DataProcessor:
 
         return df
 
-    def generate_emotion_heatmap(self, data, emotion, value, image_subpath):
-        df = data.copy()
-
+    @instrumentation.traced("generate_emotion_heatmap")
+    def generate_emotion_heatmap(self, data, emotion, value, image_subpath, opacity=0.9,
+                                 color_scale=None):
+        """
+        Contours of the emotion intensity weighted by the signal over the
+        stimulus, binned by plotly. With a cache the points of the contour
+        are reused, so restyling skips selecting and weighting the samples.
+        ---
+        Args
+        ---
+            data(pd.DataFrame) the output of get_clean_data
+            emotion(str) the emotion drawn
+            value(str) the signal weighting the emotion, e.g. "GSR Raw"
+            image_subpath(str) path of the stimulus image
+            opacity(float) opacity of the contours
+            color_scale(list) plotly colour scale, by default transparent
+            to red, or blue to red around 0 for the phasic signal
+        ---
+        Returns
+        ---
+            fig(plotly.graph_objects.Figure) the heatmap figure
+        """
         # use the image path to get the stimuli name
         image_name = image_subpath.split("/")[-1].replace(".jpg", "")
-        df = df[df["SourceStimuliName"] == image_name]
-
-        # make an index column
-        df = df.reset_index()
-        df["index"] = df.index
-
-        # melt emotions
-        df = self.__melt_emotions(df, value)
+        df = data[data["SourceStimuliName"] == image_name]
 
         # Load the image
         image_path = image_subpath
 
         img = Image.open(image_path)
 
-        df["norm_x"] = df["norm_x"] * img.size[0]
-        df["norm_y"] = df["norm_y"] * img.size[1]
+        def emotion_points():
+            # the samples with the emotion, in order, as the melted rows
+            shown = df[emotion].notna().to_numpy()
+            return np.vstack(
+                [
+                    df["norm_x"].to_numpy(dtype="float64")[shown] * img.size[0],
+                    df["norm_y"].to_numpy(dtype="float64")[shown] * img.size[1],
+                    # Get intensity using GSR
+                    (df[value] * df[emotion]).to_numpy(dtype="float64")[shown],
+                ]
+            )
 
-        color_scale = [
+        # float64, plotly bins the exact points of the uncached plot
+        points_x, points_y, intensity = self.__density(
+            emotion_points,
+            df[["norm_x", "norm_y", emotion, value]],
+            dtype="float64",
+            kind="emotion_points",
+            stimulus=image_name,
+            emotion=emotion,
+            signal=value,
+            size=img.size,
+        )
+
+        default_scale = [
             [0.0, "rgba(0, 0, 255, 0)"],  # Transparent blue at the lowest value
             [0.2, "rgba(0, 0, 255, 0.2)"],  # Slightly opaque blue
             [0.4, "rgba(0, 255, 255, 0.4)"],  # Cyan
@@ -340,7 +606,7 @@ class DataProcessor:
         ]
         zmid = None
         if value == "Phasic Signal":
-            color_scale = [
+            default_scale = [
                 [
                     0.0,
                     "rgba(0, 0, 255, 1)",
@@ -357,20 +623,22 @@ class DataProcessor:
                 [1.0, "rgba(255, 0, 0, 1)"],  # Red at the largest positive value
             ]
             zmid = 0
+        if color_scale is None:
+            color_scale = default_scale
 
         fig = px.imshow(img)
         fig.add_trace(
             go.Histogram2dContour(
                 name=value,
-                x=df[df["Emotion"] == emotion]["norm_x"],
-                y=df[df["Emotion"] == emotion]["norm_y"],
-                z=df[df["Emotion"] == emotion]["intensity"],
+                x=points_x,
+                y=points_y,
+                z=intensity,
                 histfunc="sum",
                 colorscale=color_scale,
                 zmid=zmid,
                 ncontours=100,
                 line=dict(width=0),
-                opacity=0.9,
+                opacity=opacity,
                 contours=dict(coloring="heatmap", size=10),
                 # fill the contour in all the histogram
                 xaxis="x",
@@ -411,6 +679,7 @@ class DataProcessor:
         # fig.show()
         return fig
 
+    @instrumentation.traced("generate_emotion_gsr_plot")
     def generate_emotion_gsr_plot(self, data, emotion, value, image_subpath):
         df = data.copy()
 
@@ -550,6 +819,7 @@ class DataProcessor:
 
         return fig
 
+    @instrumentation.traced("get_all_emotion_heatmaps")
     def get_all_emotion_heatmaps(self, data, value, image_subpath):
         emotion_fig = []
         if value == "GSR Raw+Peak Detection" or value == "Phasic Signal+Peak Detection" or value == "Tonic Signal+Peak Detection"or value == "Emotion intensity+Peak Detection": 
@@ -0,0 +1,245 @@
+"""
+fixations.py
+
+This module contains the fixation detection: the gaze samples are grouped
+into fixations, so the heatmaps draw one weighted point per fixation
+instead of every raw sample, saccades included. Both classic detectors
+are written with NumPy run-length operations, without a Python loop over
+the samples.
+
+    - "ivt": velocity threshold, consecutive samples moving slower than
+      the threshold are a fixation
+    - "idt": dispersion threshold, samples inside a window of the minimum
+      fixation duration whose spread (x range + y range) stays below the
+      threshold are a fixation, overlapping windows are merged
+
+Gaze is in screen pixels and times in seconds, samples without gaze are
+skipped and a gap longer than ``MAX_GAP`` ends the fixation.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.ndimage import maximum_filter1d, minimum_filter1d, uniform_filter1d
+
+from emotiongsr import alignment
+
+METHODS = ("ivt", "idt")
+
+# Pixels per second, about 30 degrees per second at 60 cm from a 24" screen
+VELOCITY_THRESHOLD = 1000.0
+
+# Samples averaged before measuring the velocity, the noise reduction
+# of the Tobii I-VT filter
+VELOCITY_SMOOTHING = 3
+
+# Pixels, x range + y range, about 1.5 degrees
+DISPERSION_THRESHOLD = 60.0
+
+# Seconds, shorter runs aren't fixations
+MIN_DURATION = 0.1
+
+# Seconds without gaze (blinks, tracking loss) that end a fixation
+MAX_GAP = 0.075
+
+GAZE_X = ("ET_GazeLeftx", "ET_GazeRightx")
+
+GAZE_Y = ("ET_GazeLefty", "ET_GazeRighty")
+
+GROUP_COLUMNS = ("SourceStimuliName", "Participant")
+
+
+def _runs(mask) -> tuple:
+    """Start and stop (exclusive) of every run of True values"""
+    edges = np.diff(np.r_[0, np.asarray(mask, dtype="int8"), 0])
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _slow_steps(times, x, y, breaks, threshold, smoothing) -> np.ndarray:
+    # step i joins sample i and i + 1
+    if smoothing > 1 and x.size:
+        x = uniform_filter1d(x, smoothing, mode="nearest")
+        y = uniform_filter1d(y, smoothing, mode="nearest")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        velocity = np.hypot(np.diff(x), np.diff(y)) / np.diff(times)
+    return ~breaks & (velocity < threshold)
+
+
+def _compact_steps(times, x, y, breaks, threshold, min_duration) -> np.ndarray:
+    # windows of the minimum duration, in samples at the median rate
+    steps = np.diff(times)
+    step = np.median(steps[~breaks]) if (~breaks).any() else min_duration
+    window = max(int(round(min_duration / step)) + 1, 2)
+    n_windows = x.size - window + 1
+    if n_windows <= 0:
+        return np.zeros(breaks.shape, dtype=bool)
+
+    # range of every window starting at each sample
+    origin = -(window // 2)
+    spread = (
+        maximum_filter1d(x, window, origin=origin) - minimum_filter1d(x, window, origin=origin)
+        + maximum_filter1d(y, window, origin=origin) - minimum_filter1d(y, window, origin=origin)
+    )[:n_windows]
+    crossed = np.r_[0, np.cumsum(breaks)]
+    compact = (spread <= threshold) & (crossed[window - 1 :] - crossed[:n_windows] == 0)
+
+    # a step is in a fixation when a compact window covers it
+    cover = np.zeros(breaks.size + 1, dtype="int64")
+    starts = np.flatnonzero(compact)
+    np.add.at(cover, starts, 1)
+    np.add.at(cover, starts + window - 1, -1)
+    return np.cumsum(cover)[:-1] > 0
+
+
+def detect(times, x, y, segments=None, values=None, method="ivt",
+           velocity_threshold=VELOCITY_THRESHOLD, dispersion_threshold=DISPERSION_THRESHOLD,
+           min_duration=MIN_DURATION, max_gap=MAX_GAP,
+           velocity_smoothing=VELOCITY_SMOOTHING) -> dict:
+    """
+    Finds the fixations in gaze samples
+    ---
+    Args
+    ---
+        times(np.ndarray) seconds, increasing within each segment
+        x, y(np.ndarray) gaze position in pixels, NaN without gaze
+        segments(np.ndarray) integer code of the recording (e.g. stimulus
+        and participant) of every sample, fixations never cross segments
+        values(np.ndarray) channels averaged over every fixation, one row
+        per sample and one column per channel
+        method(str) "ivt" or "idt"
+        velocity_threshold(float) I-VT threshold in pixels per second
+        dispersion_threshold(float) I-DT threshold in pixels
+        min_duration(float) shortest fixation in seconds
+        max_gap(float) longest gap without gaze inside a fixation
+        velocity_smoothing(int) I-VT moving average, in samples
+    ---
+    Returns
+    ---
+        fixations(dict) arrays with one value per fixation: "first" and
+        "last" (positions of the first and last sample), "start",
+        "duration", "samples", "x", "y", "segment" and "values"
+    ---
+    Raises
+    ---
+        ValueError: if the method is unknown
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    times = np.asarray(times, dtype="float64")
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    if segments is None:
+        segments = np.zeros(times.shape, dtype="int64")
+    tracked = np.flatnonzero(np.isfinite(x) & np.isfinite(y) & np.isfinite(times))
+    t, gx, gy, codes = times[tracked], x[tracked], y[tracked], np.asarray(segments)[tracked]
+
+    breaks = (codes[1:] != codes[:-1]) | (np.diff(t) > max_gap) | (np.diff(t) <= 0)
+    if method == "ivt":
+        steps = _slow_steps(t, gx, gy, breaks, velocity_threshold, velocity_smoothing)
+    else:
+        steps = _compact_steps(t, gx, gy, breaks, dispersion_threshold, min_duration)
+
+    # a run of steps from sample first to sample last
+    first, last = _runs(steps)
+    duration = t[last] - t[first]
+    keep = duration >= min_duration
+    first, last, duration = first[keep], last[keep], duration[keep]
+    stop = last + 1
+
+    def run_mean(column):
+        present = np.isfinite(column)
+        sums = np.r_[0, np.cumsum(np.where(present, column, 0))]
+        counts = np.r_[0, np.cumsum(present)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (sums[stop] - sums[first]) / (counts[stop] - counts[first])
+
+    fixations = {
+        "first": tracked[first],
+        "last": tracked[last],
+        "start": t[first],
+        "duration": duration,
+        "samples": stop - first,
+        "x": run_mean(gx),
+        "y": run_mean(gy),
+        "segment": codes[first],
+        "values": np.empty((first.size, 0)),
+    }
+    if values is not None:
+        values = np.asarray(values, dtype="float64")
+        if values.ndim == 1:
+            values = values[:, None]
+        values = values[tracked]
+        fixations["values"] = np.column_stack(
+            [run_mean(values[:, column]) for column in range(values.shape[1])]
+        ).reshape(first.size, values.shape[1])
+    return fixations
+
+
+def _seconds(times) -> np.ndarray:
+    # datetimes, or the iMotions Timestamp in ms
+    if pd.api.types.is_datetime64_any_dtype(times):
+        return alignment.to_ns(times) / 1e9
+    return np.asarray(times, dtype="float64") / 1000.0
+
+
+def detect_fixations(data, method="ivt", channels=None, x_columns=GAZE_X, y_columns=GAZE_Y,
+                     time_column=None, by=None, **kwargs) -> pd.DataFrame:
+    """
+    Finds the fixations of a dataframe of gaze samples, e.g. a clean file
+    or the frame returned by ``get_clean_data``
+    ---
+    Args
+    ---
+        data(pd.DataFrame) the samples, in time order within each group
+        method(str) "ivt" or "idt"
+        channels(list) columns averaged over every fixation, e.g. emotions or GSR
+        x_columns(tuple) columns averaged into the gaze x, the two eyes by default
+        y_columns(tuple) columns averaged into the gaze y
+        time_column(str) datetimes or ms offsets, the index by default
+        by(list) columns of a recording, the stimulus and participant by default
+        **kwargs: thresholds passed to ``detect``
+    ---
+    Returns
+    ---
+        fixations(pd.DataFrame) one row per fixation with the ``by``
+        columns, Start (in the unit of the times), Duration (s), Samples,
+        X, Y (pixels) and the mean of every channel under its own name
+    """
+    channels = list(channels or [])
+    if by is None:
+        by = [column for column in GROUP_COLUMNS if column in data.columns]
+    by = list(by)
+    times = data.index if time_column is None else data[time_column]
+    x = data[list(x_columns)].to_numpy(dtype="float64").mean(axis=1)
+    y = data[list(y_columns)].to_numpy(dtype="float64").mean(axis=1)
+    if by:
+        segments = data.groupby(by, sort=False, dropna=False).ngroup().to_numpy()
+    else:
+        segments = None
+
+    found = detect(
+        _seconds(times),
+        x,
+        y,
+        segments=segments,
+        values=data[channels].to_numpy(dtype="float64") if channels else None,
+        method=method,
+        **kwargs,
+    )
+    fixations = {column: data[column].to_numpy()[found["first"]] for column in by}
+    fixations.update(
+        {
+            "Start": np.asarray(times)[found["first"]],
+            "Duration": found["duration"],
+            "Samples": found["samples"],
+            "X": found["x"],
+            "Y": found["y"],
+        }
+    )
+    for position, channel in enumerate(channels):
+        fixations[channel] = found["values"][:, position]
+    return pd.DataFrame(fixations)
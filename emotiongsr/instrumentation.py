@@ -0,0 +1,300 @@
+"""
+instrumentation.py
+
+This module contains the named spans used to time the stages of the
+experiments (read, clean, align, resample, render) on real data without
+a profiler. Tracing is off by default, ``span`` then returns a shared
+object that does nothing. Set the ``EMOTIONGSR_TRACE`` environment
+variable to a JSON file or a folder, or call ``enable``, to record the
+wall time, CPU time, rows in/out and tracemalloc peak of every span.
+The trace is written in the Chrome trace format, it opens in
+chrome://tracing or https://ui.perfetto.dev. Work sent to a process pool
+through ``pool_map`` sends its spans back with its results, they are in
+the same trace under the pid of the worker.
+
+    with instrumentation.span("clean", rows_in=len(df)) as stage:
+        df = clean(df)
+        stage.set(rows_out=len(df))
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+TRACE_ENV = "EMOTIONGSR_TRACE"
+
+MEMORY_ENV = "EMOTIONGSR_TRACE_MEMORY"
+
+TRACE_DIR = "traces"
+
+
+class _NoSpan:
+    """The span returned while tracing is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Tracer:
+    """The spans recorded in this process, the stack of open spans is kept per thread"""
+
+    def __init__(self, path, memory):
+        self.pid = os.getpid()
+        if not path.endswith(".json"):
+            path = os.path.join(path, f"trace-{datetime.now():%Y%m%d-%H%M%S}-{self.pid}.json")
+        self.path = path
+        self.memory = memory
+        self.events = []
+        self.local = threading.local()
+        self.origin = time.perf_counter_ns()
+        # only stopped on disable if it was started here
+        self.started_tracemalloc = memory and not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+
+_tracer = None
+
+
+class Span:
+    """
+    A stage being traced, created by ``span``. Values given to ``set``
+    (e.g. rows_out) are stored with the span.
+    """
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.peak = 0
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        tracer = self.tracer
+        stack = tracer.stack()
+        if tracer.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # the peak so far belongs to the enclosing span, keep it there
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.memory_start = current
+        stack.append(self)
+        self.cpu_start = time.process_time_ns()
+        self.wall_start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        wall_end = time.perf_counter_ns()
+        cpu_end = time.process_time_ns()
+        tracer = self.tracer
+        stack = tracer.stack()
+        stack.pop()
+
+        args = dict(self.args)
+        args["cpu_ms"] = (cpu_end - self.cpu_start) / 1e6
+        if tracer.memory:
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            # the parent's peak includes its children's
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+            args["peak_memory"] = self.peak - self.memory_start
+        if exc_type is not None:
+            args["error"] = exc_type.__name__
+
+        tracer.events.append(
+            {
+                "name": self.name,
+                "cat": "emotiongsr",
+                "ph": "X",
+                "ts": (self.wall_start - tracer.origin) / 1e3,
+                "dur": (wall_end - self.wall_start) / 1e3,
+                "pid": tracer.pid,
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+        )
+        return False
+
+
+def span(name, **args):
+    """
+    Traces the code run inside a ``with`` block
+    ---
+    Args
+    ---
+        name(str) name of the stage, e.g. "read" or "render"
+        **args: values stored with the span, e.g. rows_in
+    ---
+    Returns
+    ---
+        span(Span) the context manager, its ``set`` method stores more
+        values such as rows_out
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return Span(_tracer, name, args)
+
+
+def traced(name):
+    """Decorator that traces every call of a function as the span ``name``"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class _Collected:
+    """
+    A function run in a worker process that returns its result with the
+    spans recorded during the call, their times are absolute so the parent
+    can place them on its own clock
+    """
+
+    def __init__(self, func, memory):
+        self.func = func
+        self.memory = memory
+
+    def __call__(self, *args):
+        global _tracer
+        if _tracer is None:
+            # a spawned worker, the parent writes the trace so no atexit save
+            _tracer = _Tracer(TRACE_DIR, self.memory)
+        tracer = _tracer
+        start = len(tracer.events)
+        result = self.func(*args)
+        events = tracer.events[start:]
+        del tracer.events[start:]
+        # a forked worker inherits the parent's pid in the tracer
+        pid = os.getpid()
+        return result, [
+            dict(event, ts=event["ts"] + tracer.origin / 1e3, pid=pid) for event in events
+        ]
+
+
+def pool_map(executor, func, *iterables) -> list:
+    """
+    ``executor.map`` for a process pool that keeps the spans recorded in
+    the workers, they are added to this process's trace
+    ---
+    Args
+    ---
+        executor(concurrent.futures.Executor) the pool
+        func(callable) the function run on every item, must pickle
+        *iterables: the arguments, like ``map``
+    ---
+    Returns
+    ---
+        results(list) the results, in order
+    """
+    tracer = _tracer
+    if tracer is None:
+        return list(executor.map(func, *iterables))
+    results = []
+    # perf_counter is a system wide monotonic clock, shared by the workers
+    for result, events in executor.map(_Collected(func, tracer.memory), *iterables):
+        tracer.events.extend(
+            dict(event, ts=event["ts"] - tracer.origin / 1e3) for event in events
+        )
+        results.append(result)
+    return results
+
+
+def enabled() -> bool:
+    """Whether spans are being recorded"""
+    return _tracer is not None
+
+
+def enable(path=None, memory=True) -> None:
+    """
+    Starts recording spans, the trace is written when the program exits
+    or when ``save`` is called
+    ---
+    Args
+    ---
+        path(str) the JSON file to write, or a folder for a file named
+        after the run, TRACE_DIR by default
+        memory(bool) also record the tracemalloc peak of every span, this
+        makes the traced code slower
+    """
+    global _tracer
+    if _tracer is not None:
+        return
+    _tracer = _Tracer(path or TRACE_DIR, memory)
+    atexit.register(save)
+
+
+def disable() -> None:
+    """Stops recording spans, the spans recorded so far are dropped"""
+    global _tracer
+    if _tracer is not None and _tracer.started_tracemalloc:
+        tracemalloc.stop()
+    _tracer = None
+
+
+def save(path=None):
+    """
+    Writes the spans recorded so far as a Chrome trace
+    ---
+    Args
+    ---
+        path(str) the JSON file to write, the path given to ``enable``
+        by default
+    ---
+    Returns
+    ---
+        path(str) the file written, None when tracing is off or nothing
+        was recorded
+    """
+    tracer = _tracer
+    if tracer is None or not tracer.events:
+        return None
+    path = path or tracer.path
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": list(tracer.events), "displayTimeUnit": "ms"}, file)
+    return path
+
+
+if os.environ.get(TRACE_ENV):
+    enable(
+        None if os.environ[TRACE_ENV] == "1" else os.environ[TRACE_ENV],
+        memory=os.environ.get(MEMORY_ENV, "1") != "0",
+    )
@@ -0,0 +1,79 @@
+"""
+peaks.py
+
+This module contains the peak selection used to report the strongest
+moments of every emotion or signal channel. All the channels are
+handled together, and the peaks of a channel are kept apart in time so
+one spike isn't reported k times.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import numpy as np
+
+
+def select_peaks(values, times, k=3, min_gap=0.0, oversample=4) -> np.ndarray:
+    """
+    Selects the k highest values of every channel, skipping values closer
+    than ``min_gap`` to an already selected peak of the same channel
+    (temporal non-maximum suppression).
+
+    Candidates are taken with ``argpartition`` for all the channels at
+    once, if suppression leaves a channel short the candidate pool is
+    doubled and the selection repeated.
+    ---
+    Args
+    ---
+        values(np.ndarray) samples of shape (n, channels), NaN is ignored
+        times(np.ndarray) time of every sample, in any unit
+        k(int) number of peaks per channel
+        min_gap(float) minimum distance between peaks, in the unit of times
+        oversample(int) initial candidates per peak
+    ---
+    Returns
+    ---
+        rows(np.ndarray) int64 array of shape (k, channels) with the
+        positions of the peaks, highest first, -1 where a channel has
+        fewer than k peaks
+    """
+    values = np.asarray(values, dtype="float64")
+    if values.ndim == 1:
+        values = values[:, None]
+    times = np.asarray(times, dtype="float64")
+    n_rows, n_channels = values.shape
+    values = np.where(np.isnan(values), -np.inf, values)
+    channels = np.arange(n_channels)
+    if n_rows == 0:
+        return np.full((k, n_channels), -1, dtype="int64")
+
+    n_candidates = min(n_rows, max(k * oversample, 1))
+    while True:
+        if n_candidates < n_rows:
+            candidates = np.argpartition(-values, n_candidates - 1, axis=0)[:n_candidates]
+        else:
+            candidates = np.broadcast_to(np.arange(n_rows)[:, None], (n_rows, n_channels))
+        # highest first, ties by position
+        order = np.lexsort((candidates, -values[candidates, channels]), axis=0)
+        candidates = np.take_along_axis(candidates, order, axis=0)
+
+        rows = np.full((k, n_channels), -1, dtype="int64")
+        selected_times = np.full((k, n_channels), np.nan)
+        n_selected = np.zeros(n_channels, dtype="int64")
+        for candidate in candidates:
+            candidate_times = times[candidate]
+            accept = (n_selected < k) & np.isfinite(values[candidate, channels])
+            accept &= ~(np.abs(selected_times - candidate_times) < min_gap).any(axis=0)
+            rows[n_selected[accept], channels[accept]] = candidate[accept]
+            selected_times[n_selected[accept], channels[accept]] = candidate_times[accept]
+            n_selected += accept
+            if (n_selected == k).all():
+                return rows
+
+        # Stop when every short channel ran out of finite values
+        exhausted = ~np.isfinite(values[candidates[-1], channels])
+        if n_candidates == n_rows or ((n_selected == k) | exhausted).all():
+            return rows
+        n_candidates = min(n_rows, 2 * n_candidates)
@@ -0,0 +1,489 @@
+"""
+streaming.py
+
+This module contains the live mode of the image experiment: sample rows
+are read while iMotions records them, from a local socket or from an
+export that is still being written, and the heatmap of every stimulus
+is updated as they arrive instead of being drawn again from scratch.
+Memory stays constant however long the session runs, the latest samples
+of every channel are kept in fixed size ring buffers and each stimulus
+has a single mask.
+
+    session = LiveSession({"1019_3.95": "Images/negative/1019_3.95.jpg"}, "Joy")
+    for chunk in tail_csv("export.csv", stop=stop_event):
+        session.feed(chunk)
+        image = session.heatmap("1019_3.95")
+
+A recorded export can be played back with ``replay_csv`` or
+``replay_socket`` to test the live mode without iMotions.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import io
+import os
+import socket
+import threading
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from emotiongsr import alignment
+from emotiongsr.dataprocessor import (
+    BASE_COLUMNS,
+    SCREEN_SIZE,
+    blend_heatmap,
+    draw_heatmap_points,
+)
+
+# The header of the data in an iMotions export starts with this column
+HEADER_PREFIX = "Row"
+
+GAZE_COLUMNS = ["ET_GazeLeftx", "ET_GazeRightx", "ET_GazeLefty", "ET_GazeRighty"]
+
+# Numeric channels kept in the ring buffers by default
+LIVE_CHANNELS = [
+    column
+    for column in BASE_COLUMNS
+    if column not in ("Timestamp", "SourceStimuliName", "Participant")
+]
+
+# Seconds of history kept for every channel
+HISTORY_SECONDS = 60
+
+# Rows parsed at a time from a source
+CHUNK_ROWS = 256
+
+
+class RingBuffer:
+    """
+    Fixed size buffer with the latest samples of several channels, old
+    samples are overwritten once it's full.
+    """
+
+    def __init__(self, capacity, channels):
+        """
+        ---
+        Args
+        ---
+            capacity(int) samples kept
+            channels(list) names of the channels
+        """
+        self.capacity = int(capacity)
+        self.channels = list(channels)
+        self._times = np.zeros(self.capacity, dtype="int64")
+        self._values = np.full((self.capacity, len(self.channels)), np.nan)
+        self._end = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def extend(self, times, values) -> None:
+        """
+        Appends samples, oldest first
+        ---
+        Args
+        ---
+            times(np.ndarray) int64 nanoseconds of the samples
+            values(np.ndarray) array of shape (n, channels)
+        """
+        times = np.asarray(times, dtype="int64")
+        values = np.asarray(values, dtype="float64").reshape(times.size, len(self.channels))
+        if times.size > self.capacity:
+            times, values = times[-self.capacity :], values[-self.capacity :]
+        positions = (self._end + np.arange(times.size)) % self.capacity
+        self._times[positions] = times
+        self._values[positions] = values
+        self._end = (self._end + times.size) % self.capacity
+        self.size = min(self.size + times.size, self.capacity)
+
+    def _order(self):
+        return (self._end - self.size + np.arange(self.size)) % self.capacity
+
+    @property
+    def times(self) -> np.ndarray:
+        """Times of the buffered samples, oldest first"""
+        return self._times[self._order()]
+
+    @property
+    def values(self) -> np.ndarray:
+        """Values of the buffered samples, oldest first, one column per channel"""
+        return self._values[self._order()]
+
+    def channel(self, name) -> np.ndarray:
+        """Buffered values of one channel, oldest first"""
+        return self._values[self._order(), self.channels.index(name)]
+
+    def since(self, start) -> tuple:
+        """(times, values) of the samples at or after ``start`` nanoseconds"""
+        times, values = self.times, self.values
+        first = np.searchsorted(times, start, side="left")
+        return times[first:], values[first:]
+
+
+def _numeric(chunk, columns) -> np.ndarray:
+    # float64 array of the columns, missing ones and text are NaN
+    chunk = chunk.reindex(columns=columns)
+    try:
+        return chunk.to_numpy(dtype="float64")
+    except (TypeError, ValueError):
+        return chunk.apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+
+
+class LiveSession:
+    """
+    Keeps the latest samples of a live recording and the heatmap of every
+    stimulus up to date. Every raw sample with gaze is drawn on the mask of
+    the stimulus on screen with the latest value of the heatmap signal,
+    forward filled. The circles, blur and colours are those of
+    ``DataProcessor.generate_heatmap``, but its input differs: the cleaned
+    data is resampled and may be drawn as fixations, so the live heatmap
+    is a preview and not the same image as the offline one.
+    """
+
+    def __init__(self, images, value, channels=None, history=HISTORY_SECONDS,
+                 sampling_rate=128):
+        """
+        ---
+        Args
+        ---
+            images(dict) stimulus name to the path of its image, samples of
+            other stimuli are only buffered
+            value(str) the signal the heatmaps show, e.g. "Joy"
+            channels(list) channels to buffer, LIVE_CHANNELS by default
+            history(float) seconds of samples kept in the ring buffers
+            sampling_rate(float) rows per second of the recording
+        """
+        self.images = dict(images)
+        self.value = value
+        channels = list(LIVE_CHANNELS if channels is None else channels)
+        if value not in channels:
+            channels.append(value)
+        self.buffer = RingBuffer(int(history * sampling_rate), channels)
+        self.masks = {}
+        self._pictures = {}
+        # the latest stimulus, slide event and signal value seen
+        self._carry = {"SourceStimuliName": None, "SlideEvent": None, value: np.nan}
+        self.rows = 0
+
+    def _mask(self, stimulus):
+        if stimulus not in self.masks:
+            picture = cv2.imread(self.images[stimulus])
+            self._pictures[stimulus] = picture
+            self.masks[stimulus] = np.zeros(picture.shape[:2], dtype="uint8")
+        return self.masks[stimulus]
+
+    def feed(self, chunk) -> None:
+        """
+        Adds rows of the export as they arrive
+        ---
+        Args
+        ---
+            chunk(pd.DataFrame) rows with at least Timestamp (ms from the
+            start of the recording) and SourceStimuliName, missing
+            channels are buffered as NaN
+        """
+        if chunk.empty:
+            return
+        times = alignment.ms_to_ns(_numeric(chunk, ["Timestamp"])[:, 0])
+        values = _numeric(chunk, self.buffer.channels)
+        self.buffer.extend(times, values)
+        self.rows += len(chunk)
+
+        # the stimulus, slide event and signal carry over from earlier chunks
+        stimuli = self._carried("SourceStimuliName", chunk["SourceStimuliName"])
+        intensity = self._carried(self.value, values[:, self.buffer.channels.index(self.value)])
+        if not set(GAZE_COLUMNS) <= set(chunk.columns):
+            return
+        drawn = np.ones(len(chunk), dtype=bool)
+        if "SlideEvent" in chunk.columns:
+            # like clean_files, only while a stimulus is shown
+            drawn = self._carried("SlideEvent", chunk["SlideEvent"]) == "StartMedia"
+
+        left_x, right_x, left_y, right_y = _numeric(chunk, GAZE_COLUMNS).T
+        norm_x = (left_x + right_x) / 2 / SCREEN_SIZE[0]
+        norm_y = (left_y + right_y) / 2 / SCREEN_SIZE[1]
+        drawn &= ~(np.isnan(norm_x) | np.isnan(norm_y))
+        for stimulus in pd.unique(stimuli[drawn]):
+            if stimulus not in self.images:
+                continue
+            rows = drawn & (stimuli == stimulus)
+            draw_heatmap_points(self._mask(stimulus), norm_x[rows], norm_y[rows], intensity[rows])
+
+    def _carried(self, column, values) -> np.ndarray:
+        # forward fills a column from the last value of the previous chunk
+        values = pd.Series(values, dtype=object if column != self.value else "float64")
+        if column != self.value:
+            values = values.replace("", np.nan)
+        filled = pd.concat([pd.Series([self._carry[column]], dtype=values.dtype), values])
+        filled = filled.ffill().to_numpy()[1:]
+        self._carry[column] = filled[-1]
+        return filled
+
+    def heatmap(self, stimulus) -> np.ndarray:
+        """
+        Renders the heatmap of a stimulus from its current mask
+        ---
+        Returns
+        ---
+            result_img(np.ndarray) the BGR heatmap over the image
+        """
+        mask = self._mask(stimulus)
+        return blend_heatmap(mask, self._pictures[stimulus])
+
+    def run(self, source, on_chunk=None) -> None:
+        """
+        Feeds every chunk of a source, e.g. ``tail_csv`` or ``read_socket``
+        ---
+        Args
+        ---
+            source(iterable) yields DataFrames of rows
+            on_chunk(callable) called with the session after every chunk
+        """
+        for chunk in source:
+            self.feed(chunk)
+            if on_chunk is not None:
+                on_chunk(self)
+
+
+class _RowParser:
+    """Turns lines of CSV text into DataFrames, once the header of the data was seen"""
+
+    def __init__(self, header_prefix=HEADER_PREFIX):
+        self.header_prefix = header_prefix
+        self.columns = None
+        self.lines = []
+
+    def add(self, line):
+        if self.columns is None:
+            # the metadata preamble comes before the header
+            if line.startswith(self.header_prefix):
+                self.columns = pd.read_csv(io.StringIO(line), nrows=0).columns.tolist()
+            return
+        if line.strip():
+            self.lines.append(line)
+
+    def flush(self):
+        if not self.lines:
+            return None
+        text = "".join(self.lines)
+        self.lines = []
+        # stimulus names like 1019_3.95 stay text
+        text_columns = {column: str for column in ("SourceStimuliName", "SlideEvent")
+                        if column in self.columns}
+        return pd.read_csv(io.StringIO(text), names=self.columns, header=None,
+                           dtype=text_columns, low_memory=False)
+
+
+def _chunks(lines, header_prefix, chunk_rows):
+    # groups complete lines into DataFrames of up to chunk_rows rows, a
+    # None line means no more data for now and flushes what there is
+    parser = _RowParser(header_prefix)
+    for line in lines:
+        if line is not None:
+            parser.add(line)
+        if parser.lines and (line is None or len(parser.lines) >= chunk_rows):
+            yield parser.flush()
+    chunk = parser.flush()
+    if chunk is not None:
+        yield chunk
+
+
+def tail_csv(path, stop=None, poll_interval=0.1, header_prefix=HEADER_PREFIX,
+             chunk_rows=CHUNK_ROWS):
+    """
+    Follows an export while it's being written, like ``tail -f``, and
+    yields the new rows. A line is only parsed once it's complete.
+    ---
+    Args
+    ---
+        path(str) the CSV file, it may not exist yet
+        stop(threading.Event) set to stop following the file, None
+        stops at the end of the file
+        poll_interval(float) seconds to wait for new lines
+        header_prefix(str) start of the header line of the data
+        chunk_rows(int) maximum rows per chunk
+    ---
+    Yields
+    ---
+        chunk(pd.DataFrame) the new rows, with the columns of the header
+    """
+
+    def lines():
+        while not os.path.exists(path):
+            if stop is None or stop.is_set():
+                return
+            time.sleep(poll_interval)
+        with open(path, encoding="utf-8", newline="") as file:
+            partial = ""
+            while True:
+                line = file.readline()
+                if line:
+                    partial += line
+                    if partial.endswith("\n"):
+                        yield partial
+                        partial = ""
+                    continue
+                # at the end of what was written so far
+                yield None
+                if stop is None or stop.is_set():
+                    if partial:
+                        yield partial
+                    return
+                time.sleep(poll_interval)
+
+    return _chunks(lines(), header_prefix, chunk_rows)
+
+
+def read_socket(host="127.0.0.1", port=8089, stop=None, header_prefix=HEADER_PREFIX,
+                chunk_rows=CHUNK_ROWS, timeout=0.1):
+    """
+    Reads CSV rows sent over a local TCP socket, the sender writes the
+    header line first and then one line per sample
+    ---
+    Args
+    ---
+        host(str) address of the sender
+        port(int) port of the sender
+        stop(threading.Event) set to disconnect, None reads until the
+        sender closes the connection
+        header_prefix(str) start of the header line of the data
+        chunk_rows(int) maximum rows per chunk
+        timeout(float) seconds to wait for data before yielding what
+        was received
+    ---
+    Yields
+    ---
+        chunk(pd.DataFrame) the new rows, with the columns of the header
+    """
+
+    def lines():
+        with socket.create_connection((host, port)) as connection:
+            connection.settimeout(timeout)
+            partial = b""
+            while stop is None or not stop.is_set():
+                try:
+                    data = connection.recv(1 << 16)
+                except socket.timeout:
+                    yield None
+                    continue
+                if not data:
+                    break
+                *complete, partial = (partial + data).split(b"\n")
+                for line in complete:
+                    yield line.decode("utf-8") + "\n"
+                yield None
+
+    return _chunks(lines(), header_prefix, chunk_rows)
+
+
+def _recorded_lines(export_path, header_prefix):
+    # the preamble and header, then (time in ms, line) for every row
+    with open(export_path, encoding="utf-8", newline="") as file:
+        preamble = []
+        for line in file:
+            preamble.append(line)
+            if line.startswith(header_prefix):
+                break
+        columns = pd.read_csv(io.StringIO(preamble[-1]), nrows=0).columns.tolist()
+        timestamp = columns.index("Timestamp")
+        rows = file.readlines()
+    times = pd.read_csv(io.StringIO("".join(rows)), header=None, usecols=[timestamp],
+                        low_memory=False)[timestamp]
+    return preamble, pd.to_numeric(times, errors="coerce").ffill().fillna(0).to_numpy(), rows
+
+
+def _paced(times, rows, speed, stop, batch_ms):
+    # yields batches of rows when they are due, speed times faster than recorded
+    start = time.perf_counter()
+    first = 0
+    while first < len(rows):
+        if stop is not None and stop.is_set():
+            return
+        last = int(np.searchsorted(times, times[first] + batch_ms, side="right"))
+        last = max(last, first + 1)
+        delay = (times[last - 1] - times[0]) / 1000 / speed - (time.perf_counter() - start)
+        if delay > 0:
+            time.sleep(delay)
+        yield rows[first:last]
+        first = last
+
+
+def replay_csv(export_path, target_path, speed=1.0, stop=None, batch_ms=50,
+               header_prefix=HEADER_PREFIX):
+    """
+    Plays a recorded export back by appending its rows to ``target_path``
+    at the pace they were recorded, to test ``tail_csv`` without iMotions
+    ---
+    Args
+    ---
+        export_path(str) the recorded export
+        target_path(str) the CSV file written as the recording plays
+        speed(float) playback speed, 2 plays twice as fast
+        stop(threading.Event) set to stop the playback
+        batch_ms(float) rows are written in batches of this many ms
+        header_prefix(str) start of the header line of the data
+    ---
+    Returns
+    ---
+        rows(int) number of rows written
+    """
+    preamble, times, rows = _recorded_lines(export_path, header_prefix)
+    written = 0
+    with open(target_path, "w", encoding="utf-8", newline="") as file:
+        file.writelines(preamble)
+        file.flush()
+        for batch in _paced(times, rows, speed, stop, batch_ms):
+            file.writelines(batch)
+            file.flush()
+            written += len(batch)
+    return written
+
+
+def replay_socket(export_path, host="127.0.0.1", port=8089, speed=1.0, stop=None,
+                  batch_ms=50, header_prefix=HEADER_PREFIX, ready=None):
+    """
+    Plays a recorded export back over a local TCP socket, to test
+    ``read_socket`` without iMotions. Waits for one connection, sends the
+    header and then the rows at the pace they were recorded.
+    ---
+    Args
+    ---
+        export_path(str) the recorded export
+        host(str) address to listen on
+        port(int) port to listen on, 0 picks a free one
+        speed(float) playback speed, 2 plays twice as fast
+        stop(threading.Event) set to stop the playback
+        batch_ms(float) rows are sent in batches of this many ms
+        header_prefix(str) start of the header line of the data
+        ready(callable) called with the port once listening
+    ---
+    Returns
+    ---
+        rows(int) number of rows sent
+    """
+    preamble, times, rows = _recorded_lines(export_path, header_prefix)
+    sent = 0
+    with socket.create_server((host, port)) as server:
+        if ready is not None:
+            ready(server.getsockname()[1])
+        connection, _ = server.accept()
+        with connection:
+            connection.sendall(preamble[-1].encode("utf-8"))
+            for batch in _paced(times, rows, speed, stop, batch_ms):
+                connection.sendall("".join(batch).encode("utf-8"))
+                sent += len(batch)
+    return sent
+
+
+def start_replay(target, *args, **kwargs) -> threading.Thread:
+    """Runs ``replay_csv`` or ``replay_socket`` in a background thread"""
+    thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
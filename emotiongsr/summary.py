@@ -0,0 +1,216 @@
+"""
+summary.py
+
+This module contains the study summary: the mean, peak and area under
+the curve of every emotion and GSR signal for every stimulus and
+participant, computed on the frame returned by ``get_clean_data`` in a
+single grouped pass instead of reading the numbers off the plots. Every
+statistic is also given relative to the stimulus baseline, the mean of
+the first ``BASELINE_SECONDS`` of the stimulus, and the stimuli can be
+rolled up by their category folder (negative/neutral/positive).
+
+    summary = summarize(data, categories=image_categories("sample_data/Images"))
+    write_summary(summary, "summary.csv")
+    write_summary(roll_up(summary), "categories.parquet")
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from emotiongsr import alignment, instrumentation
+
+CHANNELS = [
+    "Anger",
+    "Contempt",
+    "Disgust",
+    "Fear",
+    "Joy",
+    "Sadness",
+    "Surprise",
+    "Engagement",
+    "Valence",
+    "Sentimentality",
+    "Confusion",
+    "Neutral",
+    "GSR Conductance CAL",
+    "GSR Raw",
+    "Tonic Signal",
+    "Phasic Signal",
+]
+
+# Seconds at the start of every stimulus used as its baseline
+BASELINE_SECONDS = 1.0
+
+# Seconds per row of the get_clean_data frame
+SAMPLE_DURATION = 0.01
+
+STATISTICS = ["Mean", "Peak", "AUC"]
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def image_categories(images_path) -> dict:
+    """
+    Finds the category of every stimulus from the folder its image is in
+    ---
+    Args
+    ---
+        images_path(str) folder with one subfolder per category
+    ---
+    Returns
+    ---
+        categories(dict) stimulus name to category, e.g. {"1019_3.95": "negative"}
+    """
+    categories = {}
+    for category in sorted(os.listdir(images_path)):
+        folder = os.path.join(images_path, category)
+        if not os.path.isdir(folder):
+            continue
+        for file in os.listdir(folder):
+            name, extension = os.path.splitext(file)
+            if extension.lower() in IMAGE_EXTENSIONS:
+                categories[name] = category
+    return categories
+
+
+def _seconds(data) -> np.ndarray:
+    # the index of get_clean_data, or the Timestamp in ms of a clean file
+    if isinstance(data.index, pd.DatetimeIndex):
+        times = alignment.to_ns(data.index)
+    else:
+        times = alignment.ms_to_ns(data["Timestamp"])
+    if times.size == 0:
+        return times.astype("float64")
+    return (times - times.min()) / 1e9
+
+
+@instrumentation.traced("summarize")
+def summarize(data, channels=None, baseline=BASELINE_SECONDS, categories=None,
+              sample_duration=SAMPLE_DURATION) -> pd.DataFrame:
+    """
+    Computes the statistics of every channel for every stimulus and
+    participant. The AUC is the mean times the time on the stimulus, so
+    channels sampled slower than the clean data (e.g. emotions at 30 Hz)
+    aren't penalised by their missing rows.
+    ---
+    Args
+    ---
+        data(pd.DataFrame) the output of get_clean_data
+        channels(list) the columns to summarise, the emotions and GSR
+        signals in the data by default
+        baseline(float) seconds at the start of every stimulus used as
+        baseline
+        categories(dict) stimulus name to category, see ``image_categories``
+        sample_duration(float) seconds per row
+    ---
+    Returns
+    ---
+        summary(pd.DataFrame) one row per stimulus, participant and
+        channel with the Category, Duration, Samples, Baseline, Mean, Peak
+        and AUC and the baseline corrected Mean_Corrected, Peak_Corrected
+        and AUC_Corrected
+    """
+    if channels is None:
+        channels = [channel for channel in CHANNELS if channel in data.columns]
+    with instrumentation.span("summarize_groups", rows_in=len(data)) as stage:
+        codes, groups = pd.MultiIndex.from_arrays(
+            [data["SourceStimuliName"], data["Participant"]]
+        ).factorize()
+        n_groups = len(groups)
+        times = _seconds(data)
+        values = data[channels].to_numpy(dtype="float64")
+
+        # one grouped reduction per statistic, every channel at once
+        start = -alignment.bin_reduce(codes, -times, n_groups, how="max")[:, 0]
+        end = alignment.bin_reduce(codes, times, n_groups, how="max")[:, 0]
+        duration = end - start + sample_duration
+        in_baseline = times - start[codes] < baseline
+        base = alignment.bin_reduce(
+            np.where(in_baseline, codes, alignment.NO_MATCH), values, n_groups, how="mean"
+        )
+        mean = alignment.bin_reduce(codes, values, n_groups, how="mean")
+        peak = alignment.bin_reduce(codes, values, n_groups, how="max")
+        samples = alignment.bin_reduce(codes, values, n_groups, how="count")
+        auc = mean * duration[:, None]
+        stage.set(rows_out=n_groups * len(channels))
+
+    n_channels = len(channels)
+    stimuli = groups.get_level_values(0).to_numpy()
+    summary = pd.DataFrame(
+        {
+            "SourceStimuliName": np.repeat(stimuli, n_channels),
+            "Participant": np.repeat(groups.get_level_values(1).to_numpy(), n_channels),
+            "Category": np.repeat(
+                pd.Series(stimuli).map(categories or {}).to_numpy(dtype=object), n_channels
+            ),
+            "Channel": np.tile(np.asarray(channels, dtype=object), n_groups),
+            "Duration": np.repeat(duration, n_channels),
+            "Samples": samples.ravel().astype("int64"),
+            "Baseline": base.ravel(),
+            "Mean": mean.ravel(),
+            "Peak": peak.ravel(),
+            "AUC": auc.ravel(),
+            "Mean_Corrected": (mean - base).ravel(),
+            "Peak_Corrected": (peak - base).ravel(),
+            "AUC_Corrected": (auc - base * duration[:, None]).ravel(),
+        }
+    )
+    return summary.sort_values(["SourceStimuliName", "Participant"], kind="stable").reset_index(
+        drop=True
+    )
+
+
+def roll_up(summary, by=("Category",)) -> pd.DataFrame:
+    """
+    Averages the statistics of a summary over groups of stimuli, every
+    stimulus and participant weighs the same
+    ---
+    Args
+    ---
+        summary(pd.DataFrame) the output of ``summarize``
+        by(tuple) the columns to group by, with the channel
+    ---
+    Returns
+    ---
+        roll_up(pd.DataFrame) one row per group and channel with the number
+        of stimuli, participants and the mean of every statistic, stimuli
+        without a category are a group with a NaN category
+    """
+    keys = list(by) + ["Channel"]
+    statistics = [column for column in summary.columns if column.startswith(tuple(STATISTICS))]
+    grouped = summary.groupby(keys, sort=True, dropna=False)
+    result = grouped[["Baseline"] + statistics].mean()
+    result.insert(0, "Stimuli", grouped["SourceStimuliName"].nunique())
+    result.insert(1, "Participants", grouped["Participant"].nunique())
+    return result.reset_index()
+
+
+def write_summary(table, path) -> str:
+    """
+    Writes a summary table as CSV, or as Parquet when the path ends with
+    .parquet (needs pyarrow)
+    ---
+    Args
+    ---
+        table(pd.DataFrame) the output of ``summarize`` or ``roll_up``
+        path(str) the file to write, folders are created
+    ---
+    Returns
+    ---
+        path(str) the file written
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    if path.endswith(".parquet"):
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+    return path
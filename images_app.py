@@ -6,6 +6,7 @@ This module contains the GUI for Priyanks experiment
 
 """
 
+import os
 import tempfile
 import tkinter as tk
 import webbrowser
@@ -16,6 +17,7 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 from emotiongsr import DataProcessor
+from emotiongsr.cache import CACHE_DIR
 
 matplotlib.use("TkAgg")
 
@@ -128,8 +130,11 @@ def run_app(root):
 
         output_path = output_path_entry.get()
 
-        processor = DataProcessor(imotions_path, output_path)
-        processor.clean_files()
+        # the heatmaps asked again reuse their density grids
+        processor = DataProcessor(
+            imotions_path, output_path, cache_dir=os.path.join(output_path, CACHE_DIR)
+        )
+        processor.clean_files(n_jobs=None)
         data = processor.get_clean_data()
 
         emotion = emotion_combobox.get()
@@ -9,13 +9,19 @@ February 2024
 """
 
 import os
+import struct
+import tempfile
+import zlib
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+from matplotlib import colormaps
+from matplotlib.figure import Figure
 from PIL import Image
 from scipy.ndimage import gaussian_filter
 
+from emotiongsr import alignment, aoi, fixations, instrumentation
+
 
 class DataProcessor:
     """
@@ -57,10 +63,13 @@ class DataProcessor:
         self.screenshot_paths = []
         self.mouse_activity_files = []
 
+    @instrumentation.traced("process_imotion_data")
     def process_imotion_data(self, initial_rows_to_skip=28):
-        imotion_data = pd.read_csv(
-            self.imotion_data_path, skiprows=initial_rows_to_skip
-        )
+        with instrumentation.span("read") as stage:
+            imotion_data = pd.read_csv(
+                self.imotion_data_path, skiprows=initial_rows_to_skip
+            )
+            stage.set(rows_out=len(imotion_data))
         # Process the data as needed
         gaze_data = imotion_data[1:-2]
         gaze_data = gaze_data.loc[~(gaze_data["ET_GazeRightx"] == -1)].reset_index(
@@ -94,6 +103,7 @@ class DataProcessor:
         )
         self.eye_tracking_data = gaze_data.copy()
 
+    @instrumentation.traced("process_web_data")
     def process_web_data(self):
         # Replace NaN with 0 only at the beginning of each url sequence
         self.web_data.reset_index(drop=True, inplace=True)
@@ -116,58 +126,48 @@ class DataProcessor:
         self.web_data["Mouse Y"].fillna(method="ffill", inplace=True)
         self.web_data["Mouse Y"].fillna(method="bfill", inplace=True)
 
-    def merge_web_and_imotion_data(self):
+    def __eye_times(self, web_times):
+        # Both recordings start together, so shift the eye tracking clock
+        # to start at the first web event
+        eye_times = alignment.to_ns(self.eye_tracking_data["Timestamp"])
+        return alignment.correct_drift(eye_times, eye_times[0], web_times[0])
 
-        # Make sure the timestamps are in datetime format
-        self.web_data["Time (UTC)"] = pd.to_datetime(self.web_data["Time (UTC)"])
-        self.eye_tracking_data["Timestamp"] = pd.to_datetime(
-            self.eye_tracking_data["Timestamp"]
-        )
-
-        # Calculate the time difference for the 'eye_tracking_data' from its start
-        self.eye_tracking_data["Time From Start"] = (
-            self.eye_tracking_data["Timestamp"]
-            - self.eye_tracking_data["Timestamp"].iloc[0]
-        )
+    @instrumentation.traced("merge_web_and_imotion_data")
+    def merge_web_and_imotion_data(self):
 
-        # Apply this difference to the 'web_data' timestamps
-        self.eye_tracking_data["Aligned Timestamp"] = (
-            self.web_data["Time (UTC)"].iloc[0]
-            + self.eye_tracking_data["Time From Start"]
-        )
-        # If you don't need the original timestamps or the 'Time From Start' in your final dataframe, you can drop them
-        self.eye_tracking_data.drop(
-            ["Timestamp", "Time From Start"], axis=1, inplace=True
+        # Make sure the timestamps are in datetime format, the trailing
+        # rows without time take the last valid one, other rows without
+        # time can't be aligned and are dropped
+        times = pd.to_datetime(self.web_data["Time (UTC)"])
+        valid = times.notna().to_numpy()
+        if not valid.any():
+            raise ValueError(f"No row of {self.web_data_path} has a valid Time (UTC)")
+        trailing = np.arange(len(times)) > np.flatnonzero(valid)[-1]
+        times = times.where(~trailing, times[valid].iloc[-1])
+        valid |= trailing
+        self.web_data = self.web_data.assign(**{"Time (UTC)": times})[valid].reset_index(
+            drop=True
         )
+        web_times = alignment.to_ns(self.web_data["Time (UTC)"])
+        eye_times = self.__eye_times(web_times)
 
-        # Make the 'Aligned Timestamp' the index of 'eye_tracking_data'
-        self.eye_tracking_data.set_index("Aligned Timestamp", inplace=True)
-
-        # Make 'Time (UTC)' the index of 'web_data'
-        self.web_data.set_index("Time (UTC)", inplace=True)
-
-        # Get the last not NaT time
-        last_time = self.web_data.index[-2]
-        size = self.web_data.index.size - 1
-        self.web_data.reset_index(inplace=True)
-        self.web_data.at[size, "Time (UTC)"] = last_time
-        self.web_data.set_index("Time (UTC)", inplace=True)
-        # Now merge both dataframes on nearest matching time
-        self.merged_data = pd.merge_asof(
-            self.web_data,
-            self.eye_tracking_data,
-            left_index=True,
-            right_index=True,
-            direction="nearest",
-        )
+        # Now match both recordings on nearest time
+        indices = alignment.asof_indices(web_times, eye_times, direction="nearest")
 
-        self.merged_data.reset_index(inplace=True)
+        eye_columns = self.eye_tracking_data.columns.drop("Timestamp")
+        merged = {column: self.web_data[column].to_numpy() for column in self.web_data.columns}
+        for column in eye_columns:
+            merged[column] = alignment.take(
+                self.eye_tracking_data[column].to_numpy(), indices
+            )
+        self.merged_data = pd.DataFrame(merged)
 
     def process_data(self):
         
         self.process_imotion_data()
         self.process_merged_data()
 
+    @instrumentation.traced("process_merged_data")
     def process_merged_data(self):
         self.merge_web_and_imotion_data()
         # **************************** Merged Data pre-processing ********************************************************
@@ -205,44 +205,307 @@ class DataProcessor:
             url_dataframes.append(group)
         return url_dataframes
 
-    def plot_heatmap(self, screenshot_path):
-        # Get the unique image path from the dataframe
-        # img_path = data["Image_Path"].unique()[0]
-        data = self.merged_data.copy()
+    @instrumentation.traced("get_fixations")
+    def get_fixations(self, method="ivt"):
+        """
+        Finds the fixations in the eye tracking data at its native rate,
+        then gives every fixation the URL and scroll of the last web event
+        before it starts. Call merge_web_and_imotion_data first.
+        ---
+        Args:
+        ---
+        method (str): "ivt" or "idt", see ``emotiongsr.fixations``.
+        ---
+        Returns:
+        ---
+        fixations (pd.DataFrame): One row per fixation with the URL, Scroll
+            Percentage, Start, Duration, Samples, X, Y (screen pixels) and the
+            mean of every emotion, fixations before the first event are dropped.
+        """
+        eye = self.eye_tracking_data
+        web_times = alignment.to_ns(self.web_data["Time (UTC)"])
+        eye_times = self.__eye_times(web_times)
+        channels = [
+            column for column in eye.columns
+            if column != "Timestamp" and not column.startswith("ET_Gaze")
+        ]
+        found = fixations.detect(
+            (eye_times - eye_times[0]) / 1e9,
+            eye[["ET_GazeRightx", "ET_GazeLeftx"]].to_numpy(dtype="float64").mean(axis=1),
+            eye[["ET_GazeRighty", "ET_GazeLefty"]].to_numpy(dtype="float64").mean(axis=1),
+            values=eye[channels].to_numpy(dtype="float64"),
+            method=method,
+        )
+        starts = eye_times[found["first"]]
+        events = alignment.asof_indices(starts, web_times, direction="backward")
+        shown = events != alignment.NO_MATCH
+
+        result = {
+            "URL": alignment.take(self.web_data["URL"].to_numpy(dtype=object), events, None),
+            "Scroll Percentage": alignment.take(
+                self.web_data["Scroll Percentage"].to_numpy(dtype="float64"), events
+            ),
+            "Start": pd.to_datetime(starts, utc=True),
+            "Duration": found["duration"],
+            "Samples": found["samples"],
+            "X": found["x"],
+            "Y": found["y"],
+        }
+        for position, channel in enumerate(channels):
+            result[channel] = found["values"][:, position]
+        return pd.DataFrame(result)[shown].reset_index(drop=True)
+
+    def __gaze_pixels(self, img_width, img_height, fixations=None):
+        # Gaze position on the full page, scrolled by the page percentage,
+        # every sample weighs 1 and every fixation its duration
+        data = self.merged_data
+        if fixations is None:
+            weights = np.ones(len(data))
+        else:
+            data = self.get_fixations(fixations).rename(
+                columns={"X": "MeanGazeX", "Y": "MeanGazeY"}
+            )
+            weights = data["Duration"].to_numpy(dtype="float64")
+        P = data["Scroll Percentage"].to_numpy(dtype="float64") / 100
+        x = data["MeanGazeX"].to_numpy(dtype="float64")
+        y = np.abs(data["MeanGazeY"].to_numpy(dtype="float64")) + (P * img_height)
+
+        # Keep the points that land on the screenshot
+        inside = (x >= 0) & (x < img_width) & (y >= 0) & (y < img_height)
+        return x[inside].astype("int64"), y[inside].astype("int64"), weights[inside]
+
+    @instrumentation.traced("plot_heatmap")
+    def plot_heatmap(self, screenshot_path, fixations=None):
+        """
+        Plots the gaze heatmap over the screenshot on a new matplotlib
+        figure, for large screenshots use ``render_heatmap`` instead
+        ---
+        Args:
+        ---
+        screenshot_path (str): The path to the web page screenshot.
+        fixations (str): None to count the raw samples, "ivt" or "idt" to
+            weigh the fixations by their duration instead.
+        ---
+        Returns:
+        ---
+        fig (matplotlib.figure.Figure): The heatmap figure.
+        """
         img = Image.open(screenshot_path)
 
         img_width, img_height = img.size
+        x, y, weights = self.__gaze_pixels(img_width, img_height, fixations)
 
-        # Calculate the normalized x and y coordinates
-        P = data["Scroll Percentage"] / 100
-        x = data["MeanGazeX"]
-        y = abs(data["MeanGazeY"]) + (P * img_height)
-        
-        
-        # Save count of the data points
-        # png imagefile data type
-        displayArray = np.empty([img_height, img_width])
         # Save count of the data points displayArray[y][x] = displayArray[y][x] + 1
-        # get count of data points using enumerate
-        
-        for i in range(len(x)):
-            try:
-                displayArray[int(y[i])][int(x[i])] = displayArray[int(y[i])][int(x[i])] + 1
-            except:
-                pass
-        smoothed = gaussian_filter(displayArray, sigma=50)
-        
-        plt.imshow(img, alpha=0.8)
-        plt.axis("off")
-        smoothed = gaussian_filter(displayArray, sigma=50)
-        plt.imshow(smoothed, cmap="jet", alpha=.5)
+        displayArray = np.bincount(
+            y * img_width + x, weights=weights, minlength=img_height * img_width
+        ).reshape(img_height, img_width)
+        smoothed = gaussian_filter(displayArray.astype("float64"), sigma=50)
+
+        # A figure outside of pyplot, so repeated calls don't draw over each other
+        fig = Figure()
+        ax = fig.add_subplot()
+        ax.imshow(img, alpha=0.8)
+        ax.axis("off")
+        ax.imshow(smoothed, cmap="jet", alpha=0.5)
         # remove the white space around the image
-
-        plt.subplots_adjust(left=0, right=1, top=1, bottom=0)
-       
-        # save the plot as fig
-        fig = plt.gcf()
-        # return the plot
+        fig.subplots_adjust(left=0, right=1, top=1, bottom=0)
         return fig
 
-    
\ No newline at end of file
+    @instrumentation.traced("render_heatmap")
+    def render_heatmap(
+        self, screenshot_path, output_path, tile_height=1024, sigma=50, image_alpha=0.8, heatmap_alpha=0.5,
+        fixations=None,
+    ):
+        """
+        Renders the gaze heatmap over the screenshot at its native
+        resolution and writes it as a PNG. The page is processed in
+        horizontal tiles, each one is smoothed with enough rows around it
+        for the gaussian kernel, so the result matches smoothing the whole
+        page while memory only grows with the tile size.
+        ---
+        Args:
+        ---
+        screenshot_path (str): The path to the web page screenshot.
+        output_path (str): The path of the PNG file to write.
+        tile_height (int): Number of rows rendered at a time.
+        sigma (float): Standard deviation of the gaussian smoothing, in pixels.
+        image_alpha (float): Opacity of the screenshot over a white background.
+        heatmap_alpha (float): Opacity of the heatmap over the screenshot.
+        fixations (str): None to count the raw samples, "ivt" or "idt" to
+            weigh the fixations by their duration instead.
+        ---
+        Returns:
+        ---
+        output_path (str): The path of the written PNG file.
+        """
+        img = Image.open(screenshot_path)
+        img_width, img_height = img.size
+        x, y, weights = self.__gaze_pixels(img_width, img_height, fixations)
+
+        # Sort the points by row so each tile takes a contiguous slice
+        order = np.argsort(y, kind="stable")
+        x, y, weights = x[order], y[order], weights[order]
+
+        # Same as gaussian_filter's default truncate of 4 standard deviations
+        halo = int(4.0 * sigma + 0.5)
+        tiles = range(0, img_height, tile_height)
+
+        def smoothed_tile(top):
+            bottom = min(top + tile_height, img_height)
+            start, stop = max(top - halo, 0), min(bottom + halo, img_height)
+            first, last = np.searchsorted(y, [start, stop])
+            counts = np.bincount(
+                (y[first:last] - start) * img_width + x[first:last],
+                weights=weights[first:last],
+                minlength=(stop - start) * img_width,
+            ).reshape(stop - start, img_width)
+            smoothed = gaussian_filter(counts.astype("float64"), sigma=sigma)
+            return smoothed[top - start : bottom - start]
+
+        lut = colormaps["jet"](np.linspace(0, 1, 256))[:, :3] * 255
+        background = (1 - image_alpha) * 255
+
+        # The smoothed tiles are kept on disk, the second pass reads them
+        # back instead of smoothing every tile again
+        with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(output_path))) as spill:
+            page = np.memmap(spill, dtype="float32", mode="w+", shape=(img_height, img_width))
+
+            # First pass for the colour scale limits, like imshow does on the whole page
+            vmin, vmax = np.inf, -np.inf
+            for top in tiles:
+                # the limits are taken on the stored values
+                smoothed = smoothed_tile(top).astype("float32")
+                page[top : top + len(smoothed)] = smoothed
+                vmin, vmax = min(vmin, smoothed.min()), max(vmax, smoothed.max())
+            scale = 1.0 / (vmax - vmin) if vmax > vmin else 0.0
+
+            with _PngWriter(output_path, img_width, img_height) as writer:
+                for top in tiles:
+                    bottom = min(top + tile_height, img_height)
+                    smoothed = page[top:bottom].astype("float64")
+                    levels = np.clip(((smoothed - vmin) * scale * 256).astype("int64"), 0, 255)
+                    pixels = np.asarray(
+                        img.crop((0, top, img_width, bottom)).convert("RGB"), dtype="float32"
+                    )
+                    pixels = pixels * image_alpha + background
+                    pixels = lut[levels] * heatmap_alpha + pixels * (1 - heatmap_alpha)
+                    writer.write_rows(np.clip(np.rint(pixels), 0, 255).astype("uint8"))
+            del page
+        img.close()
+        return output_path
+
+    @instrumentation.traced("aoi_metrics")
+    def aoi_metrics(self, aoi_map, channels=None, fixations="ivt"):
+        """
+        Scores the areas of interest of every page, the regions are in
+        pixels of the full page screenshot and the gaze is scrolled like
+        in the heatmaps
+        ---
+        Args:
+        ---
+        aoi_map (emotiongsr.aoi.AOIMap): The regions, keyed by URL.
+        channels (list): The columns to average, the numeric iMotions columns by default.
+        fixations (str): "ivt" or "idt" to count the fixations of every region,
+            see ``get_fixations``, None to skip them.
+        ---
+        Returns:
+        ---
+        metrics (pd.DataFrame): One row per region, see ``emotiongsr.aoi.aoi_metrics``.
+        """
+        data = self.merged_data
+        if channels is None:
+            excluded = {"Scroll Position", "Scroll Percentage", "Mouse X", "Mouse Y",
+                        "MeanGazeX", "MeanGazeY"}
+            channels = [
+                column for column in data.select_dtypes("number").columns
+                if column not in excluded and not column.startswith("ET_Gaze")
+            ]
+        participant = os.path.basename(self.imotion_data_path)
+        urls = data["URL"].to_numpy()
+        _, heights = aoi_map.size_of(urls)
+        P = data["Scroll Percentage"].to_numpy(dtype="float64") / 100
+        x = data["MeanGazeX"].to_numpy(dtype="float64")
+        y = np.abs(data["MeanGazeY"].to_numpy(dtype="float64")) + (P * heights)
+
+        found = None
+        if fixations is not None:
+            # the centroids are scrolled like the samples
+            found = self.get_fixations(fixations)
+            _, fixation_heights = aoi_map.size_of(found["URL"].to_numpy())
+            found = pd.DataFrame({
+                "SourceStimuliName": found["URL"],
+                "Participant": participant,
+                "X": found["X"],
+                "Y": np.abs(found["Y"]) + (found["Scroll Percentage"] / 100 * fixation_heights),
+            })
+
+        # Web events are irregular, each one lasts until the next
+        times = alignment.to_ns(data["Time (UTC)"])
+        durations = np.append(np.diff(times), 0) / 1e9
+        return aoi.aoi_metrics(
+            aoi_map,
+            urls,
+            np.full(len(data), participant, dtype=object),
+            x,
+            y,
+            values=data[channels],
+            normalized=False,
+            sample_duration=np.maximum(durations, 0),
+            fixations=found,
+        )
+
+
+class _PngWriter:
+    """
+    Minimal RGB PNG writer that compresses rows as they are written,
+    so the whole image never has to be in memory at once. The rows go to
+    a temporary file renamed to the path once the image is complete, an
+    error while rendering removes it and leaves the path untouched.
+    """
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.width = width
+        handle, self.partial_path = tempfile.mkstemp(
+            suffix=".tmp", dir=os.path.dirname(os.path.abspath(path))
+        )
+        self.file = os.fdopen(handle, "wb")
+        self.compressor = zlib.compressobj(6)
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        self.__chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def __chunk(self, tag, data):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(tag + data)
+        self.file.write(struct.pack(">I", zlib.crc32(tag + data)))
+
+    def write_rows(self, rows):
+        # Every scanline starts with filter type 0 (none)
+        scanlines = np.zeros((rows.shape[0], self.width * 3 + 1), dtype="uint8")
+        scanlines[:, 1:] = rows.reshape(rows.shape[0], -1)
+        data = self.compressor.compress(scanlines.tobytes())
+        if data:
+            self.__chunk(b"IDAT", data)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.__chunk(b"IDAT", self.compressor.flush())
+        self.__chunk(b"IEND", b"")
+        self.file.close()
+        os.replace(self.partial_path, self.path)
+
+    def discard(self):
+        if self.file.closed:
+            return
+        self.file.close()
+        os.remove(self.partial_path)
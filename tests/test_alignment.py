@@ -0,0 +1,95 @@
+"""
+test_alignment.py
+
+Checks the index arithmetic of the time alignment helpers against
+pandas, which they replace.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from emotiongsr import alignment
+
+
+def merge_asof_indices(left, right, direction, tolerance):
+    # the row of right that pd.merge_asof picks for every row of left
+    matched = pd.merge_asof(
+        pd.DataFrame({"time": left}),
+        pd.DataFrame({"time": right, "row": np.arange(right.size)}),
+        on="time",
+        direction=direction,
+        tolerance=tolerance,
+    )
+    return matched["row"].fillna(alignment.NO_MATCH).to_numpy(dtype="int64")
+
+
+@pytest.mark.parametrize("direction", alignment.DIRECTIONS)
+@pytest.mark.parametrize("tolerance", [None, 0, 3, 25])
+def test_asof_indices_matches_merge_asof(direction, tolerance):
+    generator = np.random.default_rng(0)
+    right = np.sort(generator.integers(0, 500, 120))
+    # before, inside and after the right times, with exact hits
+    left = np.sort(np.r_[generator.integers(-50, 550, 300), right[::7]])
+    expected = merge_asof_indices(left, right, direction, tolerance)
+    found = alignment.asof_indices(left, right, direction=direction, tolerance=tolerance)
+    np.testing.assert_array_equal(found, expected)
+
+
+def test_asof_indices_unsorted_left_and_empty_right():
+    right = np.array([10, 20, 30])
+    left = np.array([25, 5, 31, 20])
+    np.testing.assert_array_equal(
+        alignment.asof_indices(left, right, "backward"), [1, -1, 2, 1]
+    )
+    np.testing.assert_array_equal(
+        alignment.asof_indices(left, right, "forward"), [2, 0, -1, 1]
+    )
+    # ties go backward
+    np.testing.assert_array_equal(
+        alignment.asof_indices(np.array([15]), right, "nearest"), [0]
+    )
+    np.testing.assert_array_equal(
+        alignment.asof_indices(left, np.array([], dtype="int64")), [-1] * 4
+    )
+    with pytest.raises(ValueError):
+        alignment.asof_indices(left, right, "sideways")
+
+
+def test_take_fills_missing():
+    gathered = alignment.take(np.array([1, 2, 3]), np.array([2, -1, 0]))
+    np.testing.assert_array_equal(gathered, [3.0, np.nan, 1.0])
+    gathered = alignment.take(np.array(["a", "b"], dtype=object), np.array([-1, 1]), None)
+    assert gathered.tolist() == [None, "b"]
+
+
+@pytest.mark.parametrize("how", ["mean", "sum", "max", "count"])
+def test_bin_reduce_matches_groupby(how):
+    generator = np.random.default_rng(1)
+    bins = generator.integers(-1, 6, 200)
+    values = generator.normal(size=(200, 2))
+    values[generator.random((200, 2)) < 0.2] = np.nan
+    reduced = alignment.bin_reduce(bins, values, 8, how=how)
+
+    frame = pd.DataFrame(values[bins >= 0]).groupby(bins[bins >= 0])
+    # empty bins are NaN, but have a count of 0
+    if how == "sum":
+        expected = frame.sum(min_count=1).reindex(range(8))
+    else:
+        expected = getattr(frame, how)().reindex(range(8))
+    if how == "count":
+        expected = expected.fillna(0)
+    np.testing.assert_allclose(reduced, expected.to_numpy(dtype="float64"))
+
+
+def test_to_ns_and_ms_to_ns():
+    times = pd.Series(pd.to_datetime(["2024-01-01 00:00:01+01:00", None]))
+    ns = alignment.to_ns(times)
+    assert ns[0] == pd.Timestamp("2024-01-01 00:00:01+01:00").value
+    assert ns[1] == np.iinfo("int64").min
+    np.testing.assert_array_equal(alignment.ms_to_ns([1.5, 2]), [1_500_000, 2_000_000])
@@ -0,0 +1,115 @@
+"""
+test_aoi.py
+
+Checks the rasterized label masks, the lookup of samples in the flat
+mask of the study and the metrics of every region on samples whose
+regions are known.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from emotiongsr import aoi
+
+DEFINITIONS = {
+    "first": {
+        "size": [10, 8],
+        "aois": [
+            {"name": "left", "rect": [0, 0, 5, 8]},
+            # later regions are on top of the earlier ones
+            {"name": "corner", "rect": [3, 0, 10, 2]},
+        ],
+    },
+    "second": {
+        "size": [6, 6],
+        "aois": [{"name": "square", "polygon": [[2, 2], [4, 2], [4, 4], [2, 4]]}],
+    },
+}
+
+
+def test_rasterize_rects_and_polygons():
+    labels = aoi.rasterize(DEFINITIONS["first"]["aois"], (10, 8))
+    assert labels.shape == (8, 10)
+    assert labels[5, 0] == 0 and labels[5, 4] == 0 and labels[5, 5] == aoi.NO_AOI
+    assert labels[0, 3] == 1 and labels[1, 9] == 1 and labels[2, 9] == aoi.NO_AOI
+    # a rect reaching outside of the image is clipped
+    clipped = aoi.rasterize([{"name": "out", "rect": [-3, -3, 2, 2]}], (4, 4))
+    assert (clipped == 0).sum() == 4
+    # the polygon outline is inside
+    square = aoi.rasterize(DEFINITIONS["second"]["aois"], (6, 6))
+    assert np.array_equal(np.argwhere(square == 0).min(axis=0), [2, 2])
+    assert np.array_equal(np.argwhere(square == 0).max(axis=0), [4, 4])
+    with pytest.raises(ValueError):
+        aoi.rasterize([{"name": "nothing"}], (4, 4))
+
+
+def test_aoi_map_areas_and_ids():
+    aoi_map = aoi.AOIMap(DEFINITIONS)
+    assert aoi_map.aois["AOI_ID"].tolist() == [0, 1, 2]
+    assert aoi_map.aois["SourceStimuliName"].tolist() == ["first", "first", "second"]
+    # the corner covers 2 columns of the left region
+    assert aoi_map.aois["Area"].tolist() == [36, 14, 9]
+
+
+def test_lookup_across_stimuli():
+    aoi_map = aoi.AOIMap(DEFINITIONS)
+    stimuli = ["first", "first", "first", "second", "second", "other", "first", "first"]
+    x = [0, 9, 7, 3, 0, 1, np.nan, 10]
+    y = [7, 1, 5, 3, 0, 1, 1, 1]
+    expected = [0, 1, aoi.NO_AOI, 2, aoi.NO_AOI, aoi.NO_AOI, aoi.NO_AOI, aoi.NO_AOI]
+    found = aoi_map.lookup(stimuli, x, y, normalized=False)
+    np.testing.assert_array_equal(found, expected)
+    # the same samples normalised to the size of their stimulus
+    sizes = np.array([[10, 8]] * 3 + [[6, 6]] * 2 + [[1, 1]] + [[10, 8]] * 2, dtype="float64")
+    normalized = aoi_map.lookup(
+        stimuli, np.asarray(x) / sizes[:, 0], np.asarray(y) / sizes[:, 1]
+    )
+    np.testing.assert_array_equal(normalized, expected)
+
+
+def test_aoi_metrics_counts_entries_dwell_and_fixations():
+    aoi_map = aoi.AOIMap(DEFINITIONS)
+    # P1: left, left, no gaze, left, corner, left; P2: corner, outside
+    stimuli = ["first"] * 8
+    participants = ["P1"] * 6 + ["P2"] * 2
+    x = [1, 1, np.nan, 1, 8, 1, 8, 8]
+    y = [4, 4, np.nan, 4, 1, 4, 1, 6]
+    values = pd.DataFrame({"Joy": [1.0, 2.0, 9.0, 3.0, 5.0, 4.0, 7.0, 9.0]})
+    found = pd.DataFrame(
+        {
+            "SourceStimuliName": ["first", "first", "first", "second"],
+            "Participant": ["P1", "P1", "P2", "P1"],
+            "X": [1, 8, 8, 3],
+            "Y": [4, 1, 1, 3],
+        }
+    )
+    metrics = aoi.aoi_metrics(
+        aoi_map, stimuli, participants, x, y, values=values, normalized=False,
+        sample_duration=0.5, fixations=found,
+    )
+    metrics = metrics.set_index(["AOI", "Participant"])
+    assert metrics.loc[("left", "P1"), ["Samples", "Entries", "Fixations"]].tolist() == [4, 2, 1]
+    assert metrics.loc[("left", "P1"), "Dwell_Time"] == 2.0
+    assert metrics.loc[("left", "P1"), "Mean_Joy"] == 2.5
+    assert metrics.loc[("corner", "P1"), ["Samples", "Entries", "Fixations"]].tolist() == [1, 1, 1]
+    assert metrics.loc[("corner", "P2"), ["Samples", "Entries", "Fixations"]].tolist() == [1, 1, 1]
+    assert metrics.loc[("left", "P2"), ["Samples", "Entries", "Fixations"]].tolist() == [0, 0, 0]
+    assert np.isnan(metrics.loc[("left", "P2"), "Mean_Joy"])
+    # no sample of P1 on the second stimulus, its fixation is still counted
+    assert metrics.loc[("square", "P1"), ["Samples", "Fixations"]].tolist() == [0, 1]
+
+
+def test_aoi_metrics_irregular_durations_and_no_fixations():
+    aoi_map = aoi.AOIMap(DEFINITIONS)
+    metrics = aoi.aoi_metrics(
+        aoi_map, ["first"] * 3, ["P1"] * 3, [1, 1, 8], [4, 4, 1], normalized=False,
+        sample_duration=[0.1, 0.3, 0.2],
+    )
+    assert "Fixations" not in metrics.columns
+    np.testing.assert_allclose(metrics["Dwell_Time"], [0.4, 0.2, 0.0])
@@ -0,0 +1,73 @@
+"""
+test_channelstore.py
+
+Checks that the channel store gives back the rows of the clean data:
+the contiguous slices of every stimulus and participant, and the frame
+of a selection after a round trip through pickle.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from emotiongsr.channelstore import ChannelStore, write_store
+
+
+def clean_data():
+    # interleaved recordings, in time order within each one
+    index = pd.DatetimeIndex(
+        pd.to_datetime("2024-01-01") + pd.to_timedelta(np.arange(8) * 10, "ms"),
+        name="Timestamp",
+    )
+    return pd.DataFrame(
+        {
+            "SourceStimuliName": ["b", "a", "b", "a", "a", "b", "a", "b"],
+            "Participant": ["P1", "P2", "P2", "P1", "P2", "P1", "P1", "P2"],
+            "Joy": np.arange(8, dtype="float64"),
+            "GSR Raw": np.arange(8, dtype="float64") * 10,
+        },
+        index=index,
+    )
+
+
+def test_segments_are_contiguous_and_sorted(tmp_path):
+    store = write_store(clean_data(), str(tmp_path / "store"))
+    assert len(store) == 8
+    assert store.channels == ["Joy", "GSR Raw"]
+    assert store.stimuli == ["a", "b"]
+    segments = store.segments[["SourceStimuliName", "Participant", "start", "stop"]]
+    assert segments.values.tolist() == [
+        ["a", "P1", 0, 2], ["a", "P2", 2, 4], ["b", "P1", 4, 6], ["b", "P2", 6, 8]
+    ]
+    # the samples stay in time order within every recording
+    np.testing.assert_array_equal(store.channel("Joy"), [3, 6, 1, 4, 0, 5, 2, 7])
+    assert store.rows("b") == slice(4, 8)
+    assert store.rows("a", "P2") == slice(2, 4)
+    assert store.rows("c") == slice(0, 0)
+    with pytest.raises(ValueError):
+        store.rows(participant="P1")
+
+
+def test_frame_matches_the_clean_data(tmp_path):
+    data = clean_data()
+    store = pickle.loads(pickle.dumps(write_store(data, str(tmp_path / "store"))))
+    for stimulus, participant in [("a", None), ("b", "P2"), (None, "P1"), (None, None)]:
+        expected = data
+        if stimulus is not None:
+            expected = expected[expected["SourceStimuliName"] == stimulus]
+        if participant is not None:
+            expected = expected[expected["Participant"] == participant]
+        frame = store.frame(stimulus, participant)
+        expected = expected.sort_values(["SourceStimuliName", "Participant"], kind="stable")
+        pd.testing.assert_frame_equal(frame, expected, check_dtype=False, check_freq=False)
+    assert store.frame("c").empty
+    assert store.frame("a", channels=["GSR Raw"]).columns.tolist() == [
+        "SourceStimuliName", "Participant", "GSR Raw"
+    ]
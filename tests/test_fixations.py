@@ -0,0 +1,112 @@
+"""
+test_fixations.py
+
+Checks the I-VT and I-DT detectors on a hand-built gaze trace, whose
+fixations are known sample by sample.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from emotiongsr import fixations
+
+
+def gaze_trace():
+    """
+    100 Hz gaze: a fixation at (100, 100) on samples 0-29, a saccade on
+    30-32, a fixation at (600, 400) on 33-54, no gaze on 55-69 (longer
+    than MAX_GAP), the same place again on 70-99, then 50 ms at
+    (900, 100) on 100-104, shorter than MIN_DURATION
+    """
+    times = np.arange(120) / 100
+    x = np.full(times.size, np.nan)
+    y = np.full(times.size, np.nan)
+    x[0:30], y[0:30] = 100, 100
+    x[30:33], y[30:33] = [250, 400, 550], [200, 300, 380]
+    x[33:55], y[33:55] = 600, 400
+    x[70:100], y[70:100] = 600, 400
+    x[100:105], y[100:105] = 900, 100
+    return times, x, y
+
+
+@pytest.mark.parametrize(
+    "method, options",
+    [("ivt", {"velocity_smoothing": 1}), ("idt", {})],
+)
+def test_detect_finds_the_known_fixations(method, options):
+    times, x, y = gaze_trace()
+    found = fixations.detect(
+        times, x, y, values=np.arange(times.size, dtype="float64"), method=method, **options
+    )
+    np.testing.assert_array_equal(found["first"], [0, 33, 70])
+    np.testing.assert_array_equal(found["last"], [29, 54, 99])
+    np.testing.assert_array_equal(found["samples"], [30, 22, 30])
+    np.testing.assert_allclose(found["start"], [0.0, 0.33, 0.70])
+    np.testing.assert_allclose(found["duration"], [0.29, 0.21, 0.29])
+    np.testing.assert_allclose(found["x"], [100, 600, 600])
+    np.testing.assert_allclose(found["y"], [100, 400, 400])
+    # the values are averaged from first to last, both included
+    np.testing.assert_allclose(found["values"][:, 0], [14.5, 43.5, 84.5])
+
+
+def test_ivt_smoothing_only_trims_the_edges():
+    times, x, y = gaze_trace()
+    found = fixations.detect(times, x, y, method="ivt")
+    np.testing.assert_array_equal(found["first"], [0, 34, 70])
+    np.testing.assert_array_equal(found["last"], [28, 54, 98])
+    np.testing.assert_allclose(found["x"], [100, 600, 600])
+
+
+def test_idt_ignores_jitter_below_the_threshold():
+    times, x, y = gaze_trace()
+    jitter = np.where(np.arange(times.size) % 2, 10.0, -10.0)
+    found = fixations.detect(times, x + jitter, y - jitter, method="idt")
+    np.testing.assert_array_equal(found["first"], [0, 33, 70])
+    np.testing.assert_array_equal(found["last"], [29, 54, 99])
+
+
+def test_fixations_never_cross_segments():
+    times, x, y = gaze_trace()
+    segments = (np.arange(times.size) >= 15).astype("int64")
+    found = fixations.detect(times, x, y, segments=segments, method="idt")
+    np.testing.assert_array_equal(found["first"], [0, 15, 33, 70])
+    np.testing.assert_array_equal(found["segment"], [0, 1, 1, 1])
+
+
+def test_detect_without_fixations_and_unknown_method():
+    times = np.arange(5) / 100
+    found = fixations.detect(times, np.zeros(5), np.zeros(5), values=np.zeros((5, 2)))
+    assert found["first"].size == 0
+    assert found["values"].shape == (0, 2)
+    with pytest.raises(ValueError):
+        fixations.detect(times, np.zeros(5), np.zeros(5), method="ikf")
+
+
+def test_detect_fixations_on_a_dataframe():
+    times, x, y = gaze_trace()
+    data = pd.DataFrame(
+        {
+            "Timestamp": times * 1000,
+            "Participant": "P1",
+            "ET_GazeLeftx": x - 5,
+            "ET_GazeRightx": x + 5,
+            "ET_GazeLefty": y,
+            "ET_GazeRighty": y,
+            "Joy": np.arange(times.size, dtype="float64"),
+        }
+    )
+    found = fixations.detect_fixations(
+        data, "idt", channels=["Joy"], time_column="Timestamp", by=["Participant"]
+    )
+    assert found.columns.tolist() == [
+        "Participant", "Start", "Duration", "Samples", "X", "Y", "Joy"
+    ]
+    np.testing.assert_allclose(found["Start"], [0, 330, 700])
+    np.testing.assert_allclose(found["X"], [100, 600, 600])
+    np.testing.assert_allclose(found["Joy"], [14.5, 43.5, 84.5])
@@ -0,0 +1,65 @@
+"""
+test_peaks.py
+
+Checks the peak selection against a plain greedy selection, channel by
+channel, and on a hand-built signal.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import numpy as np
+import pytest
+
+from emotiongsr.peaks import select_peaks
+
+
+def greedy_peaks(values, times, k, min_gap):
+    # the highest value first, ties by position, skipping close ones
+    rows = np.full((k, values.shape[1]), -1, dtype="int64")
+    for channel in range(values.shape[1]):
+        column = values[:, channel]
+        order = sorted(np.flatnonzero(~np.isnan(column)), key=lambda row: (-column[row], row))
+        selected = []
+        for row in order:
+            if len(selected) == k:
+                break
+            if all(abs(times[row] - times[other]) >= min_gap for other in selected):
+                selected.append(row)
+        rows[: len(selected), channel] = selected
+    return rows
+
+
+def test_select_peaks_by_hand():
+    times = np.arange(10) * 100.0
+    values = np.array([0, 5, 9, 8, 0, 0, 7, 0, 6, 6], dtype="float64")
+    np.testing.assert_array_equal(select_peaks(values, times, k=3)[:, 0], [2, 3, 6])
+    # 8 is within 150 of 9, the tie at the end goes to the first one
+    np.testing.assert_array_equal(
+        select_peaks(values, times, k=3, min_gap=150)[:, 0], [2, 6, 8]
+    )
+    # not enough peaks apart
+    np.testing.assert_array_equal(
+        select_peaks(values, times, k=3, min_gap=500)[:, 0], [2, 8, -1]
+    )
+
+
+@pytest.mark.parametrize("k, min_gap", [(1, 0.0), (3, 0.0), (3, 5.0), (5, 40.0)])
+def test_select_peaks_matches_greedy(k, min_gap):
+    generator = np.random.default_rng(k)
+    values = np.round(generator.normal(size=(300, 4)), 1)
+    values[generator.random(values.shape) < 0.1] = np.nan
+    # a channel with fewer finite values than peaks
+    values[3:, 3] = np.nan
+    times = np.cumsum(generator.uniform(0.5, 1.5, 300))
+    np.testing.assert_array_equal(
+        select_peaks(values, times, k=k, min_gap=min_gap, oversample=1),
+        greedy_peaks(values, times, k, min_gap),
+    )
+
+
+def test_select_peaks_without_rows():
+    rows = select_peaks(np.empty((0, 2)), np.empty(0), k=2)
+    np.testing.assert_array_equal(rows, [[-1, -1], [-1, -1]])
@@ -0,0 +1,77 @@
+"""
+test_summary.py
+
+Checks the grouped statistics of the study summary and the category
+roll-up on a small frame whose numbers are worked out by hand.
+
+Created on October 2026
+
+Colchester, Essex.
+
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from emotiongsr import summary
+
+
+def clean_data():
+    # two stimuli of P1 at 1 row per second, the second one starts later
+    index = pd.DatetimeIndex(
+        pd.to_datetime("2024-01-01 10:00:00") + pd.to_timedelta([0, 1, 2, 3, 10, 11], "s"),
+        name="Timestamp",
+    )
+    return pd.DataFrame(
+        {
+            "SourceStimuliName": ["a", "a", "a", "a", "b", "b"],
+            "Participant": "P1",
+            "Joy": [1.0, 3.0, np.nan, 8.0, 2.0, 4.0],
+        },
+        index=index,
+    )
+
+
+def test_summarize_statistics():
+    result = summary.summarize(
+        clean_data(), channels=["Joy"], baseline=2.0, categories={"a": "positive"},
+        sample_duration=1.0,
+    ).set_index("SourceStimuliName")
+    first = result.loc["a"]
+    assert first["Category"] == "positive"
+    assert first["Duration"] == 4.0 and first["Samples"] == 3
+    assert first["Baseline"] == 2.0
+    assert first["Mean"] == 4.0 and first["Peak"] == 8.0
+    assert first["AUC"] == 16.0
+    assert first["Mean_Corrected"] == 2.0
+    assert first["Peak_Corrected"] == 6.0
+    assert first["AUC_Corrected"] == 8.0
+    second = result.loc["b"]
+    # the baseline is taken from the start of every stimulus
+    assert second["Baseline"] == 3.0 and second["Duration"] == 2.0
+    assert pd.isna(second["Category"])
+
+
+def test_roll_up_keeps_stimuli_without_a_category():
+    table = summary.summarize(
+        clean_data(), channels=["Joy"], categories={"a": "positive"}, sample_duration=1.0
+    )
+    rolled = summary.roll_up(table)
+    assert len(rolled) == 2
+    assert rolled["Stimuli"].tolist() == [1, 1]
+    assert rolled["Category"].iloc[0] == "positive"
+    assert pd.isna(rolled["Category"].iloc[1])
+    assert rolled["Mean"].tolist() == [4.0, 3.0]
+
+    # without categories everything is one group
+    rolled = summary.roll_up(summary.summarize(clean_data(), channels=["Joy"]))
+    assert len(rolled) == 1
+    assert rolled["Stimuli"].iloc[0] == 2
+    assert rolled["Mean"].iloc[0] == pytest.approx(3.5)
+
+
+def test_write_summary_picks_the_format_from_the_extension(tmp_path):
+    table = summary.summarize(clean_data(), channels=["Joy"])
+    path = summary.write_summary(table, str(tmp_path / "out" / "summary.csv"))
+    assert pd.read_csv(path)["Mean"].tolist() == table["Mean"].tolist()
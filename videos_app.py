@@ -3,12 +3,16 @@ import pandas as pd
 import numpy as np
 import cv2
 import os
+import hashlib
+import json
+import queue
+import threading
 from skimage.metrics import structural_similarity as ssim
 from IPython.display import Image, display
 import shutil
 import tkinter as tk
 import tkinter as tk
-from tkinter import filedialog
+from tkinter import filedialog, messagebox
 from tkinter import ttk
 from PIL import Image, ImageTk
 from PIL import Image as PILImage
@@ -19,28 +23,116 @@ import warnings
 warnings.filterwarnings('ignore')
 import gc
 
-def calculate_timestamps(video_path):
-    # Open the video file
-    video = cv2.VideoCapture(video_path)
-
-    # Get the frame rate and duration of the video
+from emotiongsr import alignment, gsr, instrumentation
+from emotiongsr.peaks import select_peaks
+
+# Row of the export with the column names, after the metadata preamble
+HEADER_ROW = 31
+
+EMOTION_CHANNELS = ['Anger','Contempt','Disgust','Fear','Joy','Sadness','Surprise',
+                    'Engagement','Valence','Sentimentality','Confusion','Neutral','Attention']
+
+# Channels synced with the video frames
+VIDEO_CHANNELS = EMOTION_CHANNELS + ['Phasic Signal','Heart Rate PPG ALG']
+
+# Scene change detection, frames are compared at DETECTION_WIDTH pixels
+# and pairs with a mean difference under DIFF_THRESHOLD grey levels
+# skip the SSIM check
+SSIM_THRESHOLD = 0.9
+DETECTION_WIDTH = 320
+DIFF_THRESHOLD = 1.0
+
+# Frames to decode forward when extracting, further away frames are sought
+SEEK_DISTANCE = 64
+
+# Minimum time between the reported peaks of a channel, in ms
+PEAK_MIN_GAP = 1000
+
+# Video analysis shared by every participant, keyed by the video content
+VIDEO_CACHE_DIR = os.path.join("experiments", ".video_cache")
+# bumped when entries must be dropped, 2 drops the empty analyses of failed decodes
+VIDEO_CACHE_VERSION = 2
+_FINGERPRINTS = {}
+
+# Frames between progress reports while decoding
+PROGRESS_INTERVAL = 30
+
+# How often the GUI applies the worker events
+EVENT_POLL_MS = 100
+
+# Frames are stored once per experiment under their content hash and
+# linked into the result folders, or listed in a manifest file
+FRAME_STORE_DIR = ".frames"
+FRAME_MANIFEST = "frames.json"
+
+# Result thumbnails
+THUMBNAIL_DIR = os.path.join("experiments", ".thumbnails")
+THUMBNAIL_SIZE = (300, 300)
+
+def probe_video(video):
+    """
+    Reads the frame count, frame rate and duration of an opened video and
+    builds the frame timestamps assuming a constant frame rate, the
+    timestamps recorded while decoding replace them with
+    ``update_timestamps``.
+    ---
+    Returns
+    ---
+        info(dict) frame_count, fps, duration in seconds and timestamps,
+        the start of every frame in seconds
+    """
     fps = video.get(cv2.CAP_PROP_FPS)
-    duration = video.get(cv2.CAP_PROP_FRAME_COUNT) / fps
-
-    # Initialize the list to store timestamps
-    timestamps = []
-    frames = []
+    frame_count = max(int(video.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+    return {
+        "frame_count": frame_count,
+        "fps": fps,
+        "duration": frame_count / fps if fps else 0.0,
+        "timestamps": np.arange(frame_count) / fps if fps else np.zeros(frame_count),
+    }
+
+
+def update_timestamps(info, frame_times):
+    """
+    Uses the timestamps read while decoding (CAP_PROP_POS_MSEC) when the
+    video doesn't have a constant frame rate, e.g. screen recordings that
+    only write a frame when something changes. The frame count always
+    comes from the decode, the container value is only an estimate.
+    ---
+    Args
+    ---
+        info(dict) output of ``probe_video``
+        frame_times(np.ndarray) start of every decoded frame in ms
+    ---
+    Returns
+    ---
+        info(dict) the same keys, with the timestamps of the decoded frames
+    """
+    frame_times = np.asarray(frame_times, dtype="float64") / 1000
+    frame_count = frame_times.size
+    fps = info["fps"]
+    constant = np.arange(frame_count) / fps if fps else frame_times
+
+    # Some backends don't report positions, trust them only if they move forward
+    reported = frame_count > 1 and frame_times[-1] > frame_times[0] and np.all(np.diff(frame_times) >= 0)
+    variable = reported and np.abs(frame_times - constant).max() > 0.5 / (fps or 1)
+    timestamps = frame_times - frame_times[0] if variable else constant
+
+    if variable:
+        # the last frame lasts as long as the average frame
+        duration = timestamps[-1] + timestamps[-1] / (frame_count - 1)
+    else:
+        duration = frame_count / fps if fps else 0.0
+    return {"frame_count": frame_count, "fps": fps, "duration": duration, "timestamps": timestamps}
 
-    # Calculate timestamps for each frame
-    for frame_num in range(int(video.get(cv2.CAP_PROP_FRAME_COUNT))):
-        timestamp = frame_num / fps
-        timestamps.append(timestamp)
-        frames.append(frame_num)
 
+def calculate_timestamps(video_path):
+    # Open the video file
+    video = cv2.VideoCapture(video_path)
+    info = probe_video(video)
     # Release the video capture object
     video.release()
 
-    return timestamps, duration,frames
+    return list(info["timestamps"]), info["duration"], list(range(info["frame_count"]))
 
 
 def get_top_three_frames_for_emotion(merged_df, emotion, base_output_dir):
@@ -49,296 +141,495 @@ def get_top_three_frames_for_emotion(merged_df, emotion, base_output_dir):
     if not os.path.exists(emotion_dir):
         os.makedirs(emotion_dir)
 
-    emotion_df = merged_df[merged_df['Variable'] == emotion]
+    emotion_df = merged_df[(merged_df['Variable'] == emotion) & merged_df['Path'].notna()]
     top_three_emotion_df = emotion_df.nlargest(3, 'Max_Values')
 
-    # Displaying the frames for top three emotions and saving them in the designated directory
+    # Displaying the frames for top three emotions and linking them in the designated directory
+    new_paths = []
     for index, row in top_three_emotion_df.iterrows():
         print(f"Frame: {row['Frames']}, Variable: {row['Variable']}, Max Value: {row['Max_Values']}")
-        
-        # Define the new save path for the image
-        new_image_path = os.path.join(emotion_dir, os.path.basename(row['Path']))
-        
-        # Copy the image to the new location
-        shutil.copy(row['Path'], new_image_path)
-        
-        # Update the path in the DataFrame to reflect the new location
-        row['Path'] = new_image_path
-        
-        # Display the image
-        # display(Image(filename=new_image_path))  
-
-        # Use these lines:
-        image = PILImage.open(new_image_path)
-        # image.show()
-
-    return top_three_emotion_df
-
 
-def main_code(video_path, csv_path,experiment_name,user_name,selected_emotion):
-    data = pd.read_csv(csv_path,low_memory=(False))
-    data.columns = list(data.iloc[31])
-    data = data[32:].reset_index(drop=True)
-    
-    print(data.head(5))
-    # Emotion Data
-    emotion_data = data[['Row','Timestamp','SourceStimuliName','Anger','Contempt',
-                         'Disgust','Fear','Joy','Sadness','Surprise','Engagement',
-                         'Valence','Sentimentality','Confusion','Neutral','Attention']]
-    emotions = emotion_data.drop(['Timestamp','SourceStimuliName','Row'],axis=1).columns
+        # The frame is linked, not copied, so re-running costs no disk space
+        new_paths.append(link_into(emotion_dir, os.path.basename(row['Path']), row['Path']))
+
+    # Update the path in the DataFrame to reflect the new location
+    return top_three_emotion_df.assign(Path=new_paths)
+
+
+def store_frame(frame, store_dir):
+    """
+    Saves a frame as PNG under the hash of its content, the same frame is
+    only stored once however many results use it.
+    ---
+    Returns
+    ---
+        frame_path(str) the path of the frame in the store
+    ---
+    Raises
+    ---
+        ValueError: if the frame can't be encoded
+    """
+    ok, encoded = cv2.imencode(".png", frame)
+    if not ok:
+        raise ValueError("The frame could not be encoded as PNG")
+    data = encoded.tobytes()
+    frame_path = os.path.join(store_dir, f"{hashlib.sha256(data).hexdigest()}.png")
+    if not os.path.exists(frame_path):
+        os.makedirs(store_dir, exist_ok=True)
+        partial_path = f"{frame_path}.{os.getpid()}"
+        with open(partial_path, "wb") as file:
+            file.write(data)
+        os.replace(partial_path, frame_path)
+    return frame_path
+
+
+def link_into(folder, name, source):
+    """
+    Puts a stored frame in a result folder as a hard link. When the file
+    system doesn't support links the frame is listed in the folder's
+    manifest file instead.
+    ---
+    Returns
+    ---
+        path(str) the path to open the frame with
+    """
+    destination = os.path.join(folder, name)
+    if os.path.exists(destination):
+        if os.path.samefile(destination, source):
+            return destination
+        # left over from an earlier run
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+        return destination
+    except OSError:
+        manifest_path = os.path.join(folder, FRAME_MANIFEST)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as file:
+                manifest = json.load(file)
+        if manifest.get(name) != os.path.abspath(source):
+            manifest[name] = os.path.abspath(source)
+            with open(manifest_path, "w", encoding="utf-8") as file:
+                json.dump(manifest, file, indent=2)
+        return source
+
+
+def frames_for_samples(channel_data, columns, frame_edges):
+    """
+    Maps every sample to the video frame on screen when it was recorded
+    and averages the samples of each frame, missing values are skipped
+    per channel.
+    ---
+    Args
+    ---
+        channel_data(pd.DataFrame) samples with a Timestamp column in ms
+        columns(list) the channels to average
+        frame_edges(np.ndarray) frame start times in ms on the sensor
+        clock, followed by the end time of the last frame
+    ---
+    Returns
+    ---
+        frames(pd.DataFrame) one row per frame with samples, with the
+        frame Timestamp, SourceStimuliName, Frames and the channel means
+    """
+    n_frames = len(frame_edges) - 1
+    bins = alignment.bin_indices(
+        alignment.ms_to_ns(channel_data["Timestamp"]), alignment.ms_to_ns(frame_edges)
+    )
+    means = alignment.bin_reduce(bins, channel_data[list(columns)].to_numpy(), n_frames)
+    has_samples = ~np.isnan(means).all(axis=1)
+
+    frames = pd.DataFrame(means[has_samples], columns=list(columns))
+    frames.insert(0, "Frames", np.flatnonzero(has_samples))
+    frames.insert(0, "SourceStimuliName", 1.0)
+    frames.insert(0, "Timestamp", frame_edges[:-1][has_samples])
+    return frames
+
+
+def read_sensor_csv(csv_path, header_row=HEADER_ROW):
+    """
+    Reads an iMotions export, the column names are in the row after the
+    metadata preamble.
+    """
+    data = pd.read_csv(csv_path, low_memory=False)
+    data.columns = list(data.iloc[header_row])
+    return data[header_row + 1:].reset_index(drop=True)
+
+
+def sync_channels(data, channels, frame_times, duration):
+    """
+    Puts every channel on the video frames in a single pass: the columns
+    are converted and filtered to the stimulus once, then all of them are
+    averaged per frame together.
+    ---
+    Args
+    ---
+        data(pd.DataFrame) the export from ``read_sensor_csv``
+        channels(list) the channels to sync, the ones missing in the
+        export are skipped
+        frame_times(np.ndarray) frame start times in seconds from the
+        start of the video
+        duration(float) length of the video in seconds
+    ---
+    Returns
+    ---
+        per_frame(pd.DataFrame) one row per frame with the frame
+        Timestamp (ms), SourceStimuliName, Frames and one column per channel
+        channels(list) the channels that were synced
+    """
+    channels = [channel for channel in channels if channel in data.columns]
+    samples = data[["Timestamp", "SourceStimuliName"] + channels].astype("float64")
+    samples = samples.loc[samples.SourceStimuliName == 1]
+    samples = samples.dropna(subset=channels, how="all")
+
+    # The video starts with the first sample of the stimulus
+    frame_edges = np.append(np.asarray(frame_times), duration) * 1000
+    frame_edges = frame_edges + samples["Timestamp"].min()
+    return frames_for_samples(samples, channels, frame_edges), channels
+
+
+def top_frames(per_frame, channels, k=3, min_gap=PEAK_MIN_GAP):
+    """
+    Finds the k frames with the highest value of every channel, at least
+    min_gap ms apart so each one is a different moment of the video.
+    ---
+    Returns
+    ---
+        top(pd.DataFrame) up to k rows per channel with Timestamp,
+        SourceStimuliName, Frames, Variable and Max_Values
+    """
+    values = per_frame[channels].to_numpy()
+    rows = select_peaks(values, per_frame["Timestamp"].to_numpy(), k=k, min_gap=min_gap)
+
+    # channel by channel, highest first, without the missing peaks
+    columns = np.repeat(np.arange(len(channels)), rows.shape[0])
+    rows = rows.T.ravel()
+    found = rows >= 0
+    rows, columns = rows[found], columns[found]
+    return pd.DataFrame(
+        {
+            "Timestamp": per_frame["Timestamp"].to_numpy()[rows],
+            "SourceStimuliName": per_frame["SourceStimuliName"].to_numpy()[rows],
+            "Frames": per_frame["Frames"].to_numpy()[rows],
+            "Variable": np.asarray(channels)[columns],
+            "Max_Values": values[rows, columns],
+        }
+    )
+
+
+def _detection_frame(frame, width):
+    # Grayscale, downscaled to the detection width and lightly blurred,
+    # the blur is the original 21x21 kernel scaled with the frame
+    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    scale = 1.0 if width is None else min(1.0, width / gray_frame.shape[1])
+    if scale < 1.0:
+        size = (width, max(1, round(gray_frame.shape[0] * scale)))
+        gray_frame = cv2.resize(gray_frame, size, interpolation=cv2.INTER_AREA)
+    kernel = max(3, int(21 * scale) | 1)
+    return cv2.GaussianBlur(gray_frame, (kernel, kernel), 0)
+
+
+def detect_scene_changes(video, threshold=SSIM_THRESHOLD, stride=1, width=DETECTION_WIDTH,
+                         diff_threshold=DIFF_THRESHOLD, on_change=None, progress=None):
+    """
+    Finds the frames where the screen changes (e.g. a scroll) by comparing
+    each frame with the previous one on small grayscale copies. The mean
+    absolute difference is checked first and SSIM is only computed for
+    the pairs that differ at all.
+    ---
+    Args
+    ---
+        video(cv2.VideoCapture) an opened video, read from its position
+        threshold(float) SSIM below which a frame counts as a change
+        stride(int) compare every stride-th frame, the frames in between
+        are skipped without decoding
+        width(int) width of the frames used for the comparison, None
+        compares at full resolution like the original loop
+        diff_threshold(float) mean absolute difference, in grey levels,
+        below which two frames are treated as identical
+        on_change(callable) called with (frame index, timestamp in ms,
+        full resolution frame) for every change
+        progress(callable) called with (stage, frames done, frames total)
+        every PROGRESS_INTERVAL frames
+    ---
+    Returns
+    ---
+        frame_indices(np.ndarray) the frames where a change was detected
+        timestamps(np.ndarray) their position in the video in ms
+        frame_times(np.ndarray) the position of every frame in ms
+    ---
+    Raises
+    ---
+        ValueError: if stride is less than 1
+    """
+    if stride < 1:
+        raise ValueError("stride must be at least 1")
+    # Preallocated for the reported frame count, grown if that was short
+    capacity = max(int(video.get(cv2.CAP_PROP_FRAME_COUNT)), 1)
+    frame_indices = np.empty(capacity, dtype="int64")
+    frame_times = np.empty(capacity, dtype="float64")
+    n_changes = 0
+    prev_frame = None
+    count = 0
+    while True:
+        if prev_frame is not None and count % stride:
+            # grab still decodes the frame, it only skips converting it,
+            # the saving comes from not resizing and comparing it
+            ret, frame = video.grab(), None
+        else:
+            ret, frame = video.read()
+        if not ret:
+            break
 
-    print(data.columns)
+        if count == frame_times.size:
+            frame_times = np.resize(frame_times, 2 * count)
+            frame_indices = np.resize(frame_indices, 2 * count)
+        # Position of every frame, for variable frame rate videos
+        frame_times[count] = video.get(cv2.CAP_PROP_POS_MSEC)
+
+        if frame is not None:
+            gray_frame = _detection_frame(frame, width)
+            if prev_frame is not None and cv2.absdiff(prev_frame, gray_frame).mean() >= diff_threshold:
+                # If similarity is below the threshold, assume a scroll has occurred
+                if ssim(prev_frame, gray_frame) < threshold:
+                    frame_indices[n_changes] = count
+                    n_changes += 1
+                    if on_change is not None:
+                        on_change(count, frame_times[count], frame)
+            prev_frame = gray_frame
+        count += 1
+        if progress is not None and count % PROGRESS_INTERVAL == 0:
+            progress("Detecting scene changes", count, capacity)
+
+    frame_indices = frame_indices[:n_changes].copy()
+    frame_times = frame_times[:count].copy()
+    return frame_indices, frame_times[frame_indices], frame_times
+
+
+def extract_frames(video, frame_indices, output_dir, max_skip=SEEK_DISTANCE, store_dir=None):
+    """
+    Decodes only the requested frames and saves them as PNG files. Close
+    frames are reached by grabbing forward, far ones by seeking.
+    ---
+    Args
+    ---
+        video(cv2.VideoCapture) an opened video, its position is changed
+        frame_indices(array-like) the frames to save, repeats are saved once
+        output_dir(str) the folder for the frame_<index>.png files
+        max_skip(int) frames to grab forward before seeking instead
+        store_dir(str) frame store, when given the frames are saved there
+        once and linked into output_dir
+    ---
+    Returns
+    ---
+        frame_paths(dict) frame index to the path of the saved frame
+    """
+    frame_paths = {}
+    position = None
+    for index in np.unique(np.asarray(frame_indices, dtype="int64")):
+        if position is None or index < position or index - position > max_skip:
+            video.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            position = int(index)
+        while position < index:
+            video.grab()
+            position += 1
 
+        ret, frame = video.read()
+        if not ret:
+            break
+        position += 1
 
-    # GSR Data
-    gsr_data = data[['Row','Timestamp','SourceStimuliName','Phasic Signal']]
-    gsr = gsr_data.drop(['Timestamp','SourceStimuliName','Row'],axis=1).columns
+        # Save the frame
+        frame_name = f"frame_{index}.png"
+        if store_dir is None:
+            frame_path = os.path.join(output_dir, frame_name)
+            cv2.imwrite(frame_path, frame)
+        else:
+            frame_path = link_into(output_dir, frame_name, store_frame(frame, store_dir))
+        frame_paths[index] = frame_path
+    return frame_paths
+
+
+def video_fingerprint(video_path, chunk_size=1 << 20):
+    """
+    Hashes the content of a video, the hash is remembered for the same
+    path, size and modification time so it's only read once per session.
+    """
+    stat = os.stat(video_path)
+    key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _FINGERPRINTS:
+        digest = hashlib.sha256()
+        with open(video_path, "rb") as file:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                digest.update(chunk)
+        _FINGERPRINTS[key] = digest.hexdigest()
+    return _FINGERPRINTS[key]
+
+
+def analyse_video(video, video_path, threshold=SSIM_THRESHOLD, stride=1, width=DETECTION_WIDTH,
+                  diff_threshold=DIFF_THRESHOLD, cache_dir=VIDEO_CACHE_DIR, progress=None):
+    """
+    Probes the video and detects its scene changes, or loads both from the
+    cache when the same video was analysed with the same parameters, e.g.
+    for an earlier participant of the study.
+    ---
+    Args
+    ---
+        video(cv2.VideoCapture) the opened video, only decoded on a cache miss
+        video_path(str) the path of the video, its content is the cache key
+        threshold, stride, width, diff_threshold: see detect_scene_changes
+        cache_dir(str) the cache folder, None to always decode
+        progress(callable) see detect_scene_changes
+    ---
+    Returns
+    ---
+        info(dict) output of ``update_timestamps``
+        change_frames(np.ndarray) the frames where a change was detected
+        change_timestamps(np.ndarray) their position in the video in ms
+    ---
+    Raises
+    ---
+        IOError: if no frame of the video could be decoded, nothing is cached
+    """
+    cache_path = None
+    if cache_dir is not None:
+        params = f"{VIDEO_CACHE_VERSION}|{threshold}|{stride}|{width}|{diff_threshold}"
+        key = hashlib.sha256(f"{video_fingerprint(video_path)}|{params}".encode()).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{key}.npz")
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                info = {
+                    "frame_count": int(cached["frame_count"]),
+                    "fps": float(cached["fps"]),
+                    "duration": float(cached["duration"]),
+                    "timestamps": cached["timestamps"],
+                }
+                return info, cached["change_frames"], cached["change_timestamps"]
+
+    info = probe_video(video)
+    change_frames, change_timestamps, frame_times = detect_scene_changes(
+        video, threshold=threshold, stride=stride, width=width, diff_threshold=diff_threshold,
+        progress=progress
+    )
+    if len(frame_times) == 0:
+        # a failed decode must not be shared with the next participants
+        raise IOError(f"No frame could be decoded from {video_path}")
+    info = update_timestamps(info, frame_times)
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # written aside and renamed, so a cancelled run leaves no partial entry
+        partial_path = f"{cache_path}.{os.getpid()}.npz"
+        np.savez(partial_path, change_frames=change_frames, change_timestamps=change_timestamps, **info)
+        os.replace(partial_path, cache_path)
+    return info, change_frames, change_timestamps
+
+
+def link_or_copy(source, destination):
+    """
+    Hard links a file into a folder, or copies it when the file system
+    doesn't support links. An existing destination is kept only when it
+    is the source, or a copy with its size and modification time.
+    """
+    if os.path.exists(destination):
+        if os.path.samefile(destination, source):
+            return destination
+        kept, wanted = os.stat(destination), os.stat(source)
+        if (kept.st_size, kept.st_mtime_ns) == (wanted.st_size, wanted.st_mtime_ns):
+            return destination
+        # left over from an earlier run
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        # copy2 keeps the modification time the check above compares
+        shutil.copy2(source, destination)
+    return destination
+
+
+@instrumentation.traced("main_code")
+def main_code(video_path, csv_path,experiment_name,user_name,selected_emotion,channels=VIDEO_CHANNELS,
+              stride=1, threshold=SSIM_THRESHOLD, k=3, min_gap=PEAK_MIN_GAP, progress=None):
+    # progress(stage, done, total) is called as the run goes, it may raise
+    # ProcessingCancelled to stop it
+    if progress is None:
+        progress = lambda stage, done, total: None
+
+    progress("Reading CSV", 0, 1)
+    with instrumentation.span("read") as stage:
+        data = read_sensor_csv(csv_path)
+        # exports without the Phasic Signal get it from the conductance
+        data = gsr.add_components(data)
+        stage.set(rows_out=len(data))
 
-    # Heart Rate Data
-    hr_data = data[['Row','Timestamp','SourceStimuliName','Heart Rate PPG ALG']]
-    hr = hr_data.drop(['Timestamp','SourceStimuliName','Row'],axis=1).columns
-    
-    emotion_data[emotions] = emotion_data[emotions].astype('float64')
-    emotion_data = emotion_data.dropna(subset=emotions)
-    emotion_data["Timestamp"] = emotion_data["Timestamp"].astype('float64')
-    emotion_data["Row"] = emotion_data["Row"].astype('int64')
-    emotion_data["SourceStimuliName"] = emotion_data["SourceStimuliName"].astype('int64').astype('float64')
-    emotion_data = emotion_data.loc[emotion_data.SourceStimuliName==1].reset_index(drop=True)
-
-    min_emotion_timestamp = emotion_data["Timestamp"].min()
-
-    # Convert 'imotion_data' timestamp to datetime if not already
-    emotion_data['Timestamp'] = pd.to_datetime(emotion_data['Timestamp'])
-    emotion_data.index = emotion_data["Timestamp"]
-    emotion_data = emotion_data.drop("Timestamp",axis=1)
-
-    # Resample data to the bin size
-    emotion_data = emotion_data.resample('0.00015ms').mean()
-    print(emotion_data.head(5))
-    
-    gsr_data[gsr] = gsr_data[gsr].astype('float64')
-    gsr_data = gsr_data.dropna(subset=gsr)
-    gsr_data["Timestamp"] = gsr_data["Timestamp"].astype('float64')
-    gsr_data["Row"] = gsr_data["Row"].astype('int64')
-    gsr_data["SourceStimuliName"] = gsr_data["SourceStimuliName"].astype('int64').astype('float64')
-    gsr_data = gsr_data.loc[gsr_data.SourceStimuliName==1].reset_index(drop=True)
-
-    min_gsr_timestamp = gsr_data["Timestamp"].min()
-
-    # Convert 'imotion_data' timestamp to datetime if not already
-    gsr_data['Timestamp'] = pd.to_datetime(gsr_data['Timestamp'])
-    gsr_data.index = gsr_data["Timestamp"]
-    gsr_data = gsr_data.drop("Timestamp",axis=1)
-
-    # Resample data to the bin size
-    gsr_data = gsr_data.resample('0.00015ms').mean()
-    print(gsr_data.head(5))
-    
-    hr_data[hr] = hr_data[hr].astype('float64')
-    hr_data = hr_data.dropna(subset=hr)
-    hr_data["Timestamp"] = hr_data["Timestamp"].astype('float64')
-    hr_data["Row"] = hr_data["Row"].astype('int64')
-    hr_data["SourceStimuliName"] = hr_data["SourceStimuliName"].astype('int64').astype('float64')
-    hr_data = hr_data.loc[hr_data.SourceStimuliName==1].reset_index(drop=True)
-
-    min_hr_timestamp = hr_data["Timestamp"].min()
-
-    # Convert 'imotion_data' timestamp to datetime if not already
-    hr_data['Timestamp'] = pd.to_datetime(hr_data['Timestamp'])
-    hr_data.index = hr_data["Timestamp"]
-    hr_data = hr_data.drop("Timestamp",axis=1)
-
-    # Resample data to the bin size
-    hr_data = hr_data.resample('0.00015ms').mean()
-    print(hr_data.head(5))
-    
-    
-    video_path = video_path
-    timestamps,duration,frames = calculate_timestamps(video_path)
-
-    # merge the frame with the emotion data
-    # Emotion 
-    t_df_emotion = pd.DataFrame(data={"Frames":frames,"Timestamp":[(i*1000)+min_emotion_timestamp for i in timestamps]})
-    t_df_emotion['Timestamp'] = pd.to_datetime(t_df_emotion['Timestamp'])
-    t_df_emotion.index = t_df_emotion["Timestamp"]
-    t_df_emotion = t_df_emotion.drop("Timestamp",axis=1)
-    t_df_emotion = t_df_emotion.resample('0.00015ms').mean()
-
-    # Merge frames with gsr data
-    # GSR
-    t_df_gsr = pd.DataFrame(data={"Frames":frames,"Timestamp":[(i*1000)+min_gsr_timestamp for i in timestamps]})
-    t_df_gsr['Timestamp'] = pd.to_datetime(t_df_gsr['Timestamp'])
-    t_df_gsr.index = t_df_gsr["Timestamp"]
-    t_df_gsr = t_df_gsr.drop("Timestamp",axis=1)
-    t_df_gsr = t_df_gsr.resample('0.00015ms').mean()
-
-    # Merge frame with heart rate data
-    # Heart Rate 
-    t_df_hr = pd.DataFrame(data={"Frames":frames,"Timestamp":[(i*1000)+min_hr_timestamp for i in timestamps]})
-    t_df_hr['Timestamp'] = pd.to_datetime(t_df_hr['Timestamp'])
-    t_df_hr.index = t_df_hr["Timestamp"]
-    t_df_hr = t_df_hr.drop("Timestamp",axis=1)
-    t_df_hr = t_df_hr.resample('0.00015ms').mean()
-
-    merged_emotion_data = pd.merge_asof(emotion_data,t_df_emotion, left_index=True, right_index=True)
-    merged_gsr_data = pd.merge_asof(gsr_data,t_df_gsr, left_index=True, right_index=True)
-    merged_hr_data = pd.merge_asof(hr_data,t_df_hr, left_index=True, right_index=True)
-    
-    # Top 3 Peaks for each Emotion
-    merged_emotion_data = merged_emotion_data.reset_index()
-    top_three_emotion = pd.DataFrame()
-    for emot in emotions:
-        temp = merged_emotion_data[['Timestamp','SourceStimuliName','Frames']+[emot]]
-        temp[emot] = temp[emot].astype('float64')
-        temp = temp.sort_values(by=[emot],ascending=False)
-        temp = temp.iloc[:3].reset_index(drop=True)
-        temp = pd.melt(temp,id_vars=['Timestamp','SourceStimuliName','Frames'],var_name="Variable",value_name="Max_Values")
-        temp["Frames"] = temp["Frames"].round()
-        top_three_emotion = pd.concat([top_three_emotion,temp],axis=0)
-    print(top_three_emotion.head(5))
-    
-    merged_gsr_data = merged_gsr_data.reset_index()
-    top_three_gsr = pd.DataFrame()
-    for emot in gsr:
-        temp = merged_gsr_data[['Timestamp','SourceStimuliName','Frames']+[emot]]
-        temp[emot] = temp[emot].astype('float64')
-        temp = temp.sort_values(by=[emot],ascending=False)
-        temp = temp.iloc[:3].reset_index(drop=True)
-        temp = pd.melt(temp,id_vars=['Timestamp','SourceStimuliName','Frames'],var_name="Variable",value_name="Max_Values")
-        temp["Frames"] = temp["Frames"].round()
-        top_three_gsr = pd.concat([top_three_gsr,temp],axis=0)
-    print(top_three_gsr.head(5))
-    
-    merged_hr_data = merged_hr_data.reset_index()
-    top_three_hr = pd.DataFrame()
-    for emot in hr:
-        temp = merged_hr_data[['Timestamp','SourceStimuliName','Frames']+[emot]]
-        temp[emot] = temp[emot].astype('float64')
-        temp = temp.sort_values(by=[emot],ascending=False)
-        temp = temp.iloc[:3].reset_index(drop=True)
-        temp = pd.melt(temp,id_vars=['Timestamp','SourceStimuliName','Frames'],var_name="Variable",value_name="Max_Values")
-        temp["Frames"] = temp["Frames"].round()
-        top_three_hr = pd.concat([top_three_hr,temp],axis=0)
-    print(top_three_hr.head(5))
-    
-    top_three = pd.concat([top_three_emotion,top_three_gsr,top_three_hr]).reset_index(drop=True)
-    print(top_three.head(5))
-    
     # Set output directory
     experiment_dir = os.path.join("experiments", experiment_name)
     user_dir = os.path.join(experiment_dir, user_name)
     output_dir = os.path.join(user_dir, "output")
 
-
     # Create output directory if it does not exist
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Open the video file
+    # Open the video file, once for the whole run
     video = cv2.VideoCapture(video_path)
 
-    # Initialize frame counter
-    count = 0
-
-    # Initialize variable to hold the previous frame
-    prev_frame = None
-
-    # Initialize DataFrame to hold output data
-    df_output = pd.DataFrame(columns=["Frame_Name", "Timestamp", "Path"])
-
     # Check if video opened successfully
     if not video.isOpened():
-        print("Error opening video file")
-
-    while video.isOpened():
-        # Read a frame
-        ret, frame = video.read()
-
-        if ret:
-            # Convert the frame to grayscale
-            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-            # Add Gaussian blur to gray_frame
-            gray_frame = cv2.GaussianBlur(gray_frame, (21, 21), 0)
-
-            # If this is the first frame, just save it to prev_frame
-            if prev_frame is None:
-                prev_frame = gray_frame
-            else:
-                # Compare the current frame with the previous frame
-                similarity = ssim(prev_frame, gray_frame)
-
-                # If similarity is below a certain threshold, assume a scroll has occurred
-                if similarity < 0.9:  # Adjusted the threshold
-                    # Get the timestamp of the current frame (in milliseconds)
-                    timestamp = video.get(cv2.CAP_PROP_POS_MSEC)
-
-                    # Save the frame
-                    frame_name = f"frame_{count}.png"
-                    frame_path = os.path.join(output_dir, frame_name)
-                    cv2.imwrite(frame_path, frame)
-
-                    # Append data to the DataFrame
-                    # df_output = df_output.append({"Frame_Name": frame_name, "Timestamp": timestamp, "Path": frame_path},
-                    #                              ignore_index=True)
-                    new_row = pd.DataFrame([{"Frame_Name": frame_name, "Timestamp": timestamp, "Path": frame_path}])
-                    df_output = pd.concat([df_output, new_row], ignore_index=True)
-                # Update prev_frame
-                prev_frame = gray_frame
-
-            count += 1
-
-        else:
-            # If no frame is read, then we have reached the end of the video
-            break
-
-    # Release the video file
-    video.release()
-
-    # Close all OpenCV windows
-    cv2.destroyAllWindows()
-
-    # Print DataFrame
-    # print(df_output)
-    
-    emotion_df = top_three.copy()
-    output_df = df_output.copy()
-    
-    output_df['Frame_Name'] = output_df['Frame_Name'].apply(lambda x: int(x.split('_')[1].split('.')[0]))
-    
-    # Create a new DataFrame to store the merged data
-    merged_df = pd.DataFrame()
-
-    # Iterate over the rows in the emotion data
-    for idx, row in emotion_df.iterrows():
-        # Find the frame with the closest Frames value to the current row's Frames value
-        closest_frame = output_df.iloc[(output_df['Frame_Name'] - row['Frames']).abs().argsort()[:1]]
-
-        # Duplicate the current row and add the Path from the closest frame
-        new_row = row.copy()
-        new_row['Path'] = closest_frame['Path'].values[0]
-
-        # Append the new row to the merged DataFrame
-        # merged_df = merged_df.append(new_row, ignore_index=True)
-        new_df = pd.DataFrame([new_row])
-        merged_df = pd.concat([merged_df, new_df], ignore_index=True)
-        
-    # # Call this function with the emotion name to get the top three frames
-    # output_dir = os.path.join("output", "emotions", selected_emotion)
-    # top_three_frames = get_top_three_frames_for_emotion(merged_df, selected_emotion)
+        video.release()
+        raise IOError(f"Error opening video file {video_path}")
+
+    try:
+        # Only the change points are recorded, frames are written once the
+        # peaks are known. The analysis is shared by every participant that
+        # watched the same video.
+        progress("Detecting scene changes", 0, 1)
+        with instrumentation.span("detect") as stage:
+            info, change_frames, change_timestamps = analyse_video(
+                video, video_path, threshold=threshold, stride=stride, progress=progress
+            )
+            stage.set(frames=info["frame_count"], rows_out=len(change_frames))
+
+        # One table with the per frame mean of every channel
+        progress("Syncing sensors", 0, 1)
+        with instrumentation.span("resample", rows_in=len(data)) as stage:
+            per_frame, channels = sync_channels(data, channels, info["timestamps"], info["duration"])
+            stage.set(rows_out=len(per_frame))
+
+        # Top k distinct peaks for each channel
+        with instrumentation.span("peaks", rows_in=len(per_frame)) as stage:
+            top_three = top_frames(per_frame, channels, k=k, min_gap=min_gap)
+            stage.set(rows_out=len(top_three))
+
+        # Closest change point to every peak, the change frames come sorted
+        closest = alignment.asof_indices(top_three['Frames'].to_numpy(), change_frames, direction="nearest")
+        # Without any change point the peak frame itself is used
+        frame_names = np.where(closest >= 0, alignment.take(change_frames, closest, fill_value=0),
+                               top_three['Frames'].to_numpy()).astype("int64")
+
+        # Decode and save only the frames that were matched with a peak
+        progress("Extracting frames", 0, 1)
+        with instrumentation.span("write", rows_in=len(frame_names)):
+            frame_paths = extract_frames(video, frame_names, output_dir,
+                                         store_dir=os.path.join(experiment_dir, FRAME_STORE_DIR))
+        merged_df = top_three.assign(Path=[frame_paths.get(frame) for frame in frame_names])
+        # Frames past the end of the video (the frame count can be an
+        # overestimate, or the last reads can fail) were not saved
+        merged_df = merged_df[merged_df['Path'].notna()]
+    finally:
+        # Release the video file
+        video.release()
 
     base_output_dir = os.path.join("experiments", experiment_name, user_name)
     top_three_frames = get_top_three_frames_for_emotion(merged_df, selected_emotion, base_output_dir)
+    progress("Done", 1, 1)
 
     return merged_df, top_three_frames
 
 
-    
-
-
-
 # Function to be executed with the provided paths
-def process_video_and_csv(video_path, csv_path, experiment_name, user_name, selected_emotion):
+def process_video_and_csv(video_path, csv_path, experiment_name, user_name, selected_emotion, progress=None):
     # Your processing logic here
     print("Processing video:", video_path)
     print("Processing CSV:", csv_path)
@@ -347,15 +638,60 @@ def process_video_and_csv(video_path, csv_path, experiment_name, user_name, sele
     output_dir = os.path.join("experiments", experiment_name, user_name)
     os.makedirs(output_dir, exist_ok=True)
 
-    # Copy video and CSV to the appropriate directories (optional)
-    shutil.copy(video_path, os.path.join(output_dir, os.path.basename(video_path)))
+    # Copy video and CSV to the appropriate directories (optional), the
+    # video is linked so every participant shares the same file
+    link_or_copy(video_path, os.path.join(output_dir, os.path.basename(video_path)))
     shutil.copy(csv_path, os.path.join(output_dir, os.path.basename(csv_path)))
 
 
-    top_three_frames = main_code(video_path, csv_path,experiment_name,user_name,selected_emotion)
+    top_three_frames = main_code(video_path, csv_path,experiment_name,user_name,selected_emotion,
+                                 progress=progress)
     return top_three_frames
 
 
+class ProcessingCancelled(Exception):
+    """Raised from a progress callback to stop a run"""
+
+
+class ThumbnailCache:
+    """
+    Thumbnails of the result frames, made once per frame and size and
+    kept in memory and as JPEG files on disk. The frames are decoded at a
+    reduced size when the format allows it.
+    """
+
+    def __init__(self, cache_dir=THUMBNAIL_DIR, size=THUMBNAIL_SIZE):
+        self.cache_dir = cache_dir
+        self.size = tuple(size)
+        self.memory = {}
+
+    def key(self, image_path):
+        # a changed file gets a new thumbnail
+        stat = os.stat(image_path)
+        return (os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns, self.size)
+
+    def get(self, image_path):
+        """Returns the thumbnail of an image as a PIL image"""
+        key = self.key(image_path)
+        if key in self.memory:
+            return self.memory[key]
+
+        name = hashlib.sha256(repr(key).encode()).hexdigest()
+        thumbnail_path = os.path.join(self.cache_dir, f"{name}.jpg")
+        if os.path.exists(thumbnail_path):
+            thumbnail = PILImage.open(thumbnail_path)
+            thumbnail.load()
+        else:
+            with PILImage.open(image_path) as image:
+                # JPEG sources are decoded at a fraction of their size
+                image.draft("RGB", self.size)
+                thumbnail = image.convert("RGB").resize(self.size, reducing_gap=2.0)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            thumbnail.save(thumbnail_path, "JPEG", quality=85)
+        self.memory[key] = thumbnail
+        return thumbnail
+
+
 # Tkinter app
 class VideoProcessingApp:
     
@@ -412,6 +748,33 @@ class VideoProcessingApp:
         self.run_button = ttk.Button(root, text="Run", command=self.run_processing, style="TButton")
         self.run_button.pack(padx=20, pady=10)
 
+        # Runs are queued and processed one after another in a worker thread
+        self.progress_frame = ttk.Frame(root)
+        self.progress_frame.pack(padx=20, pady=5, fill="x")
+
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode="determinate", maximum=1)
+        self.progress_bar.pack(side="left", fill="x", expand=True)
+
+        self.cancel_button = ttk.Button(self.progress_frame, text="Cancel", command=self.cancel_processing)
+        self.cancel_button.pack(side="left", padx=10)
+
+        self.status_var = tk.StringVar(self.root, value="Idle")
+        self.status_label = ttk.Label(root, textvariable=self.status_var)
+        self.status_label.pack(padx=20)
+
+        self.jobs = queue.Queue()
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        # Guards the queue, the cancel event and the worker start/exit
+        self.lock = threading.Lock()
+        self.worker = None
+        self.merged_df = None
+        self.base_output_dir = None
+        self.emotion_results = {}
+        self.thumbnails = ThumbnailCache()
+        self.photos = {}
+        self.root.after(EVENT_POLL_MS, self.poll_events)
+
         list_of_emotions = ['Anger', 'Joy', 'Sadness', 'Fear', 'Surprise', 'Disgust', 'Neutral', 'Contempt', 'Engagement', 'Valence','Phasic Signal','Heart Rate PPG ALG']
 
         self.result_button = ttk.Button(root, text="Show Results", command=self.display_selected_emotion, style="TButton")
@@ -464,18 +827,83 @@ class VideoProcessingApp:
         output_dir = os.path.join("experiments", experiment_name, user_name)
         os.makedirs(output_dir, exist_ok=True)
 
-        
-        # process_video_and_csv(video_path, csv_path, experiment_name, user_name, selected_emotion)
-        # top_three_frames = process_video_and_csv(video_path, csv_path, experiment_name, user_name, selected_emotion)
-        # top_three_frames = process_video_and_csv(video_path, csv_path, experiment_name, user_name, selected_emotion)
-        self.merged_df, top_three_frames = process_video_and_csv(video_path, csv_path, experiment_name, user_name, selected_emotion)
-
-        if top_three_frames is not None:
-            image_paths = top_three_frames['Path'].tolist()
-            values = top_three_frames['Max_Values'].tolist()
-            self.display_emotion_images(image_paths, values)
-
-
+        # Queue the run, the worker takes the jobs one after another
+        with self.lock:
+            self.jobs.put((video_path, csv_path, experiment_name, user_name, selected_emotion))
+            # the worker clears self.worker under the lock before exiting,
+            # so a job is never left in the queue without a worker
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.process_jobs, daemon=True)
+                self.worker.start()
+        self.status_var.set(f"Queued {user_name} ({self.jobs.qsize()} waiting)")
+
+    def cancel_processing(self):
+        # Drop the waiting jobs and stop the running one
+        with self.lock:
+            while True:
+                try:
+                    self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+            self.cancel_event.set()
+
+    def process_jobs(self):
+        """Worker thread, it only talks to the UI through the events queue"""
+
+        def report(stage, done, total):
+            if self.cancel_event.is_set():
+                raise ProcessingCancelled()
+            self.events.put(("progress", stage, done, total))
+
+        while True:
+            # a Cancel pressed after the job is taken stays set for it
+            with self.lock:
+                self.cancel_event.clear()
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    self.worker = None
+                    self.events.put(("idle",))
+                    return
+            try:
+                merged_df, top_three_frames = process_video_and_csv(*job, progress=report)
+                self.events.put(("done", job, merged_df, top_three_frames))
+            except ProcessingCancelled:
+                self.events.put(("cancelled", job))
+            except Exception as e:
+                self.events.put(("error", job, str(e)))
+
+    def poll_events(self):
+        """Applies the worker events on the Tk thread"""
+        try:
+            while True:
+                event = self.events.get_nowait()
+                kind = event[0]
+                if kind == "progress":
+                    _, stage, done, total = event
+                    self.progress_bar.configure(maximum=max(total, 1), value=min(done, total))
+                    self.status_var.set(f"{stage}: {done}/{total}" if total > 1 else stage)
+                elif kind == "done":
+                    _, job, merged_df, top_three_frames = event
+                    self.merged_df = merged_df
+                    self.base_output_dir = os.path.join("experiments", job[2], job[3])
+                    self.emotion_results = {job[4]: top_three_frames}
+                    self.status_var.set(f"Finished {job[3]}")
+                    if top_three_frames is not None:
+                        image_paths = top_three_frames['Path'].tolist()
+                        values = top_three_frames['Max_Values'].tolist()
+                        self.display_emotion_images(image_paths, values)
+                elif kind == "cancelled":
+                    self.status_var.set(f"Cancelled {event[1][3]}")
+                    self.progress_bar.configure(value=0)
+                elif kind == "error":
+                    self.status_var.set(f"Failed {event[1][3]}")
+                    messagebox.showerror("Error", event[2])
+                elif kind == "idle" and not self.status_var.get().startswith(("Cancelled", "Failed")):
+                    self.status_var.set("Idle")
+        except queue.Empty:
+            pass
+        self.root.after(EVENT_POLL_MS, self.poll_events)
 
     # def display_emotion_images(self, image_paths, values):
     
@@ -493,10 +921,8 @@ class VideoProcessingApp:
                 image_path = image_paths[index]
                 value = values[index]
 
-                # Load and resize the image using PIL
-                pil_image = PILImage.open(image_path)
-                pil_image = pil_image.resize((300, 300))  # Adjust the size as necessary
-                image = ImageTk.PhotoImage(pil_image)
+                # Thumbnails are made once and kept for the whole session
+                image = self.thumbnail_photo(image_path)
 
                 # Display the image
                 image_label = tk.Label(row_frame, image=image)
@@ -511,18 +937,30 @@ class VideoProcessingApp:
         self.canvas.update_idletasks()
         self.canvas.config(scrollregion=self.canvas.bbox("all"))
 
-    def display_selected_emotion(self):
+    def thumbnail_photo(self, image_path):
+        # Tk images can only be made on the Tk thread, so they are kept here
+        # and the resized pictures in the thumbnail cache
+        key = self.thumbnails.key(image_path)
+        if key not in self.photos:
+            self.photos[key] = ImageTk.PhotoImage(self.thumbnails.get(image_path))
+        return self.photos[key]
+
+    def display_selected_emotion(self, event=None):
         selected_emotion = self.emotion_var.get()
-        if hasattr(self, 'merged_df') and self.merged_df is not None:
-            base_output_dir = os.path.join("experiments", self.exp_name_entry.get(), self.user_name_entry.get())
-            top_three_frames = get_top_three_frames_for_emotion(self.merged_df, selected_emotion, base_output_dir)
+        if self.merged_df is not None:
+            base_output_dir = self.base_output_dir
+            # Each emotion is only looked up once per result
+            if selected_emotion not in self.emotion_results:
+                self.emotion_results[selected_emotion] = get_top_three_frames_for_emotion(
+                    self.merged_df, selected_emotion, base_output_dir)
+            top_three_frames = self.emotion_results[selected_emotion]
             if top_three_frames is not None:
                 image_paths = top_three_frames['Path'].tolist()
                 values = top_three_frames['Max_Values'].tolist()
                 
                 # Clear previously displayed images and values
                 for widget in self.root.winfo_children():
-                    if isinstance(widget, (tk.Label, ttk.Label)) and widget not in [self.exp_frame, self.video_frame, self.csv_frame, self.run_button, self.result_button]:
+                    if isinstance(widget, (tk.Label, ttk.Label)) and widget not in [self.exp_frame, self.video_frame, self.csv_frame, self.run_button, self.result_button, self.status_label]:
                         widget.destroy()
 
                 # Display the new images and values
@@ -5,7 +5,9 @@ Code for Mohammad's experiment
 
 """
 
+import os
 import tkinter as tk
+import webbrowser
 from tkinter import filedialog, messagebox
 from tkinter.ttk import Button, Frame, Label
 
@@ -43,12 +45,13 @@ def run_web_app(root):
 
         processor = DataProcessor(scroll_csv, imotions_csv, output_path)
         processor.process_data()
-        fig = processor.plot_heatmap(screenshot_path)
-        # save plot to file and save in output_path
-        fig.savefig(f"{output_path}/heatmap.png", dpi=1000)
-        # Open the file in the ouptut path
+        # render the heatmap at the screenshot resolution into output_path
+        heatmap_path = processor.render_heatmap(
+            screenshot_path, os.path.join(output_path, "heatmap.png")
+        )
         messagebox.showinfo("Success", "Heatmap generated successfully")
-        fig.show()
+        # Open the file in the ouptut path
+        webbrowser.open("file://" + os.path.abspath(heatmap_path))
 
     # File selection UI
     frame = Frame(root)